@@ -0,0 +1,97 @@
+"""
+ローソク足をローカルDBに保存する処理のベンチマーク
+
+1分足のローソク足をN本、1本ずつUPSERTする以前の方法と、
+チャンク単位で一括UPSERTする方法(DBCandleStore.save_ohlcs)で保存し、1秒あたりの行数を表示します。
+
+example: (リポジトリのルートで実行します)
+    python -m benchmarks.bench_save_ohlcs --rows 20000 --chunk-size 1000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy
+
+from magictrader.model import CandleOHLC, DBContext
+from magictrader.store import DBCandleStore
+
+
+def save_ohlcs_by_row(db_context: DBContext, currency_pair: str, period: str, ohlcs: dict):
+    """
+    ローソク足を1本ずつ検索してUPSERTする(一括UPSERTに置き換える前の方法)
+    """
+    for idx, item in enumerate(ohlcs["times"]):
+        record = db_context.session.query(CandleOHLC) \
+            .filter(CandleOHLC.currency_pair == currency_pair) \
+            .filter(CandleOHLC.period == period) \
+            .filter(CandleOHLC.time == item) \
+            .first()
+        if record:
+            record.open = float(ohlcs["opens"][idx])
+            record.high = float(ohlcs["highs"][idx])
+            record.low = float(ohlcs["lows"][idx])
+            record.close = float(ohlcs["closes"][idx])
+        else:
+            db_context.session.add(CandleOHLC(
+                currency_pair=currency_pair,
+                period=period,
+                time=item,
+                open=float(ohlcs["opens"][idx]),
+                high=float(ohlcs["highs"][idx]),
+                low=float(ohlcs["lows"][idx]),
+                close=float(ohlcs["closes"][idx])
+            ))
+        db_context.session.flush()
+    db_context.session.commit()
+
+
+def create_ohlcs(rows: int, seed: int) -> dict:
+    """
+    1分足のローソク足を作成する
+    """
+    rng = numpy.random.default_rng(seed)
+    closes = 1000000 + numpy.cumsum(rng.integers(-1000, 1001, rows)).astype(float)
+    opens = numpy.r_[closes[0], closes[:-1]]
+    return {
+        "times": [datetime(2019, 1, 1) + timedelta(minutes=x) for x in range(rows)],
+        "opens": opens,
+        "highs": numpy.maximum(opens, closes) + 500,
+        "lows": numpy.minimum(opens, closes) - 500,
+        "closes": closes,
+    }
+
+
+def measure(name: str, save, rows: int):
+    """
+    挿入(未保存のローソク足)と更新(保存済みのローソク足)の1秒あたりの行数を表示する
+    """
+    for label, seed in (("insert", 0), ("update", 1)):
+        ohlcs = create_ohlcs(rows, seed)
+        started_at = time.perf_counter()
+        save(ohlcs)
+        elapsed = time.perf_counter() - started_at
+        print("{:<8} {:<6} {:>9,} rows {:>8.2f} s {:>10,.0f} rows/sec".format(name, label, rows, elapsed, rows / elapsed))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmark saving candles into the local DB.")
+    parser.add_argument("--rows", type=int, default=20000, help="number of 1m candles")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="number of candles per bulk upsert")
+    parser.add_argument("--skip-before", action="store_true", help="measure only the bulk upsert")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        if not args.skip_before:
+            db_context = DBContext("sqlite:///{}".format(os.path.join(directory, "before.sqlite")))
+            measure("before", lambda x: save_ohlcs_by_row(db_context, "btc_jpy", "1m", x), args.rows)
+
+        store = DBCandleStore(DBContext("sqlite:///{}".format(os.path.join(directory, "after.sqlite"))), args.chunk_size)
+        measure("after", lambda x: store.save_ohlcs("btc_jpy", "1m", x), args.rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+バックテストのティックデータを生成・消費する処理(最も内側のループ)のベンチマーク
+
+より下位のローソク足からティックデータを生成し、1ティックずつ読み進める処理を、
+リストで1本ずつ生成してpop(0)で読み進める以前の方法と、TickGeneratorで一括生成して位置で読み進める方法で比較します。
+
+example: (リポジトリのルートで実行します)
+    python -m benchmarks.bench_ticks --bars 540 --details 48
+"""
+
+import argparse
+import time
+
+import numpy
+
+from magictrader.candle import TickGenerator
+
+
+def consume_by_list(bar_ohlcs: dict, detail_ohlcs: dict) -> int:
+    """
+    ティックデータをリストで生成し、pop(0)で読み進める(一括生成に置き換える前の方法)
+    """
+    prices = []
+    for i in range(len(detail_ohlcs["opens"])):
+        prices.append(detail_ohlcs["opens"][i])
+        if detail_ohlcs["closes"][i] > detail_ohlcs["opens"][i]:
+            prices.append(detail_ohlcs["lows"][i])
+            prices.append(detail_ohlcs["highs"][i])
+        else:
+            prices.append(detail_ohlcs["highs"][i])
+            prices.append(detail_ohlcs["lows"][i])
+        prices.append(detail_ohlcs["closes"][i])
+    prices[0] = bar_ohlcs["opens"][-1]
+    prices[prices.index(max(prices))] = bar_ohlcs["highs"][-1]
+    prices[prices.index(min(prices))] = bar_ohlcs["lows"][-1]
+    prices[-1] = bar_ohlcs["closes"][-1]
+
+    count = 0
+    while len(prices) > 0:
+        prices.pop(0)
+        count += 1
+    return count
+
+
+def consume_by_cursor(ticks: list, tick_from: int, tick_to: int) -> int:
+    """
+    一括生成したティックデータを位置で読み進める
+    """
+    count = 0
+    cursor = tick_from
+    while cursor < tick_to:
+        ticks[cursor]
+        cursor += 1
+        count += 1
+    return count
+
+
+def create_ohlcs(bar_count: int, detail_count: int, seed: int) -> (dict, dict):
+    """
+    ローソク足と、より下位のローソク足を作成する(同じ価格が多く現れる粗い価格)
+    """
+    rng = numpy.random.default_rng(seed)
+    prices = rng.integers(0, 50, (bar_count * detail_count, 4)).astype(float)
+    detail_ohlcs = {
+        "opens": prices[:, 0], "highs": prices.max(axis=1), "lows": prices.min(axis=1), "closes": prices[:, 3],
+    }
+    bar_ohlcs = {
+        "opens": prices[::detail_count, 0],
+        "highs": prices.reshape(bar_count, -1).max(axis=1) + 1,
+        "lows": prices.reshape(bar_count, -1).min(axis=1) - 1,
+        "closes": prices[detail_count - 1::detail_count, 3],
+    }
+    return bar_ohlcs, detail_ohlcs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmark backtest tick synthesis.")
+    parser.add_argument("--bars", type=int, default=540, help="number of bars")
+    parser.add_argument("--details", type=int, default=48, help="number of detail bars per bar")
+    parser.add_argument("--repeat", type=int, default=5, help="number of repetitions (the best one is shown)")
+    args = parser.parse_args()
+
+    bar_ohlcs, detail_ohlcs = create_ohlcs(args.bars, args.details, 0)
+    detail_from = numpy.arange(args.bars) * args.details
+    detail_to = detail_from + args.details
+    tick_count = args.bars * args.details * 4
+
+    def bar_slice(ohlcs: dict, start: int, stop: int) -> dict:
+        return {k: v[start:stop] for k, v in ohlcs.items()}
+
+    def by_list():
+        for i in range(args.bars):
+            consume_by_list(bar_slice(bar_ohlcs, i, i + 1), bar_slice(detail_ohlcs, detail_from[i], detail_to[i]))
+
+    def by_bar():
+        for i in range(args.bars):
+            ticks, offsets = TickGenerator.generate(
+                bar_slice(bar_ohlcs, i, i + 1), bar_slice(detail_ohlcs, detail_from[i], detail_to[i]), [0], [args.details]
+            )
+            consume_by_cursor(ticks.tolist(), 0, int(offsets[-1]))
+
+    def by_range():
+        ticks, offsets = TickGenerator.generate(bar_ohlcs, detail_ohlcs, detail_from, detail_to)
+        ticks = ticks.tolist()
+        offsets = offsets.tolist()
+        for i in range(args.bars):
+            consume_by_cursor(ticks, offsets[i], offsets[i + 1])
+
+    for name, func in (("list (before)", by_list), ("numpy per bar", by_bar), ("numpy whole range", by_range)):
+        elapsed = float("inf")
+        for _ in range(args.repeat):
+            started_at = time.perf_counter()
+            func()
+            elapsed = min(elapsed, time.perf_counter() - started_at)
+        print("{:<18} {:>6,} bars {:>9,} ticks {:>9.2f} ms {:>12,.0f} ticks/sec".format(
+            name, args.bars, tick_count, elapsed * 1000, tick_count / elapsed
+        ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+import numpy
+
+
+class IndicatorNode:
+    """
+    テクニカルインディケーターの依存関係グラフのノード(計算処理)を表します。
+    """
+
+    def __init__(self, key: tuple, func, dependencies: tuple, args: tuple):
+        """
+        Parameters
+        ----------
+        key : tuple
+            ノードを識別するキー(関数, パラメーター, 価格種, etc.)
+        func : callable
+            計算処理(依存先のノードの計算結果と、argsを引数として呼び出されます)
+        dependencies : tuple
+            依存先のノード
+        args : tuple
+            計算処理に渡すパラメーター(依存先の計算結果に続く位置引数)
+        """
+        self._key = key
+        self._func = func
+        self._dependencies = dependencies
+        self._args = args
+        self._value = None
+        self._data_version = None
+
+    def is_dirty(self, data_version: int) -> bool:
+        """
+        計算し直す必要があるかどうかを判定する
+
+        Parameters
+        ----------
+        data_version : int
+            ローソク足のデータバージョン
+
+        Returns
+        -------
+        bool
+            計算結果が指定したデータバージョンのものでない場合True
+        """
+        return self._data_version != data_version
+
+    @property
+    def key(self) -> tuple:
+        return self._key
+
+    @property
+    def dependencies(self) -> tuple:
+        return self._dependencies
+
+    @property
+    def value(self) -> object:
+        """
+        最後に計算した結果
+        """
+        return self._value
+
+    @property
+    def data_version(self) -> int:
+        """
+        最後に計算したときのデータバージョン
+        """
+        return self._data_version
+
+
+class PrecomputedFunction:
+    """
+    バックテストで、計算処理を先読みした全期間の価格に対して１度だけ実行し、
+    ローソク足の更新ごとの計算結果を、全期間の計算結果のスライスとして返します。
+
+    確定した足の計算結果は全期間の計算結果から切り出し、形成中の足(最新の足)のみを、
+    直近の価格(lookback + 1本)から計算し直します。
+    計算結果が直近のlookback + 1本の価格のみで決まる計算処理(SMA、WMAなど)に使用してください。
+
+    計算処理が価格の総和を逐次更新する場合、浮動小数点の丸め誤差は合計を始めた位置によって変わるため、
+    価格が整数で、総和(重み付きの総和)が誤差なく求まる場合のみ使用し、それ以外の場合は、
+    価格のウィンドウ全体から計算します。(いずれの場合も、ウィンドウ全体から計算した結果と一致します)
+    """
+
+    def __init__(self, func, lookback: int, history: numpy.ndarray, get_cursor):
+        """
+        Parameters
+        ----------
+        func : callable
+            計算処理(価格、パラメーターを引数として呼び出され、価格と同じ長さの配列を返すもの)
+        lookback : int
+            最初の計算結果を求めるまでに必要な価格の本数 - 1
+        history : numpy.ndarray
+            先読みした全期間の価格
+        get_cursor : callable
+            最新のローソク足の、全期間の価格での位置を返す関数(位置が求まらない場合はNone)
+        """
+        self._func = func
+        self._lookback = lookback
+        self._history = history
+        self._get_cursor = get_cursor
+        self._results = None
+        self._window = None
+        self._window_key = None
+        # 総和(重み付きの総和)を誤差なく求められる価格の上限
+        self._max_price = 2 ** 53 / (lookback + 1) ** 2
+        self._exact = bool(numpy.all(numpy.floor(history) == history)) and \
+            (len(history) == 0 or float(numpy.max(numpy.abs(history))) < self._max_price)
+
+    def __call__(self, prices: numpy.ndarray, *args) -> numpy.ndarray:
+        cursor = self._get_cursor()
+        bar_count = len(prices)
+        if not self._exact or cursor is None or bar_count <= self._lookback or bar_count > cursor + 1 or \
+                not self._is_exact_price(float(prices[-1])):
+            return self._func(prices, *args)
+
+        # 全期間の計算結果を求める(初回のみ)
+        if self._results is None:
+            self._results = self._func(self._history, *args)
+
+        # 確定した足の計算結果を切り出す(ローソク足が１本進むまで使い回す)
+        # (ウィンドウ全体から計算した場合、先頭のlookback本は計算結果がない(NaN))
+        if self._window_key != (cursor, bar_count):
+            self._window = numpy.empty(bar_count)
+            self._window[:self._lookback] = numpy.nan
+            self._window[self._lookback:-1] = self._results[cursor + 1 - bar_count + self._lookback:cursor]
+            self._window_key = (cursor, bar_count)
+
+        # 形成中の足の計算結果は、直近の価格から求める
+        values = self._window.copy()
+        values[-1] = self._func(prices[-(self._lookback + 1):], *args)[-1]
+        return values
+
+    def _is_exact_price(self, price: float) -> bool:
+        """
+        価格(形成中の足の価格)が整数で、総和(重み付きの総和)を誤差なく求められるかどうかを判定する
+        """
+        return price.is_integer() and abs(price) < self._max_price
+
+
+class IndicatorGraph:
+    """
+    テクニカルインディケーターの計算処理を、依存関係グラフ(DAG)として管理します。
+
+    同じキーのノードは１つにまとめられるため、複数のインディケーターが共通して使用する
+    計算処理(EMA(26)、ATR(14)など)は、ローソク足の更新ごとに１度だけ実行されます。
+    計算結果は依存先のノードから順に求められ、ローソク足が更新されたノード(dirty)のみ計算し直します。
+    計算結果は共有されるため、呼び出し元で変更しないでください。
+    """
+
+    def __init__(self):
+        self._nodes = {}
+        self._hit_count = 0
+        self._miss_count = 0
+
+    def add_node(self, key: tuple, func, dependencies: tuple = (), args: tuple = ()) -> IndicatorNode:
+        """
+        ノードを登録する(同じキーのノードが登録済みの場合は、登録済みのノードを返す)
+
+        Parameters
+        ----------
+        key : tuple
+            ノードを識別するキー(関数, パラメーター, 価格種, etc.)
+        func : callable
+            計算処理(依存先のノードの計算結果と、argsを引数として呼び出されます)
+        dependencies : tuple, optional
+            依存先のノード, by default ()
+        args : tuple, optional
+            計算処理に渡すパラメーター, by default ()
+
+        Returns
+        -------
+        IndicatorNode
+            ノード
+        """
+        node = self._nodes.get(key)
+        if node is None:
+            node = IndicatorNode(key, func, tuple(dependencies), tuple(args))
+            self._nodes[key] = node
+        return node
+
+    def get_value(self, node: IndicatorNode, data_version: int) -> object:
+        """
+        ノードの計算結果を取得する(dirtyなノードは依存先から順に計算し直す)
+
+        Parameters
+        ----------
+        node : IndicatorNode
+            ノード
+        data_version : int
+            ローソク足のデータバージョン
+
+        Returns
+        -------
+        object
+            計算結果
+        """
+        if not node.is_dirty(data_version):
+            self._hit_count += 1
+            return node._value
+
+        self._miss_count += 1
+        values = [self.get_value(x, data_version) for x in node._dependencies]
+        node._value = node._func(*values, *node._args)
+        node._data_version = data_version
+        return node._value
+
+    def evaluate(self, data_version: int):
+        """
+        全てのdirtyなノードを計算する
+        (ノードは依存先より後に登録されるため、登録順に計算すると依存先から順に計算されます)
+
+        Parameters
+        ----------
+        data_version : int
+            ローソク足のデータバージョン
+        """
+        for node in list(self._nodes.values()):
+            if node.is_dirty(data_version):
+                self.get_value(node, data_version)
+
+    def clear(self):
+        """
+        全てのノードの計算結果を破棄する
+        """
+        for node in self._nodes.values():
+            node._value = None
+            node._data_version = None
+
+    def reset_counters(self):
+        """
+        ヒット数・ミス数をリセットする
+        """
+        self._hit_count = 0
+        self._miss_count = 0
+
+    @property
+    def nodes(self) -> list:
+        """
+        登録されたノード(登録順)
+        """
+        return list(self._nodes.values())
+
+    @property
+    def hit_count(self) -> int:
+        """
+        計算済みの結果を返した回数
+        """
+        return self._hit_count
+
+    @property
+    def miss_count(self) -> int:
+        """
+        計算処理を実行した回数
+        """
+        return self._miss_count
+
+    @property
+    def hit_ratio(self) -> float:
+        """
+        計算済みの結果を返した割合
+        """
+        total_count = self._hit_count + self._miss_count
+        return self._hit_count / total_count if total_count > 0 else 0.0
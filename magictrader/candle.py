@@ -1,15 +1,325 @@
+import asyncio
+import logging
 import time
+from bisect import bisect_left, bisect_right
 from datetime import datetime, timedelta
 from typing import List
 
 import numpy
 from zaifer import Chart as ChartAPI
 
-from magictrader.const import AppliedPrice, Period
+from magictrader.cache import IndicatorGraph
+from magictrader.const import AppliedPrice, Period, TickMode
 from magictrader.event import EventArgs, EventHandler
-from magictrader.model import CandleOHLC, DBContext
+from magictrader.ratelimit import TokenBucket
+from magictrader.resample import CandleResampler
+from magictrader.store import CandleStore, DBCandleStore
 from magictrader.utils import TimeConverter
-from sqlalchemy import asc
+
+
+class TickGenerator:
+    """
+    より下位のローソク足からティックデータを生成します。
+    """
+
+    @staticmethod
+    def generate(bar_ohlcs: dict, detail_ohlcs: dict, detail_from: numpy.ndarray, detail_to: numpy.ndarray) -> (numpy.ndarray, numpy.ndarray):
+        """
+        複数のローソク足のティックデータを一括で生成する
+
+        より下位のローソク足1本につき、陽線の場合は始値・安値・高値・終値、
+        陰線の場合は始値・高値・安値・終値の順にティックを生成し、
+        ローソク足ごとに始値・最高値・最安値・終値を元のローソク足の価格で補正します。
+        より下位のローソク足が存在しない場合は、元のローソク足からティックを生成します。
+
+        Parameters
+        ----------
+        bar_ohlcs : dict
+            ティックデータを生成するローソク足
+        detail_ohlcs : dict
+            より下位のローソク足
+        detail_from : numpy.ndarray
+            ローソク足ごとの、より下位のローソク足の開始位置
+        detail_to : numpy.ndarray
+            ローソク足ごとの、より下位のローソク足の終了位置(この位置を含まない)
+
+        Returns
+        -------
+        (numpy.ndarray, numpy.ndarray)
+            1: ティックデータ
+            2: ローソク足ごとのティックデータの開始位置(末尾に全体の終了位置を含む)
+        """
+
+        bar_count = len(bar_ohlcs["opens"])
+        detail_counts = numpy.asarray(detail_to) - numpy.asarray(detail_from)
+        no_detail = detail_counts <= 0
+        detail_counts = numpy.where(no_detail, 1, detail_counts)
+
+        # より下位のローソク足の参照位置を求める
+        offsets = numpy.zeros(bar_count + 1, dtype=numpy.int64)
+        numpy.cumsum(detail_counts, out=offsets[1:])
+        bar_idx = numpy.repeat(numpy.arange(bar_count), detail_counts)
+        detail_idx = numpy.asarray(detail_from)[bar_idx] + numpy.arange(offsets[-1]) - offsets[bar_idx]
+        use_bar = no_detail[bar_idx]
+        detail_idx = numpy.where(use_bar, 0, detail_idx)
+
+        def column(name: str) -> numpy.ndarray:
+            bar_prices = numpy.asarray(bar_ohlcs[name], dtype=numpy.float64)[bar_idx]
+            if len(detail_ohlcs[name]) == 0:
+                return bar_prices
+            detail_prices = numpy.asarray(detail_ohlcs[name], dtype=numpy.float64)[detail_idx]
+            return numpy.where(use_bar, bar_prices, detail_prices)
+
+        opens = column("opens")
+        highs = column("highs")
+        lows = column("lows")
+        closes = column("closes")
+
+        # 陽線は始値・安値・高値・終値、陰線は始値・高値・安値・終値の順とする
+        is_up = closes > opens
+        ticks = numpy.empty((len(opens), 4), dtype=numpy.float64)
+        ticks[:, 0] = opens
+        ticks[:, 1] = numpy.where(is_up, lows, highs)
+        ticks[:, 2] = numpy.where(is_up, highs, lows)
+        ticks[:, 3] = closes
+        ticks = ticks.ravel()
+        offsets = offsets * 4
+
+        # ローソク足ごとに始値・最高値・最安値・終値を補正する
+        tick_from = offsets[:-1]
+        tick_to = offsets[1:]
+        tick_counts = tick_to - tick_from
+        tick_idx = numpy.arange(len(ticks))
+        ticks[tick_from] = bar_ohlcs["opens"]
+        highest = numpy.repeat(numpy.maximum.reduceat(ticks, tick_from), tick_counts)
+        ticks[numpy.minimum.reduceat(numpy.where(ticks == highest, tick_idx, len(ticks)), tick_from)] = bar_ohlcs["highs"]
+        lowest = numpy.repeat(numpy.minimum.reduceat(ticks, tick_from), tick_counts)
+        ticks[numpy.minimum.reduceat(numpy.where(ticks == lowest, tick_idx, len(ticks)), tick_from)] = bar_ohlcs["lows"]
+        ticks[tick_to - 1] = bar_ohlcs["closes"]
+
+        return ticks, offsets
+
+    @staticmethod
+    def generate_from_bars(bar_ohlcs: dict, tick_mode: TickMode) -> (numpy.ndarray, numpy.ndarray):
+        """
+        より下位のローソク足を使用せず、ローソク足の価格のみからティックデータを一括で生成する
+
+        TickMode.OHLCの場合は、ローソク足1本につき始値・安値・高値・終値(陰線の場合は始値・高値・安値・終値)、
+        TickMode.BARの場合は、ローソク足1本につき終値のみのティックを生成します。
+
+        Parameters
+        ----------
+        bar_ohlcs : dict
+            ティックデータを生成するローソク足
+        tick_mode : TickMode
+            ティックの粒度(TickMode.OHLC, TickMode.BAR)
+
+        Returns
+        -------
+        (numpy.ndarray, numpy.ndarray)
+            1: ティックデータ
+            2: ローソク足ごとのティックデータの開始位置(末尾に全体の終了位置を含む)
+        """
+
+        bar_count = len(bar_ohlcs["opens"])
+
+        if tick_mode == TickMode.BAR:
+            return numpy.array(bar_ohlcs["closes"], dtype=numpy.float64), numpy.arange(bar_count + 1, dtype=numpy.int64)
+
+        no_detail = numpy.zeros(bar_count, dtype=numpy.int64)
+        detail_ohlcs = {
+            "opens": numpy.array([]),
+            "highs": numpy.array([]),
+            "lows": numpy.array([]),
+            "closes": numpy.array([]),
+        }
+        return TickGenerator.generate(bar_ohlcs, detail_ohlcs, no_detail, no_detail)
+
+
+class OHLCBuffer:
+    """
+    ローソク足を固定長の領域に保持します。
+
+    容量の２倍の領域を事前に確保し、ローソク足を末尾に追加します。(容量を超えた古いローソク足は参照範囲から外れます)
+    領域の末尾に達した場合は最新の容量分を先頭に詰め直すため、保持しているローソク足は常に連続した領域にあり、
+    各列を複製せずにビュー(numpy.ndarray)として参照できます。
+    """
+
+    def __init__(self, capacity: int):
+        """
+        Parameters
+        ----------
+        capacity : int
+            保持するローソク足の最大数
+        """
+        self._capacity = capacity
+        size = capacity * 2
+        self._times = numpy.empty(size, dtype=object)
+        self._times64 = numpy.empty(size, dtype="datetime64[s]")
+        self._opens = numpy.empty(size, dtype=numpy.float64)
+        self._highs = numpy.empty(size, dtype=numpy.float64)
+        self._lows = numpy.empty(size, dtype=numpy.float64)
+        self._closes = numpy.empty(size, dtype=numpy.float64)
+        self._head = 0
+        self._tail = 0
+
+    def __len__(self) -> int:
+        return self._tail - self._head
+
+    def assign(self, ohlcs: dict):
+        """
+        保持しているローソク足を、指定したローソク足(最新の容量分)で置き換える
+
+        Parameters
+        ----------
+        ohlcs : dict
+            ローソク足
+        """
+        count = min(len(ohlcs["times"]), self._capacity)
+        start = len(ohlcs["times"]) - count
+        times = list(ohlcs["times"][start:])
+        self._times[:count] = times
+        self._times64[:count] = TimeConverter.datetimes_to_datetime64(times)
+        self._opens[:count] = ohlcs["opens"][start:]
+        self._highs[:count] = ohlcs["highs"][start:]
+        self._lows[:count] = ohlcs["lows"][start:]
+        self._closes[:count] = ohlcs["closes"][start:]
+        self._head = 0
+        self._tail = count
+
+    def append(self, time: datetime, open: float, high: float, low: float, close: float):
+        """
+        ローソク足を末尾に追加する(容量を超えた場合は最も古いローソク足を取り除く)
+
+        Parameters
+        ----------
+        time : datetime
+            日時
+        open : float
+            始値
+        high : float
+            高値
+        low : float
+            安値
+        close : float
+            終値
+        """
+        if self._tail == len(self._times):
+            self._compact()
+        self._times[self._tail] = time
+        self._times64[self._tail] = time
+        self._opens[self._tail] = open
+        self._highs[self._tail] = high
+        self._lows[self._tail] = low
+        self._closes[self._tail] = close
+        self._tail += 1
+        if self._tail - self._head > self._capacity:
+            self._head += 1
+
+    def set_last(self, open: float, high: float, low: float, close: float):
+        """
+        最新のローソク足の価格を設定する
+
+        Parameters
+        ----------
+        open : float
+            始値
+        high : float
+            高値
+        low : float
+            安値
+        close : float
+            終値
+        """
+        idx = self._tail - 1
+        self._opens[idx] = open
+        self._highs[idx] = high
+        self._lows[idx] = low
+        self._closes[idx] = close
+
+    def update_last(self, price: float):
+        """
+        最新のローソク足の価格をティックの価格で更新する(高値・安値を更新し、終値を設定する)
+
+        Parameters
+        ----------
+        price : float
+            ティックの価格
+        """
+        idx = self._tail - 1
+        if price > self._highs[idx]:
+            self._highs[idx] = price
+        if price < self._lows[idx]:
+            self._lows[idx] = price
+        self._closes[idx] = price
+
+    def drop_before(self, time: datetime):
+        """
+        指定した日時より前のローソク足を取り除く
+
+        Parameters
+        ----------
+        time : datetime
+            日時
+        """
+        while self._head < self._tail and self._times[self._head] < time:
+            self._head += 1
+
+    def truncate_from(self, time: datetime):
+        """
+        指定した日時以降のローソク足を取り除く
+
+        Parameters
+        ----------
+        time : datetime
+            日時
+        """
+        while self._tail > self._head and self._times[self._tail - 1] >= time:
+            self._tail -= 1
+
+    def _compact(self):
+        """
+        保持しているローソク足を領域の先頭に詰め直します。
+        """
+        count = self._tail - self._head
+        for column in (self._times, self._times64, self._opens, self._highs, self._lows, self._closes):
+            column[:count] = column[self._head:self._tail]
+        self._head = 0
+        self._tail = count
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    @property
+    def times(self) -> numpy.ndarray:
+        """
+        日時(datetimeの配列のビュー)
+        """
+        return self._times[self._head:self._tail]
+
+    @property
+    def times64(self) -> numpy.ndarray:
+        """
+        日時(datetime64[s]の配列のビュー)
+        """
+        return self._times64[self._head:self._tail]
+
+    @property
+    def opens(self) -> numpy.ndarray:
+        return self._opens[self._head:self._tail]
+
+    @property
+    def highs(self) -> numpy.ndarray:
+        return self._highs[self._head:self._tail]
+
+    @property
+    def lows(self) -> numpy.ndarray:
+        return self._lows[self._head:self._tail]
+
+    @property
+    def closes(self) -> numpy.ndarray:
+        return self._closes[self._head:self._tail]
 
 
 class CandleFeeder:
@@ -17,7 +327,10 @@ class CandleFeeder:
     ローソク足を供給します。
     """
 
-    def __init__(self, currency_pair: str, period: str, bar_count: int, backtest_mode: bool = False, datetime_from: datetime = None, datetime_to: datetime = None):
+    def __init__(self, currency_pair: str, period: str, bar_count: int, backtest_mode: bool = False, datetime_from: datetime = None, datetime_to: datetime = None,
+                 preload: bool = False, candle_store: CandleStore = None, rate_limiter: TokenBucket = None, chart_api: object = None,
+                 resample_period: str = None, precompute: bool = False, tick_mode: TickMode = TickMode.DETAIL,
+                 response_bar_limit: int = 0):
         """
         Parameters
         ----------
@@ -33,8 +346,30 @@ class CandleFeeder:
             バックテストの開始日時, by default None
         datetime_to : datetime, optional
             バックテストの終了日時, by default None
+        preload : bool, optional
+            バックテストの全期間のローソク足を開始時に一括で読み込む, by default False
+        candle_store : CandleStore, optional
+            ローソク足のキャッシュ(未指定の場合はローカルDB), by default None
+        rate_limiter : TokenBucket, optional
+            サーバーへのリクエストの頻度制限(未指定の場合はプロセス全体で共有), by default None
+        chart_api : object, optional
+            ローソク足を取得するAPI(get_ohlcを実装したもの、未指定の場合はzaifのAPI), by default None
+        resample_period : str, optional
+            バックテストで上位の時間枠のローソク足を作成する元の時間枠("1m", etc.)
+            (指定した場合、サーバーからはこの時間枠のみを取得します), by default None
+        precompute : bool, optional
+            先読みしたバックテストの全期間に対して、インディケーター(SMA、WMA)を１度だけ計算する
+            (preloadを指定した場合のみ有効、計算結果は変わりません), by default False
+        tick_mode : TickMode, optional
+            バックテストでローソク足１本ごとに生成するティックの粒度
+            (TickMode.BAR: 終値のみ、TickMode.OHLC: 始値・高値・安値・終値、TickMode.DETAIL: より下位のローソク足から生成),
+            by default TickMode.DETAIL
+        response_bar_limit : int, optional
+            サーバーが１回の応答で返すローソク足の上限(0の場合は不明)
+            (応答が上限に満たない場合のみ、最後の足より後を取引所にデータが存在しない期間として記録します), by default 0
         """
 
+        self._logger = logging.getLogger()
         self._currency_pair = currency_pair
         self._period = period
         self._bar_count = bar_count
@@ -50,14 +385,32 @@ class CandleFeeder:
             self._datetime_cursor = datetime.now()
             self._datetime_from = self._datetime_cursor
             self._datetime_to = self._datetime_cursor
-        self._db_context = DBContext()
-        self._chart_api = ChartAPI()
-        self._server_request_span = 1.0
-        self._server_request_latest = None
-        self._ohlcs = {}
-        self._sequential_prices = []
+        self._candle_store = candle_store if candle_store else DBCandleStore()
+        self._chart_api = chart_api if chart_api else ChartAPI()
+        self._resample_period = resample_period
+        self._rate_limiter = rate_limiter if rate_limiter else TokenBucket.shared()
+        self._ohlcs = OHLCBuffer(self._cache_bar_count)
+        self._tick_mode = tick_mode
+        self._response_bar_limit = response_bar_limit
+        self._ticks = []
+        self._tick_cursor = 0
+        self._tick_end = 0
+        self._tick_open = None
+        self._tick_high = None
+        self._tick_low = None
         self._ohlc_updated_eventhandler = EventHandler(self)
-        self.go_next()
+        self._data_version = 0
+        self._indicator_graph = IndicatorGraph()
+        self._preload = self._backtest_mode and preload
+        self._preloaded_ohlcs = {}
+        self._preloaded_ticks = []
+        self._preloaded_tick_offsets = [0]
+        self._preloaded_tick_bar_from = 0
+        self._preloaded_cursor = None
+        self._precompute = self._preload and precompute
+        if self._preload:
+            self._preload_ohlcs()
+        self._load_initial_ohlcs()
 
     def get_ohlcs(self, extra_bar_count: int = 0) -> dict:
         """
@@ -97,7 +450,25 @@ class CandleFeeder:
             ローソク足の時刻
         """
         bar_count = self._bar_count + extra_bar_count
-        return self._ohlcs["times"][-bar_count:]
+        return self._ohlcs.times[-bar_count:].tolist()
+
+    def get_times64(self, extra_bar_count: int = 0) -> numpy.ndarray:
+        """
+        ローソク足の時刻をdatetime64[s]の配列で取得する
+        (複製せずに参照するため、時刻の比較・検索を一括で行う場合に使用します)
+
+        Parameters
+        ----------
+        extra_bar_count : int
+            インディケーターが追加で必要とするローソク足の本数, by default 0
+
+        Returns
+        -------
+        numpy.ndarray
+            ローソク足の時刻
+        """
+        bar_count = self._bar_count + extra_bar_count
+        return self._ohlcs.times64[-bar_count:]
 
     def get_prices(self, extra_bar_count: int = 0, applied_price: AppliedPrice = AppliedPrice.CLOSE) -> numpy.ndarray:
         """
@@ -117,13 +488,36 @@ class CandleFeeder:
         """
         bar_count = self._bar_count + extra_bar_count
         if applied_price == AppliedPrice.OPEN:
-            return self._ohlcs["opens"][-bar_count:]
+            return self._ohlcs.opens[-bar_count:]
         elif applied_price == AppliedPrice.HIGH:
-            return self._ohlcs["highs"][-bar_count:]
+            return self._ohlcs.highs[-bar_count:]
         elif applied_price == AppliedPrice.LOW:
-            return self._ohlcs["lows"][-bar_count:]
+            return self._ohlcs.lows[-bar_count:]
         elif applied_price == AppliedPrice.CLOSE:
-            return self._ohlcs["closes"][-bar_count:]
+            return self._ohlcs.closes[-bar_count:]
+
+    def get_preloaded_prices(self, applied_price: AppliedPrice = AppliedPrice.CLOSE) -> numpy.ndarray:
+        """
+        先読みしたバックテストの全期間(ウォームアップ期間を含む)のローソク足の価格を取得する
+
+        Parameters
+        ----------
+        applied_price : AppliedPrice, optional
+            インディケーターが必要とする価格種, by default AppliedPrice.CLOSE
+
+        Returns
+        -------
+        numpy.ndarray
+            ローソク足の価格(変更しないでください)
+        """
+        if applied_price == AppliedPrice.OPEN:
+            return self._preloaded_ohlcs["opens"]
+        elif applied_price == AppliedPrice.HIGH:
+            return self._preloaded_ohlcs["highs"]
+        elif applied_price == AppliedPrice.LOW:
+            return self._preloaded_ohlcs["lows"]
+        elif applied_price == AppliedPrice.CLOSE:
+            return self._preloaded_ohlcs["closes"]
 
     def go_next(self) -> bool:
         """
@@ -139,7 +533,7 @@ class CandleFeeder:
         if self._backtest_mode:
 
             # ティックデータが存在しない場合
-            if len(self._sequential_prices) == 0:
+            if self._tick_cursor >= self._tick_end:
 
                 if self._datetime_cursor < self._datetime_to:
 
@@ -148,37 +542,28 @@ class CandleFeeder:
                     range_from = self._datetime_cursor - timedelta(minutes=Period.to_minutes(self._period) * (self._cache_bar_count - 1))
                     range_to = self._datetime_cursor
 
-                    # ローカルDB、もしくはサーバーからローソク足を取得する
-                    self._ohlcs = self._get_ohlcs_from_local_or_server(self._currency_pair, self._period, range_from, range_to)
-
-                    # より下位のローソク足を取得する
-                    detail_range_from = self._ohlcs["times"][-1]
-                    detail_range_to = self._ohlcs["times"][-1] + timedelta(minutes=Period.to_minutes(self._period)) - timedelta(minutes=1)
-                    detail_ohlcs = self._get_ohlcs_from_local_or_server(
-                        self._currency_pair, Period.zoom_period(self._period, 4), detail_range_from, detail_range_to
-                    )
-
-                    # より下位のローソク足をティックデータに変換する
-                    for i, x in enumerate(detail_ohlcs["times"]):
-                        self._sequential_prices.append(detail_ohlcs["opens"][i])
-                        if detail_ohlcs["closes"][i] > detail_ohlcs["opens"][i]:
-                            self._sequential_prices.append(detail_ohlcs["lows"][i])
-                            self._sequential_prices.append(detail_ohlcs["highs"][i])
-                        else:
-                            self._sequential_prices.append(detail_ohlcs["highs"][i])
-                            self._sequential_prices.append(detail_ohlcs["lows"][i])
-                        self._sequential_prices.append(detail_ohlcs["closes"][i])
-                    self._sequential_prices[0] = self._ohlcs["opens"][-1]
-                    self._sequential_prices[self._sequential_prices.index(max(self._sequential_prices))] = self._ohlcs["highs"][-1]
-                    self._sequential_prices[self._sequential_prices.index(min(self._sequential_prices))] = self._ohlcs["lows"][-1]
-                    self._sequential_prices[-1] = self._ohlcs["closes"][-1]
+                    # 先読みしたローソク足、もしくはローカルDB、サーバーからローソク足を取得する
+                    if self._preload:
+                        ohlcs = self._get_ohlcs_from_preloaded(self._preloaded_ohlcs, range_from, range_to)
+                        self._preloaded_cursor = bisect_right(self._preloaded_ohlcs["times"], range_to) - 1 if len(ohlcs["times"]) > 0 else None
+                    else:
+                        ohlcs = self._get_ohlcs_from_local_or_server(self._currency_pair, self._period, range_from, range_to)
+                    self._update_backtest_ohlcs(ohlcs, range_from)
+
+                    # 最新のローソク足のティックデータを読み込む
+                    self._load_ticks()
 
                     # ティックデータで最新のローソク足の価格を更新する
-                    self._ohlcs["opens"][-1] = self._sequential_prices[0]
-                    self._ohlcs["highs"][-1] = self._sequential_prices[0]
-                    self._ohlcs["lows"][-1] = self._sequential_prices[0]
-                    self._ohlcs["closes"][-1] = self._sequential_prices[0]
-                    self._sequential_prices.pop(0)
+                    # (終値のみの場合は、取得したローソク足の価格をそのまま使用し、ティックの値幅を高値・安値とする)
+                    price = self._ticks[self._tick_cursor]
+                    self._tick_cursor += 1
+                    if self._tick_mode == TickMode.BAR:
+                        self._tick_open = float(self._ohlcs.opens[-1])
+                        self._tick_high = float(self._ohlcs.highs[-1])
+                        self._tick_low = float(self._ohlcs.lows[-1])
+                    else:
+                        self._ohlcs.set_last(price, price, price, price)
+                        self._tick_open = self._tick_high = self._tick_low = price
 
                     # ローソク足更新イベントを実行する
                     self._on_ohlc_updated(EventArgs())
@@ -193,51 +578,299 @@ class CandleFeeder:
             else:
 
                 # ティックデータで最新のローソク足の価格を更新する
-                if self._sequential_prices[0] > self._ohlcs["highs"][-1]:
-                    self._ohlcs["highs"][-1] = self._sequential_prices[0]
-                if self._sequential_prices[0] < self._ohlcs["lows"][-1]:
-                    self._ohlcs["lows"][-1] = self._sequential_prices[0]
-                self._ohlcs["closes"][-1] = self._sequential_prices[0]
-                self._sequential_prices.pop(0)
+                # (直前のティックから価格が連続して動いたものとして、ティックの値幅を求める)
+                previous_price = self._ticks[self._tick_cursor - 1]
+                price = self._ticks[self._tick_cursor]
+                self._tick_cursor += 1
+                self._ohlcs.update_last(price)
+                self._tick_open = previous_price
+                self._tick_high = max(previous_price, price)
+                self._tick_low = min(previous_price, price)
 
                 # ローソク足更新イベントを実行する
                 self._on_ohlc_updated(EventArgs())
 
+                return True
+
         # リアルタイムモードの場合
         else:
 
             # ローソク足の取得範囲を計算する
-            self._datetime_cursor = datetime.now()
-            self._to_datetime = self._datetime_cursor
-            range_from = self._datetime_cursor - timedelta(minutes=Period.to_minutes(self._period) * (self._cache_bar_count - 1))
-            range_to = self._datetime_cursor
+            previous_time, range_from, range_to = self._get_realtime_range()
 
             # サーバーが過去のローソク足を返す場合の対策
             try_count = 0
-            previous_time = None
-            if "times" in self._ohlcs:
-                previous_time = self._ohlcs["times"][-1]
             while True:
 
                 # サーバーからローソク足を取得する
-                self._ohlcs = self._get_ohlcs_from_server(self._currency_pair, self._period, range_from, range_to)
+                ohlcs = self._get_ohlcs_from_server(self._currency_pair, self._period, range_from, range_to)
 
                 try_count += 1
-                if previous_time is None \
-                        or (previous_time is not None
-                            and self._ohlcs["times"][-1] >= previous_time):
+                if self._update_realtime_ohlcs(ohlcs, previous_time):
                     break
                 else:
-                    print("server response time is wrong.")
+                    self._logger.warning("server response time is wrong.")
                     if try_count > 100:
                         raise Exception("server response time is wrong.")
                     time.sleep(1.0)
 
+            # 前回の取得からの値動きは分からないため、最新の価格をティックの値幅とする
+            self._tick_open = self._tick_high = self._tick_low = float(self._ohlcs.closes[-1])
+
             # ローソク足更新イベントを実行する
             self._on_ohlc_updated(EventArgs())
 
             return True
 
+    def _load_initial_ohlcs(self):
+        """
+        最初のローソク足を取得する
+        """
+        self.go_next()
+
+    def _get_realtime_range(self) -> (datetime, datetime, datetime):
+        """
+        リアルタイムモードでサーバーから取得するローソク足の範囲を計算する
+        (取得済みの場合は、最新のローソク足以降のみを取得する)
+
+        Returns
+        -------
+        (datetime, datetime, datetime)
+            取得済みの最新のローソク足の日時(未取得の場合はNone), 取得開始日時, 取得終了日時
+        """
+        self._datetime_cursor = datetime.now()
+        self._to_datetime = self._datetime_cursor
+        previous_time = None
+        if len(self._ohlcs) > 0:
+            previous_time = self._ohlcs.times[-1]
+            range_from = previous_time
+        else:
+            range_from = self._datetime_cursor - timedelta(minutes=Period.to_minutes(self._period) * (self._cache_bar_count - 1))
+        range_to = self._datetime_cursor
+        return previous_time, range_from, range_to
+
+    def _update_realtime_ohlcs(self, ohlcs: dict, previous_time: datetime) -> bool:
+        """
+        リアルタイムモードでサーバーから取得したローソク足を、取得済みのローソク足に反映する
+
+        Parameters
+        ----------
+        ohlcs : dict
+            サーバーから取得したローソク足
+        previous_time : datetime
+            取得済みの最新のローソク足の日時(未取得の場合はNone)
+
+        Returns
+        -------
+        bool
+            反映した場合True、サーバーが過去のローソク足を返した場合False
+        """
+        if previous_time is None:
+            self._ohlcs.assign(ohlcs)
+            return True
+        # 新しいローソク足が存在しない場合は、取得済みのローソク足をそのまま使用する
+        elif len(ohlcs["times"]) == 0:
+            return True
+        elif ohlcs["times"][-1] >= previous_time:
+            self._merge_ohlcs(ohlcs)
+            return True
+        else:
+            return False
+
+    def _merge_ohlcs(self, new_ohlcs: dict):
+        """
+        取得済みのローソク足に、新しく取得したローソク足をマージする
+        (最大でcache_bar_count本を保持します)
+
+        Parameters
+        ----------
+        new_ohlcs : dict
+            新しく取得したローソク足(同一時刻のローソク足はこちらを優先する)
+        """
+
+        # 新しいローソク足と重複する、取得済みのローソク足を取り除く
+        self._ohlcs.truncate_from(new_ohlcs["times"][0])
+
+        # 新しいローソク足を追加する(古いローソク足は取り除かれる)
+        for bar_time, open, high, low, close in zip(
+            new_ohlcs["times"], new_ohlcs["opens"], new_ohlcs["highs"], new_ohlcs["lows"], new_ohlcs["closes"]
+        ):
+            self._ohlcs.append(bar_time, open, high, low, close)
+
+    def _update_backtest_ohlcs(self, ohlcs: dict, range_from: datetime):
+        """
+        バックテストモードで取得したローソク足を、取得済みのローソク足に反映する
+
+        前回の取得範囲を１本分進めただけの場合は、最新のローソク足を追加します。
+        (ティックデータで更新した直前のローソク足は、取得した価格に戻します)
+        それ以外の場合(初回、ローソク足の欠落等)は、取得したローソク足で置き換えます。
+
+        Parameters
+        ----------
+        ohlcs : dict
+            取得したローソク足
+        range_from : datetime
+            取得開始日時
+        """
+
+        times = ohlcs["times"]
+        if len(self._ohlcs) > 0 and len(times) >= 2 and times[-2] == self._ohlcs.times[-1] and times[-1] > times[-2]:
+            self._ohlcs.drop_before(range_from)
+            if len(self._ohlcs) + 1 == len(times):
+                self._ohlcs.set_last(ohlcs["opens"][-2], ohlcs["highs"][-2], ohlcs["lows"][-2], ohlcs["closes"][-2])
+                self._ohlcs.append(times[-1], ohlcs["opens"][-1], ohlcs["highs"][-1], ohlcs["lows"][-1], ohlcs["closes"][-1])
+                return
+
+        self._ohlcs.assign(ohlcs)
+
+    def _preload_ohlcs(self):
+        """
+        バックテストの全期間(ウォームアップ期間を含む)のローソク足を一括で読み込む
+        """
+
+        period_minutes = Period.to_minutes(self._period)
+
+        # 最初の足で必要となる過去のローソク足から、最後の足までを読み込む
+        range_from = self._datetime_from - timedelta(minutes=period_minutes * (self._cache_bar_count - 1))
+        range_to = self._datetime_to + timedelta(minutes=period_minutes)
+        self._preloaded_ohlcs = self._get_ohlcs_by_chunk(self._currency_pair, self._period, range_from, range_to)
+
+        # バックテスト期間のローソク足のティックデータを一括で生成する
+        detail_range_from = self._datetime_from
+        self._preloaded_tick_bar_from = bisect_left(self._preloaded_ohlcs["times"], detail_range_from)
+        bar_ohlcs = {
+            "opens": self._preloaded_ohlcs["opens"][self._preloaded_tick_bar_from:],
+            "highs": self._preloaded_ohlcs["highs"][self._preloaded_tick_bar_from:],
+            "lows": self._preloaded_ohlcs["lows"][self._preloaded_tick_bar_from:],
+            "closes": self._preloaded_ohlcs["closes"][self._preloaded_tick_bar_from:],
+        }
+        if self._tick_mode == TickMode.DETAIL:
+            # ティックデータの元となる、より下位のローソク足を読み込む
+            detail_range_to = range_to + timedelta(minutes=period_minutes) - timedelta(minutes=1)
+            detail_ohlcs = self._get_ohlcs_by_chunk(
+                self._currency_pair, Period.zoom_period(self._period, 4), detail_range_from, detail_range_to
+            )
+            bar_times = TimeConverter.datetimes_to_datetime64(self._preloaded_ohlcs["times"][self._preloaded_tick_bar_from:])
+            detail_times = TimeConverter.datetimes_to_datetime64(detail_ohlcs["times"])
+            detail_from = numpy.searchsorted(detail_times, bar_times, "left")
+            detail_to = numpy.searchsorted(detail_times, bar_times + numpy.timedelta64(period_minutes - 1, "m"), "right")
+            ticks, tick_offsets = TickGenerator.generate(bar_ohlcs, detail_ohlcs, detail_from, detail_to)
+        else:
+            ticks, tick_offsets = TickGenerator.generate_from_bars(bar_ohlcs, self._tick_mode)
+        self._preloaded_ticks = ticks.tolist()
+        self._preloaded_tick_offsets = tick_offsets.tolist()
+
+    def _load_ticks(self):
+        """
+        最新のローソク足のティックデータを読み込む
+        """
+
+        bar_time = self._ohlcs.times[-1]
+
+        # 先読みしたティックデータが存在する場合
+        if self._preload:
+            bar_idx = bisect_left(self._preloaded_ohlcs["times"], bar_time) - self._preloaded_tick_bar_from
+            if bar_idx >= 0:
+                self._ticks = self._preloaded_ticks
+                self._tick_cursor = self._preloaded_tick_offsets[bar_idx]
+                self._tick_end = self._preloaded_tick_offsets[bar_idx + 1]
+                return
+
+        bar_ohlcs = {
+            "opens": self._ohlcs.opens[-1:],
+            "highs": self._ohlcs.highs[-1:],
+            "lows": self._ohlcs.lows[-1:],
+            "closes": self._ohlcs.closes[-1:],
+        }
+
+        # より下位のローソク足を使用しない場合は、ローソク足の価格からティックデータを生成する
+        if self._tick_mode != TickMode.DETAIL:
+            ticks, tick_offsets = TickGenerator.generate_from_bars(bar_ohlcs, self._tick_mode)
+            self._ticks = ticks.tolist()
+            self._tick_cursor = 0
+            self._tick_end = len(self._ticks)
+            return
+
+        # より下位のローソク足を取得する
+        detail_range_from = bar_time
+        detail_range_to = bar_time + timedelta(minutes=Period.to_minutes(self._period)) - timedelta(minutes=1)
+        detail_ohlcs = self._get_ohlcs_from_local_or_server(
+            self._currency_pair, Period.zoom_period(self._period, 4), detail_range_from, detail_range_to
+        )
+
+        # より下位のローソク足をティックデータに変換する
+        ticks, tick_offsets = TickGenerator.generate(bar_ohlcs, detail_ohlcs, [0], [len(detail_ohlcs["times"])])
+        self._ticks = ticks.tolist()
+        self._tick_cursor = 0
+        self._tick_end = len(self._ticks)
+
+    def _get_ohlcs_by_chunk(self, currency_pair: str, period: str, range_from: datetime, range_to: datetime) -> dict:
+        """
+        ローカルDB、もしくはサーバーからローソク足をキャッシュ単位に分割して取得する
+
+        Parameters
+        ----------
+        currency_pair : str
+            通貨ペア("btc_jpy", etc.)
+        period : str
+            時間枠("1m", "5m", "15m", "30m", "1h", "4h", "8h", "12h", "1d", "1w")
+        range_from : datetime
+            取得開始日時
+        range_to : datetime
+            取得終了日時
+
+        Returns
+        -------
+        dict
+            ローソク足
+        """
+
+        chunks = []
+        chunk_span = timedelta(minutes=Period.to_minutes(period) * self._cache_bar_count)
+        chunk_from = Period.ceil_datetime(range_from, period)
+        while chunk_from <= range_to:
+            chunk_to = min(chunk_from + chunk_span - timedelta(minutes=1), range_to)
+            chunks.append(self._get_ohlcs_from_local_or_server(currency_pair, period, chunk_from, chunk_to))
+            chunk_from += chunk_span
+
+        return {
+            "times": [x for chunk in chunks for x in chunk["times"]],
+            "opens": numpy.concatenate([chunk["opens"] for chunk in chunks] + [numpy.array([])]),
+            "highs": numpy.concatenate([chunk["highs"] for chunk in chunks] + [numpy.array([])]),
+            "lows": numpy.concatenate([chunk["lows"] for chunk in chunks] + [numpy.array([])]),
+            "closes": numpy.concatenate([chunk["closes"] for chunk in chunks] + [numpy.array([])]),
+        }
+
+    def _get_ohlcs_from_preloaded(self, ohlcs: dict, range_from: datetime, range_to: datetime) -> dict:
+        """
+        先読みしたローソク足から指定範囲のローソク足を取得する
+
+        Parameters
+        ----------
+        ohlcs : dict
+            先読みしたローソク足
+        range_from : datetime
+            取得開始日時
+        range_to : datetime
+            取得終了日時
+
+        Returns
+        -------
+        dict
+            ローソク足(価格は先読みしたローソク足のビュー)
+        """
+
+        idx_from = bisect_left(ohlcs["times"], range_from)
+        idx_to = bisect_right(ohlcs["times"], range_to)
+
+        return {
+            "times": ohlcs["times"][idx_from:idx_to],
+            "opens": ohlcs["opens"][idx_from:idx_to],
+            "highs": ohlcs["highs"][idx_from:idx_to],
+            "lows": ohlcs["lows"][idx_from:idx_to],
+            "closes": ohlcs["closes"][idx_from:idx_to],
+        }
+
     def _get_ohlcs_from_local_or_server(self, currency_pair: str, period: str, range_from: datetime, range_to: datetime) -> dict:
         """
         ローカルDB、もしくはサーバーからローソク足を取得する
@@ -259,31 +892,53 @@ class CandleFeeder:
             ローソク足
         """
 
+        # サーバーから取得済みの期間の場合は、キャッシュからローソク足を取得する
+        # (取引所にデータが存在しない足も取得済みとして記録されるため、サーバーに再取得しない)
+        if self._candle_store.is_covered(currency_pair, period, range_from, range_to):
+            return self._get_ohlcs_from_local(currency_pair, period, range_from, range_to)
+
+        # 下位の時間枠のローソク足から作成する
+        if self._resample_period and CandleResampler.can_resample(self._resample_period, period):
+            return self._get_ohlcs_by_resampling(currency_pair, period, range_from, range_to)
+
         # ローカルDBからローソク足を取得する
         ohlcs = self._get_ohlcs_from_local(currency_pair, period, range_from, range_to)
 
         # 取得期間にあるべき足の数を取得する
         expected_bar_count = Period.get_bar_count(range_from, range_to, period)
 
+        # ローカルDBに全ての足が存在する場合は、取得済みの期間として記録する
+        if len(ohlcs["times"]) >= expected_bar_count:
+            self._candle_store.add_coverage(currency_pair, period, range_from, range_to)
+
         # ローカルDBでヒットしなかった場合
-        if len(ohlcs["times"]) < expected_bar_count:
+        else:
 
             # サーバーからローソク足を取得する
+            # (応答が切り詰められている可能性がある場合は、取得期間を満たすまで最後の足より後を続けて取得する)
             extra_range_from = range_from
             extra_range_to = range_to + timedelta(minutes=Period.to_minutes(period) * (self._cache_bar_count - 1))
-            ohlcs = self._get_ohlcs_from_server(currency_pair, period, extra_range_from, extra_range_to)
+            while True:
+                ohlcs = self._get_ohlcs_from_server(currency_pair, period, extra_range_from, extra_range_to)
 
-            # キャッシュにローソク足を保存する
-            self._save_ohlcs_to_local(currency_pair, period, ohlcs)
+                # キャッシュにローソク足を保存し、応答が完全な期間を取得済みの期間として記録する
+                self._save_ohlcs_to_local(currency_pair, period, ohlcs)
+                fetched_range = self.get_fetched_range(ohlcs, extra_range_from, extra_range_to, self._response_bar_limit)
+                if fetched_range is None:
+                    break
+                self._candle_store.add_coverage(currency_pair, period, *fetched_range)
+                extra_range_from = fetched_range[1] + timedelta(minutes=Period.to_minutes(period))
+                if extra_range_from > range_to:
+                    break
 
             # キャッシュからローソク足を取得する
             ohlcs = self._get_ohlcs_from_local(currency_pair, period, range_from, range_to)
 
         return ohlcs
 
-    def _get_ohlcs_from_local(self, currency_pair: str, period: str, range_from: datetime, range_to: datetime) -> dict:
+    def _get_ohlcs_by_resampling(self, currency_pair: str, period: str, range_from: datetime, range_to: datetime) -> dict:
         """
-        ローカルDBからローソク足を取得する
+        下位の時間枠のローソク足(ローカルDB、もしくはサーバー)から上位の時間枠のローソク足を作成し、キャッシュに保存する
 
         Parameters
         ----------
@@ -302,25 +957,29 @@ class CandleFeeder:
             ローソク足
         """
 
-        records = self._db_context.session.query(CandleOHLC) \
-            .filter(CandleOHLC.currency_pair == currency_pair) \
-            .filter(CandleOHLC.period == period) \
-            .filter(CandleOHLC.time >= range_from) \
-            .filter(CandleOHLC.time <= range_to) \
-            .order_by(asc(CandleOHLC.time)) \
-            .all()
+        # バックテストの場合は、終了日時までの上位の時間枠のローソク足をまとめて作成する
+        resample_range_to = range_to
+        if self._backtest_mode:
+            resample_range_to = max(range_to, min(
+                range_to + timedelta(minutes=Period.to_minutes(period) * (self._cache_bar_count - 1)),
+                self._datetime_to + timedelta(minutes=Period.to_minutes(period))
+            ))
 
-        return {
-            "times": list(map(lambda x: x.time, records)),
-            "opens": numpy.array(list(map(lambda x: float(str(x.open)), records))),
-            "highs": numpy.array(list(map(lambda x: float(str(x.high)), records))),
-            "lows": numpy.array(list(map(lambda x: float(str(x.low)), records))),
-            "closes": numpy.array(list(map(lambda x: float(str(x.close)), records))),
-        }
+        # 取得範囲の最初の足から最後の足の終わりまでの、下位の時間枠のローソク足を取得する
+        source_range_from = Period.floor_datetime(range_from, period)
+        source_range_to = Period.floor_datetime(resample_range_to, period) \
+            + timedelta(minutes=Period.to_minutes(period) - Period.to_minutes(self._resample_period))
+        source_ohlcs = self._get_ohlcs_by_chunk(currency_pair, self._resample_period, source_range_from, source_range_to)
 
-    def _save_ohlcs_to_local(self, currency_pair: str, period: str, ohlcs: dict):
+        # 上位の時間枠に集約し、キャッシュに保存する
+        self._save_ohlcs_to_local(currency_pair, period, CandleResampler.resample(source_ohlcs, period))
+        self._candle_store.add_coverage(currency_pair, period, source_range_from, source_range_to)
+
+        return self._get_ohlcs_from_local(currency_pair, period, range_from, range_to)
+
+    def _get_ohlcs_from_local(self, currency_pair: str, period: str, range_from: datetime, range_to: datetime) -> dict:
         """
-        ローカルDBにローソク足を保存する
+        キャッシュからローソク足を取得する
 
         Parameters
         ----------
@@ -328,39 +987,34 @@ class CandleFeeder:
             通貨ペア("btc_jpy", etc.)
         period : str
             時間枠("1m", "5m", "15m", "30m", "1h", "4h", "8h", "12h", "1d", "1w")
-        ohlcs : dict
+        range_from : datetime
+            取得開始日時
+        range_to : datetime
+            取得終了日時
+
+        Returns
+        -------
+        dict
             ローソク足
         """
 
-        # ローカルDBにローソク足を保存する
-        for idx, item in enumerate(ohlcs["times"]):
+        return self._candle_store.get_ohlcs(currency_pair, period, range_from, range_to)
 
-            # ローカルDBにUPSERTする
-            record = self._db_context.session.query(CandleOHLC) \
-                .filter(CandleOHLC.currency_pair == currency_pair) \
-                .filter(CandleOHLC.period == period) \
-                .filter(CandleOHLC.time == item) \
-                .first()
+    def _save_ohlcs_to_local(self, currency_pair: str, period: str, ohlcs: dict):
+        """
+        キャッシュにローソク足を保存する
 
-            if record:
-                record.open = ohlcs["opens"][idx]
-                record.high = ohlcs["highs"][idx]
-                record.low = ohlcs["lows"][idx]
-                record.close = ohlcs["closes"][idx]
-            else:
-                record = CandleOHLC(
-                    currency_pair=currency_pair,
-                    period=period,
-                    time=ohlcs["times"][idx],
-                    open=ohlcs["opens"][idx],
-                    high=ohlcs["highs"][idx],
-                    low=ohlcs["lows"][idx],
-                    close=ohlcs["closes"][idx]
-                )
-                self._db_context.session.add(record)
+        Parameters
+        ----------
+        currency_pair : str
+            通貨ペア("btc_jpy", etc.)
+        period : str
+            時間枠("1m", "5m", "15m", "30m", "1h", "4h", "8h", "12h", "1d", "1w")
+        ohlcs : dict
+            ローソク足
+        """
 
-        self._db_context.session.flush()
-        self._db_context.session.commit()
+        self._candle_store.save_ohlcs(currency_pair, period, ohlcs)
 
     def _get_ohlcs_from_server(self, currency_pair: str, period: str, range_from: datetime, range_to: datetime) -> dict:
         """
@@ -383,16 +1037,12 @@ class CandleFeeder:
             ローソク足
         """
 
-        if self._server_request_latest:
-            while self._server_request_latest + timedelta(seconds=self._server_request_span) > datetime.now():
-                time.sleep(0.03)
-        self._server_request_latest = datetime.now()
-
         try_count = 0
         response = None
         while True:
             try:
                 try_count += 1
+                self._rate_limiter.acquire()
                 response = self._chart_api.get_ohlc(currency_pair, Period.to_zaifapi_str(period), range_from, range_to)
                 break
             except Exception as ex:
@@ -400,20 +1050,87 @@ class CandleFeeder:
                     raise ex
                 time.sleep(1.0)
 
+        return self.convert_response(response)
+
+    @staticmethod
+    def convert_response(response: dict) -> dict:
+        """
+        サーバーのレスポンス(get_ohlcの戻り値)をローソク足に変換する
+
+        Parameters
+        ----------
+        response : dict
+            サーバーのレスポンス
+
+        Returns
+        -------
+        dict
+            ローソク足
+        """
+        ohlc_data = response["ohlc_data"]
+        unixtimes = numpy.fromiter((x["time"] for x in ohlc_data), dtype=numpy.int64, count=len(ohlc_data)) // 1000
         return {
-            "times": list(map(lambda x: TimeConverter.unixtime_to_datetime(int(x["time"]/1000)), response["ohlc_data"])),
-            "opens": numpy.array(list(map(lambda x: x["open"], response["ohlc_data"]))),
-            "highs": numpy.array(list(map(lambda x: x["high"], response["ohlc_data"]))),
-            "lows": numpy.array(list(map(lambda x: x["low"], response["ohlc_data"]))),
-            "closes": numpy.array(list(map(lambda x: x["close"], response["ohlc_data"]))),
+            "times": TimeConverter.datetime64_to_datetimes(TimeConverter.unixtimes_to_datetime64(unixtimes)),
+            "opens": numpy.fromiter((x["open"] for x in ohlc_data), dtype=numpy.float64, count=len(ohlc_data)),
+            "highs": numpy.fromiter((x["high"] for x in ohlc_data), dtype=numpy.float64, count=len(ohlc_data)),
+            "lows": numpy.fromiter((x["low"] for x in ohlc_data), dtype=numpy.float64, count=len(ohlc_data)),
+            "closes": numpy.fromiter((x["close"] for x in ohlc_data), dtype=numpy.float64, count=len(ohlc_data)),
         }
 
+    @staticmethod
+    def get_fetched_range(ohlcs: dict, range_from: datetime, range_to: datetime, response_bar_limit: int = 0) -> tuple:
+        """
+        サーバーの応答から、取得済みとして記録できる期間を取得する
+
+        応答が上限で切り詰められている可能性がある場合は、最後の足までを取得済みとします。
+        (最後の足より後は、取引所にデータが存在しないとは限らないため)
+
+        Parameters
+        ----------
+        ohlcs : dict
+            サーバーから取得したローソク足
+        range_from : datetime
+            取得開始日時
+        range_to : datetime
+            取得終了日時
+        response_bar_limit : int, optional
+            サーバーが１回の応答で返すローソク足の上限(0の場合は不明), by default 0
+
+        Returns
+        -------
+        tuple
+            取得済みの期間(開始日時, 終了日時)、記録できる期間がない場合はNone
+        """
+
+        # 足が存在しない、もしくは上限に満たない応答は、取得期間の全体が完全な応答とみなす
+        bar_count = len(ohlcs["times"])
+        if bar_count == 0 or bar_count < response_bar_limit:
+            return (range_from, range_to)
+
+        last_time = ohlcs["times"][-1]
+        if last_time < range_from:
+            return None
+        return (range_from, min(last_time, range_to))
+
     def _on_ohlc_updated(self, eargs: EventArgs):
         """
         ローソク足更新イベントを発生させます。
         """
+        self._data_version += 1
         self._ohlc_updated_eventhandler.fire(eargs)
 
+    @property
+    def resample_period(self) -> str:
+        return self._resample_period
+
+    @property
+    def rate_limiter(self) -> TokenBucket:
+        return self._rate_limiter
+
+    @property
+    def response_bar_limit(self) -> int:
+        return self._response_bar_limit
+
     @property
     def currency_pair(self) -> str:
         return self._currency_pair
@@ -434,6 +1151,46 @@ class CandleFeeder:
     def backtest_mode(self) -> bool:
         return self._backtest_mode
 
+    @property
+    def preload(self) -> bool:
+        return self._preload
+
+    @property
+    def tick_mode(self) -> TickMode:
+        return self._tick_mode
+
+    @property
+    def tick_open(self) -> float:
+        """
+        最新のティックの値幅の始点(直前のティックの価格、ローソク足の最初のティックの場合は始値)
+        """
+        return self._tick_open
+
+    @property
+    def tick_high(self) -> float:
+        """
+        最新のティックの値幅の高値(直前のティックから最新のティックまでの最高値)
+        """
+        return self._tick_high
+
+    @property
+    def tick_low(self) -> float:
+        """
+        最新のティックの値幅の安値(直前のティックから最新のティックまでの最安値)
+        """
+        return self._tick_low
+
+    @property
+    def precompute(self) -> bool:
+        return self._precompute
+
+    @property
+    def preloaded_cursor(self) -> int:
+        """
+        最新のローソク足の、先読みしたローソク足での位置(先読みしていない場合はNone)
+        """
+        return self._preloaded_cursor
+
     @property
     def datetime_from(self) -> datetime:
         return self._datetime_from
@@ -446,6 +1203,24 @@ class CandleFeeder:
     def datetime_cursor(self) -> datetime:
         return self._datetime_cursor
 
+    @property
+    def candle_store(self) -> CandleStore:
+        return self._candle_store
+
+    @property
+    def data_version(self) -> int:
+        """
+        ローソク足が更新されるたびに加算されるデータバージョン
+        """
+        return self._data_version
+
+    @property
+    def indicator_graph(self) -> IndicatorGraph:
+        """
+        テクニカルインディケーターの計算処理の依存関係グラフ
+        """
+        return self._indicator_graph
+
     @property
     def ohlc_updated_eventhandler(self) -> EventHandler:
         """
@@ -454,15 +1229,184 @@ class CandleFeeder:
         return self._ohlc_updated_eventhandler
 
 
+class AsyncCandleFeeder(CandleFeeder):
+    """
+    ローソク足を非同期に供給します。(リアルタイムモード専用)
+
+    サーバーへのリクエストはスレッドプールで実行され、待機中もイベントループを止めないため、
+    １つのイベントループで複数の通貨ペア・時間枠のフィーダーを同時に更新できます。
+
+    example:
+        async def watch(currency_pair, period):
+            feeder = await AsyncCandleFeeder.create(currency_pair, period, 200)
+            async for feeder in feeder.subscribe(2.0):
+                print(currency_pair, period, feeder.get_prices()[-1])
+
+        async def main():
+            await asyncio.gather(watch("btc_jpy", "1m"), watch("eth_jpy", "5m"))
+
+        asyncio.run(main())
+    """
+
+    def __init__(self, currency_pair: str, period: str, bar_count: int, candle_store: CandleStore = None, rate_limiter: TokenBucket = None,
+                 chart_api: object = None):
+        """
+        最初のローソク足は取得されないため、インディケーターを作成する前にgo_nextを実行するか、
+        createで作成してください。
+
+        Parameters
+        ----------
+        currency_pair : str
+            通貨ペア("btc_jpy", etc.)
+        period : str
+            時間枠("1m", "5m", "15m", "30m", "1h", "4h", "8h", "12h", "1d", "1w")
+        bar_count : int
+            ローソク足の本数
+        candle_store : CandleStore, optional
+            ローソク足のキャッシュ(未指定の場合はローカルDB), by default None
+        rate_limiter : TokenBucket, optional
+            サーバーへのリクエストの頻度制限(未指定の場合はプロセス全体で共有), by default None
+        chart_api : object, optional
+            ローソク足を取得するAPI(get_ohlcを実装したもの、未指定の場合はzaifのAPI), by default None
+        """
+        super().__init__(currency_pair, period, bar_count, candle_store=candle_store, rate_limiter=rate_limiter, chart_api=chart_api)
+
+    @classmethod
+    async def create(cls, currency_pair: str, period: str, bar_count: int, candle_store: CandleStore = None, rate_limiter: TokenBucket = None,
+                     chart_api: object = None) -> "AsyncCandleFeeder":
+        """
+        フィーダーを作成し、最初のローソク足を取得する
+
+        Returns
+        -------
+        AsyncCandleFeeder
+            フィーダー
+        """
+        feeder = cls(currency_pair, period, bar_count, candle_store, rate_limiter, chart_api)
+        await feeder.go_next()
+        return feeder
+
+    async def go_next(self) -> bool:
+        """
+        次のローソク足を取得する
+
+        Returns
+        -------
+        bool
+            取得に成功した場合True、失敗した場合False
+        """
+
+        # ローソク足の取得範囲を計算する
+        previous_time, range_from, range_to = self._get_realtime_range()
+
+        # サーバーが過去のローソク足を返す場合の対策
+        try_count = 0
+        while True:
+
+            # サーバーからローソク足を取得する
+            ohlcs = await self._get_ohlcs_from_server_async(self._currency_pair, self._period, range_from, range_to)
+
+            try_count += 1
+            if self._update_realtime_ohlcs(ohlcs, previous_time):
+                break
+            else:
+                self._logger.warning("server response time is wrong.")
+                if try_count > 100:
+                    raise Exception("server response time is wrong.")
+                await asyncio.sleep(1.0)
+
+        # 前回の取得からの値動きは分からないため、最新の価格をティックの値幅とする
+        self._tick_open = self._tick_high = self._tick_low = float(self._ohlcs.closes[-1])
+
+        # ローソク足更新イベントを実行する
+        self._on_ohlc_updated(EventArgs())
+
+        return True
+
+    async def subscribe(self, interval: float = 2.0):
+        """
+        一定間隔でローソク足を取得し、取得するたびにフィーダーを返す(非同期イテレーター)
+
+        Parameters
+        ----------
+        interval : float, optional
+            ローソク足を取得する間隔(秒), by default 2.0
+        """
+        while True:
+            await self.go_next()
+            yield self
+            await asyncio.sleep(interval)
+
+    def _load_initial_ohlcs(self):
+        """
+        最初のローソク足は非同期に取得するため、作成時には取得しない
+        """
+        pass
+
+    async def _get_ohlcs_from_server_async(self, currency_pair: str, period: str, range_from: datetime, range_to: datetime) -> dict:
+        """
+        サーバーからローソク足を非同期に取得する
+
+        Parameters
+        ----------
+        currency_pair : str
+            通貨ペア("btc_jpy", etc.)
+        period : str
+            時間枠("1m", "5m", "15m", "30m", "1h", "4h", "8h", "12h", "1d", "1w")
+        range_from : datetime
+            取得開始日時
+        range_to : datetime
+            取得終了日時
+
+        Returns
+        -------
+        dict
+            ローソク足
+        """
+
+        loop = asyncio.get_running_loop()
+        try_count = 0
+        response = None
+        while True:
+            try:
+                try_count += 1
+                await self._rate_limiter.acquire_async()
+                response = await loop.run_in_executor(
+                    None, self._chart_api.get_ohlc, currency_pair, Period.to_zaifapi_str(period), range_from, range_to
+                )
+                break
+            except Exception as ex:
+                if try_count > 100:
+                    raise ex
+                await asyncio.sleep(1.0)
+
+        return self.convert_response(response)
+
+
 class Candle:
     """
     ローソク足を表します。
+
+    use_array=Trueの場合は、ローソク足の価格をリストに変換せず、
+    フィーダーの配列を参照する読み取り専用のnumpy.ndarrayとして返します。(更新の度の複製が不要になります)
+    candle.closes[-1]などのインデックスによる参照はリストと同じように使用できます。
+    (要素はnumpy.float64(floatのサブクラス)になります)
     """
 
-    def __init__(self, feeder: CandleFeeder):
+    def __init__(self, feeder: CandleFeeder, use_array: bool = False):
+        """
+        Parameters
+        ----------
+        feeder : CandleFeeder
+            ローソク足のフィーダー
+        use_array : bool, optional
+            価格を読み取り専用のnumpy.ndarrayで参照する, by default False
+        """
         self._feeder = feeder
         self._feeder.ohlc_updated_eventhandler.add(self._ohlc_updated)
+        self._use_array = use_array
         self._times = []
+        self._times64 = numpy.array([], dtype="datetime64[s]")
         self._opens = []
         self._closes = []
         self._lows = []
@@ -472,10 +1416,25 @@ class Candle:
     def _load(self):
         candles = self._feeder.get_ohlcs()
         self._times = candles["times"]
-        self._opens = candles["opens"].tolist()
-        self._closes = candles["closes"].tolist()
-        self._lows = candles["lows"].tolist()
-        self._highs = candles["highs"].tolist()
+        self._times64 = self._to_readonly(self._feeder.get_times64())
+        if self._use_array:
+            self._opens = self._to_readonly(candles["opens"])
+            self._closes = self._to_readonly(candles["closes"])
+            self._lows = self._to_readonly(candles["lows"])
+            self._highs = self._to_readonly(candles["highs"])
+        else:
+            self._opens = candles["opens"].tolist()
+            self._closes = candles["closes"].tolist()
+            self._lows = candles["lows"].tolist()
+            self._highs = candles["highs"].tolist()
+
+    def _to_readonly(self, prices: numpy.ndarray) -> numpy.ndarray:
+        """
+        フィーダーの配列を複製せずに、読み取り専用のビューを作成します。
+        """
+        view = prices.view()
+        view.flags.writeable = False
+        return view
 
     def refresh(self):
         """
@@ -489,10 +1448,21 @@ class Candle:
         """
         self._load()
 
+    @property
+    def use_array(self) -> bool:
+        return self._use_array
+
     @property
     def times(self) -> List[datetime]:
         return self._times
 
+    @property
+    def times64(self) -> numpy.ndarray:
+        """
+        時刻(datetime64[s]の読み取り専用の配列)
+        """
+        return self._times64
+
     @property
     def opens(self) -> List[float]:
         return self._opens
@@ -2,13 +2,6 @@ import os
 from datetime import datetime, timedelta
 from typing import List, Tuple
 
-import matplotlib.pyplot as plt
-import mpl_finance as mpf
-from matplotlib import colors as mcolors
-from matplotlib.collections import LineCollection, PolyCollection
-from matplotlib.gridspec import GridSpec, GridSpecFromSubplotSpec
-from six.moves import xrange, zip
-
 from magictrader.candle import Candle
 from magictrader.indicator import Indicator
 
@@ -193,6 +186,9 @@ class Chart:
         """
         チャートを表示する
         """
+        import matplotlib.pyplot as plt
+        import mpl_finance as mpf
+        from matplotlib.gridspec import GridSpec, GridSpecFromSubplotSpec
 
         # 図表
         fig = plt.figure(figsize=(12, 6))
@@ -359,6 +355,7 @@ class Chart:
         """
         チャートの表示を更新する
         """
+        import matplotlib.pyplot as plt
 
         for window in self._windows:
 
@@ -491,6 +488,7 @@ class Chart:
         plt.pause(0.03)
 
     def wait(self, seconds: float):
+        import matplotlib.pyplot as plt
         datetime_from = datetime.now()
         while datetime_from + timedelta(seconds=seconds) > datetime.now():
             plt.pause(0.03)
@@ -499,21 +497,23 @@ class Chart:
         pass
 
     def save_as_png(self, pict_path: str):
+        import matplotlib.pyplot as plt
         plt.savefig(pict_path)
 
     def _update_candlestick2_ohlc(self, ax, lines, polys, opens, highs, lows, closes,
                                   width=4, colorup='k', colordown='r', alpha=0.75):
+        from matplotlib import colors as mcolors
 
         delta = width / 2.
         barVerts = [((i - delta, open),
                      (i - delta, close),
                      (i + delta, close),
                      (i + delta, open))
-                    for i, open, close in zip(xrange(len(opens)), opens, closes)
+                    for i, open, close in zip(range(len(opens)), opens, closes)
                     if open != -1 and close != -1]
 
         rangeSegments = [((i, low), (i, high))
-                         for i, low, high in zip(xrange(len(lows)), lows, highs)
+                         for i, low, high in zip(range(len(lows)), lows, highs)
                          if low != -1]
 
         colorup = mcolors.to_rgba(colorup, alpha)
@@ -535,3 +535,34 @@ class Chart:
         lines.set_color(colors)
         polys.set_verts(barVerts)
         polys.set_color(colors)
+
+
+class HeadlessChart(Chart):
+    """
+    画面を表示しないチャートを表すクラス
+
+    ヘッドレスモードのバックテストで使用し、実行中はmatplotlibを一切読み込みません。
+    画像として保存するときのみ、画面を持たないバックエンド(Agg)でチャートを描画します。
+    """
+
+    def show(self):
+        pass
+
+    def refresh(self):
+        pass
+
+    def wait(self, seconds: float):
+        pass
+
+    def save_as_png(self, pict_path: str):
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+
+        # 保存する時点のデータでチャートを描画する
+        for window in self._windows:
+            window.plt_indicator_left_handlers = []
+            window.plt_indicator_right_handlers = []
+        super().show()
+        plt.savefig(pict_path)
+        plt.close("all")
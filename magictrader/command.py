@@ -1,5 +1,10 @@
+import argparse
+import ast
+import importlib
 import os
 import shutil
+import sys
+from datetime import datetime
 
 
 def create_tradeterminal():
@@ -13,3 +18,185 @@ def create_tradeterminal():
     destpath = os.path.join(os.getcwd(), "mt.ini")
     if not os.path.exists(destpath):
         shutil.copy(soucepath, destpath)
+
+
+def sweep_tradeterminal():
+    """
+    パラメーターの組み合わせごとにヘッドレスバックテストを並列に実行し、結果をCSVに出力します。
+
+    example:
+        sweep_tradeterminal mytrade:MyTradeTerminal btc_jpy 1h 2019-03-01 2019-06-30 \\
+            --param atr_period=14,21,28 --param deviation=1.5,2.0 --csv sweep.csv
+    """
+
+    from magictrader.sweep import ParameterSweep
+
+    parser = argparse.ArgumentParser(description="run headless backtests for every combination of parameters.")
+    parser.add_argument("terminal", help="TradeTerminal subclass (module:Class)")
+    parser.add_argument("currency_pair", help="currency pair (btc_jpy, etc.)")
+    parser.add_argument("period", help="period (1m, 5m, 15m, 30m, 1h, 4h, 8h, 12h, 1d, 1w)")
+    parser.add_argument("datetime_from", help="backtest start date (YYYY-MM-DD)")
+    parser.add_argument("datetime_to", help="backtest end date (YYYY-MM-DD)")
+    parser.add_argument("--param", action="append", default=[], help="parameter candidates (name=value1,value2,...)")
+    parser.add_argument("--terminal-name", default="mt", help="terminal name (ini file name)")
+    parser.add_argument("--workers", type=int, default=None, help="number of processes")
+    parser.add_argument("--csv", default="sweep.csv", help="output csv file path")
+    args = parser.parse_args()
+
+    # TradeTerminalのクラスを読み込む(カレントディレクトリのモジュールを対象とする)
+    sys.path.insert(0, os.getcwd())
+    module_name, class_name = args.terminal.split(":")
+    terminal_class = getattr(importlib.import_module(module_name), class_name)
+
+    # パラメーターの候補値を解析する
+    param_grid = {}
+    for param in args.param:
+        name, values = param.split("=", 1)
+        param_grid[name] = [_parse_value(x) for x in values.split(",")]
+
+    sweep = ParameterSweep(
+        terminal_class, args.currency_pair, args.period,
+        datetime.strptime(args.datetime_from, "%Y-%m-%d"), datetime.strptime(args.datetime_to, "%Y-%m-%d"),
+        param_grid, args.terminal_name, args.workers
+    )
+    results = sweep.run()
+    sweep.save_as_csv(args.csv)
+
+    # 結果を損益の大きい順に表示する
+    for result in sorted(results, key=lambda x: x["total_profit"], reverse=True):
+        print(", ".join(["{}={}".format(k, v) for k, v in result.items()]))
+
+
+def replay_server():
+    """
+    ローカルのローソク足から、zaifのチャートAPIの応答を再現するサーバーを起動します。
+
+    example:
+        mt-replay --port 8080 --latency 0.2 --error-rate 0.05 --rate-limit 2
+        (INIファイルの[server] chart_api_url=http://127.0.0.1:8080 で接続できます)
+    """
+
+    from magictrader.inifile import INIFile
+    from magictrader.replay import ReplayChartAPI, ReplayServer
+    from magictrader.store import CandleStore
+
+    parser = argparse.ArgumentParser(description="serve zaif chart api (/history) from the local candle cache.")
+    parser.add_argument("--terminal-name", default="mt", help="terminal name (the [replay] section of the ini file is used)")
+    parser.add_argument("--host", default="127.0.0.1", help="host to listen on")
+    parser.add_argument("--port", type=int, default=8080, help="port to listen on")
+    parser.add_argument("--latency", type=float, default=None, help="response latency (seconds)")
+    parser.add_argument("--error-rate", type=float, default=None, help="probability of an error response (0.0 - 1.0)")
+    parser.add_argument("--rate-limit", type=int, default=None, help="requests per second (0: unlimited)")
+    parser.add_argument("--max-bars", type=int, default=None, help="max candles per response (0: unlimited)")
+    parser.add_argument("--csv", action="append", default=[], help="candle file (currency_pair:period:path)")
+    args = parser.parse_args()
+
+    ini_filepath = os.path.join(os.getcwd(), "{}.ini".format(args.terminal_name))
+    if not os.path.exists(ini_filepath):
+        shutil.copy(os.path.join(os.path.dirname(__file__), "template/mt.ini"), ini_filepath)
+    inifile = INIFile(ini_filepath)
+
+    chart_api = ReplayChartAPI(
+        CandleStore.create_from_ini(inifile, "replay"),
+        args.latency if args.latency is not None else inifile.get_float("replay", "latency", 0.0),
+        args.error_rate if args.error_rate is not None else inifile.get_float("replay", "error_rate", 0.0),
+        args.rate_limit if args.rate_limit is not None else inifile.get_int("replay", "rate_limit", 0),
+        max_bar_count=args.max_bars if args.max_bars is not None else inifile.get_int("replay", "max_bar_count", 0)
+    )
+    for candle_file in args.csv:
+        currency_pair, period, filepath = candle_file.split(":", 2)
+        chart_api.load_csv(currency_pair, period, filepath)
+
+    server = ReplayServer(chart_api, args.host, args.port)
+    print("replay server is running. chart_api_url={}".format(server.url))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+def prefetch_candles():
+    """
+    指定期間のローソク足をサーバーから並列に取得し、キャッシュに保存します。(中断した場合は続きから再開します)
+
+    example:
+        mt-prefetch btc_jpy,eth_jpy 1m,1h 2019-01-01 2019-06-30 --workers 4
+    """
+
+    from magictrader.inifile import INIFile
+    from magictrader.prefetch import CandlePrefetcher
+    from magictrader.ratelimit import TokenBucket
+    from magictrader.replay import ReplayChartAPI
+    from magictrader.store import CandleStore
+
+    parser = argparse.ArgumentParser(description="prefetch candles into the local cache.")
+    parser.add_argument("currency_pairs", help="currency pairs (btc_jpy,eth_jpy,...)")
+    parser.add_argument("periods", help="periods (1m,5m,15m,30m,1h,4h,8h,12h,1d,1w)")
+    parser.add_argument("datetime_from", help="start date (YYYY-MM-DD)")
+    parser.add_argument("datetime_to", help="end date (YYYY-MM-DD)")
+    parser.add_argument("--terminal-name", default="mt", help="terminal name (ini file name)")
+    parser.add_argument("--workers", type=int, default=4, help="number of concurrent requests")
+    parser.add_argument("--chunk-bars", type=int, default=1000, help="number of bars per request")
+    parser.add_argument("--progress", default=None, help="progress file path (default: <terminal name>_prefetch.json)")
+    parser.add_argument("--restart", action="store_true", help="ignore the progress file and fetch everything again")
+    parser.add_argument("--refetch", action="store_true", help="discard the cache coverage of the range and fetch it again")
+    args = parser.parse_args()
+
+    ini_filepath = os.path.join(os.getcwd(), "{}.ini".format(args.terminal_name))
+    if not os.path.exists(ini_filepath):
+        shutil.copy(os.path.join(os.path.dirname(__file__), "template/mt.ini"), ini_filepath)
+    inifile = INIFile(ini_filepath)
+
+    # サーバーへのリクエストの頻度制限を設定する
+    rate_limiter = TokenBucket.shared()
+    rate_limiter.rate = inifile.get_float("server", "request_rate", 1.0)
+    rate_limiter.capacity = inifile.get_float("server", "request_burst", 1.0)
+
+    progress_filepath = args.progress if args.progress else "{}_prefetch.json".format(args.terminal_name)
+    if (args.restart or args.refetch) and os.path.exists(progress_filepath):
+        os.remove(progress_filepath)
+
+    currency_pairs = args.currency_pairs.split(",")
+    periods = args.periods.split(",")
+    datetime_from = datetime.strptime(args.datetime_from, "%Y-%m-%d")
+    datetime_to = datetime.strptime(args.datetime_to, "%Y-%m-%d")
+    candle_store = CandleStore.create_from_ini(inifile)
+
+    # 取得済みの記録を取り消し、取引所にデータが存在しないとみなした期間も取得し直す
+    if args.refetch:
+        for currency_pair in currency_pairs:
+            for period in periods:
+                candle_store.remove_coverage(currency_pair, period, datetime_from, datetime_to)
+
+    prefetcher = CandlePrefetcher(
+        currency_pairs, periods, datetime_from, datetime_to,
+        candle_store, ReplayChartAPI.create_from_ini(inifile), rate_limiter,
+        args.chunk_bars, args.workers, progress_filepath, inifile.get_int("server", "response_bar_limit", 0)
+    )
+    report = prefetcher.run()
+
+    # キャッシュの充足状況を表示する
+    print("fetched chunks: {}, skipped (already fetched): {}, rate limit wait: {:.1f}s".format(
+        prefetcher.fetched_chunk_count, prefetcher.skipped_chunk_count, rate_limiter.total_wait_time
+    ))
+    for coverage in report:
+        print("{} {}: {:,} / {:,} bars ({:.1%}), gaps: {}".format(
+            coverage["currency_pair"], coverage["period"],
+            coverage["cached_bar_count"], coverage["expected_bar_count"], coverage["coverage"], len(coverage["gaps"])
+        ))
+        for gap_from, gap_to in coverage["gaps"][:5]:
+            print("    missing: {:%Y-%m-%d %H:%M} - {:%Y-%m-%d %H:%M} ({})".format(
+                gap_from, gap_to, "no data on exchange" if (gap_from, gap_to) in coverage["exchange_gaps"] else "not fetched"
+            ))
+        if len(coverage["gaps"]) > 5:
+            print("    ...")
+
+
+def _parse_value(value: str):
+    """
+    パラメーターの値を数値に変換します。(変換できない場合は文字列のまま)
+    """
+    try:
+        return ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        return value
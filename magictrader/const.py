@@ -7,6 +7,7 @@ class TradeMode(Enum):
     PRACTCE = "practice"
     BACKTEST = "backtest"
     FORWARDTEST = "forwardtest"
+    BACKTEST_HEADLESS = "backtest_headless"
 
 
 class CurrencyPair(Enum):
@@ -151,6 +152,18 @@ class Period(Enum):
         return bar_count
 
 
+class TickMode(Enum):
+    """
+    バックテストでローソク足１本ごとに生成するティックの粒度
+    """
+    # 終値のみ(１本につき１ティック、ストップ注文・リミット注文は高値・安値で判定する)
+    BAR = "bar"
+    # ローソク足の始値・高値・安値・終値(１本につき４ティック)
+    OHLC = "ohlc"
+    # より下位のローソク足の始値・高値・安値・終値(下位の足１本につき４ティック)
+    DETAIL = "detail"
+
+
 class AppliedPrice(Enum):
     """
     テクニカルインジケーターの計算に使用する価格
@@ -1,28 +1,60 @@
+import math
 from abc import ABCMeta, abstractmethod
+from bisect import bisect_left, bisect_right
 from datetime import datetime
 from typing import List
 
+import numpy
 import talib
 from pyti import stochastic
 
+from magictrader.cache import IndicatorNode, PrecomputedFunction
 from magictrader.candle import CandleFeeder
 from magictrader.const import AppliedPrice, ModeBAND, ModeMACD, ModeTRADESIGNAL
 from magictrader.event import EventArgs
+from magictrader.streaming import (StreamingATR, StreamingCalculator, StreamingEMA, StreamingRSI, StreamingSMA,
+                                   StreamingSTDDEV, StreamingWMA)
+
+# 計算結果が直近のtimeperiod本の価格のみで決まり、バックテストの全期間に対して１度だけ計算できるTA-Libの関数
+# (EMA、RSI、ATRなどは計算を始めた位置によって計算結果が変わり、
+#  STDDEV、BBANDSは価格が整数でも丸め誤差が計算を始めた位置によって変わるため含めません)
+_PRECOMPUTABLE_FUNCS = (talib.SMA, talib.WMA)
 
 
 class Indicator(metaclass=ABCMeta):
     """
     テクニカルインディケーターを表します。
+
+    既定では、ローソク足が更新されても再計算せずに再計算が必要であることだけを記録し(dirty)、
+    timesやpricesを参照したときに計算します。(参照されないティックの計算は省略されます)
+    lazyをFalseにすると、ローソク足が更新されるたびに計算します。
+    incrementalは、逐次計算器を作成できる(_create_calculatorを実装した)インディケーターのみ指定できます。
+
+    incrementalをTrueにすると、確定したローソク足を逐次計算器に取り込み、形成中のローソク足のみを計算します。
+    計算結果は、逐次計算器を作成した時点で取得できたローソク足から、TA-Libで先頭から計算した値と一致します。
+    SMA・WMA・STDDEVは既定の計算(表示本数+期間の本数のみでの計算)と丸め誤差の範囲で一致しますが、
+    EMA・RSI・ATRは初期値を求める位置が異なるため、既定の計算とは次の差があります。
+    - EMA・ATRの差は表示範囲の先頭ほど大きく、１本ごとにEMAは1-2/(期間+1)倍、ATRは(期間-1)/期間倍に減衰します。
+    - RSIの最新値の差は、期間14・表示本数100の場合に0.05ポイント以内です。(値動きのない間は差が減衰しません)
     """
 
-    def __init__(self, feeder: CandleFeeder, label: str):
+    def __init__(self, feeder: CandleFeeder, label: str, incremental: bool = False, lazy: bool = True):
+        if incremental and self._create_calculator() is None:
+            raise ValueError("{} doesn't support incremental mode.".format(type(self).__name__))
         self._feeder = feeder
         self._feeder.ohlc_updated_eventhandler.add(self._ohlc_updated)
         self._times = []
         self._prices = []
         self._label = label
+        self._incremental = incremental
+        self._lazy = lazy
+        self._dirty = False
+        self._calculator = None
+        self._committed_time = None
+        self._forming_time = None
         self._style = {}
         self._apply_default_style()
+        self._node = None if incremental else self._create_node()
         self._load()
 
     def _apply_default_style(self):
@@ -38,26 +70,211 @@ class Indicator(metaclass=ABCMeta):
         """
         pass
 
+    def _create_node(self) -> IndicatorNode:
+        """
+        インディケーターの計算処理を、フィーダーの依存関係グラフにノードとして登録します。
+        (グラフで計算しないインディケーターはNoneを返します)
+        """
+        return None
+
+    def _add_price_node(self, extra_bar_count: int, applied_price: AppliedPrice) -> IndicatorNode:
+        """
+        ローソク足の価格をノードとして登録します。
+        (キーには、ハッシュの計算が遅いEnumではなく価格種の値を使用します)
+        """
+        return self._feeder.indicator_graph.add_node(
+            ("prices", extra_bar_count, applied_price.value), self._feeder.get_prices, (), (extra_bar_count, applied_price)
+        )
+
+    def _add_node(self, func, extra_bar_count: int, applied_prices: tuple, *args) -> IndicatorNode:
+        """
+        ローソク足の価格を引数とする計算処理(TA-Libの関数など)をノードとして登録します。
+
+        同じ関数・パラメーター・価格種のノードは共有されるため、ローソク足が更新されるまでの間、
+        計算は１度だけ実行されます。
+        フィーダーのprecomputeが有効な場合、全期間に対して１度だけ計算できる関数は、
+        全期間の計算結果のスライスとして求めます。
+
+        Parameters
+        ----------
+        func : callable
+            計算処理
+        extra_bar_count : int
+            計算処理が追加で必要とするローソク足の本数
+        applied_prices : tuple
+            計算処理に渡す価格種
+        args : tuple
+            計算処理に渡すパラメーター(価格に続く位置引数)
+
+        Returns
+        -------
+        IndicatorNode
+            ノード
+        """
+        dependencies = [self._add_price_node(extra_bar_count, x) for x in applied_prices]
+        key = (func, extra_bar_count, tuple(x.value for x in applied_prices), args)
+        if self._feeder.precompute and func in _PRECOMPUTABLE_FUNCS:
+            feeder = self._feeder
+            func = PrecomputedFunction(func, args[0] - 1, feeder.get_preloaded_prices(applied_prices[0]), lambda: feeder.preloaded_cursor)
+        return self._feeder.indicator_graph.add_node(key, func, dependencies, args)
+
+    def _evaluate(self, node: IndicatorNode = None) -> object:
+        """
+        ノード(未指定の場合はインディケーターのノード)の計算結果を取得します。
+
+        Returns
+        -------
+        object
+            計算結果(呼び出し元で変更しないでください)
+        """
+        return self._feeder.indicator_graph.get_value(node if node is not None else self._node, self._feeder.data_version)
+
+    def _compute(self, func, extra_bar_count: int, applied_prices: tuple, *args):
+        """
+        ローソク足の価格を引数として計算処理(TA-Libの関数など)を呼び出します。
+        (_add_nodeで登録したノードの計算結果を返します)
+
+        Returns
+        -------
+        object
+            計算結果(呼び出し元で変更しないでください)
+        """
+        return self._evaluate(self._add_node(func, extra_bar_count, applied_prices, *args))
+
+    def _create_calculator(self) -> StreamingCalculator:
+        """
+        インクリメンタルモードで使用する逐次計算器を作成します。
+        (逐次計算に対応しないインディケーターはNoneを返します)
+        """
+        return None
+
+    def _load_incremental(self, extra_bar_count: int, *applied_prices: AppliedPrice):
+        """
+        テクニカルインディケーターを逐次計算で読み込みます。
+
+        前回から形成中でなくなったローソク足のみを確定させ、形成中のローソク足は最新値のみを計算します。
+        確定済みのローソク足の位置が特定できない場合は、取得できる全てのローソク足から計算し直します。
+
+        Parameters
+        ----------
+        extra_bar_count : int
+            計算し直す場合に追加で必要とするローソク足の本数
+        applied_prices : AppliedPrice
+            逐次計算器に渡す価格種
+        """
+
+        times = self._feeder.get_times(extra_bar_count)
+
+        # 形成中のローソク足が変わっていない場合は、最新値のみを計算する
+        if self._calculator is not None and self._forming_time == times[-1] \
+                and (len(times) < 2 or self._committed_time == times[-2]):
+            self._prices[-1] = self._calculator.peek(*[float(self._feeder.get_prices(0, x)[-1]) for x in applied_prices])
+            return
+
+        columns = [self._feeder.get_prices(extra_bar_count, x).tolist() for x in applied_prices]
+
+        # 確定済みのローソク足の位置を求める
+        start_idx = 0
+        if self._calculator is not None and self._committed_time is not None:
+            start_idx = bisect_right(times, self._committed_time)
+            if start_idx == 0 or start_idx >= len(times) or times[start_idx - 1] != self._committed_time:
+                self._calculator = None
+
+        # 位置が特定できない場合は計算し直す
+        rebuild = self._calculator is None
+        if rebuild:
+            self._calculator = self._create_calculator()
+            self._committed_time = None
+            start_idx = 0
+
+        # 形成中でなくなったローソク足を確定させる
+        committed_prices = []
+        for idx in range(start_idx, len(times) - 1):
+            committed_prices.append(self._calculator.push(*[x[idx] for x in columns]))
+
+        # 形成中のローソク足の値を計算する
+        forming_price = self._calculator.peek(*[x[-1] for x in columns])
+
+        if rebuild or committed_prices:
+            self._committed_time = times[-2] if len(times) >= 2 else None
+            self._forming_time = times[-1]
+            self._times = self._feeder.get_times()
+            prices = ([] if rebuild else self._prices[:-1]) + committed_prices + [forming_price]
+            bar_count = len(self._times)
+            self._prices = [math.nan] * (bar_count - len(prices)) + prices[-bar_count:]
+        else:
+            self._prices[-1] = forming_price
+
     def refresh(self):
         """
         テクニカルインディケーターを再読み込みします。
         """
+        self._dirty = False
         self._load()
 
     def _ohlc_updated(self, sender: object, eargs: EventArgs):
         """
         ローソク足が更新されたときに発生します。
         """
-        self._load()
+        if self._lazy:
+            self._dirty = True
+        else:
+            self._load()
+
+    def _load_if_dirty(self):
+        """
+        ローソク足が更新されている場合は、テクニカルインディケーターを再読み込みします。
+        """
+        if self._dirty:
+            self._dirty = False
+            self._load()
 
     @property
     def times(self) -> List[datetime]:
+        self._load_if_dirty()
         return self._times
 
+    @property
+    def times64(self) -> numpy.ndarray:
+        """
+        時刻(timesと同じ時刻のdatetime64[s]の配列)
+        """
+        times = self.times
+        times64 = self._feeder.get_times64()
+        return times64[len(times64) - len(times):]
+
     @property
     def prices(self) -> List[float]:
+        self._load_if_dirty()
         return self._prices
 
+    @property
+    def lazy(self) -> bool:
+        """
+        参照したときに計算するかどうか(Falseの場合はローソク足が更新されるたびに計算する)
+        """
+        return self._lazy
+
+    @lazy.setter
+    def lazy(self, value: bool):
+        self._lazy = value
+        if not value:
+            self._load_if_dirty()
+
+    @property
+    def dirty(self) -> bool:
+        """
+        ローソク足が更新され、再計算が必要かどうか
+        """
+        return self._dirty
+
+    @property
+    def incremental(self) -> bool:
+        """
+        逐次計算で読み込むかどうか
+        """
+        return self._incremental
+
     @property
     def label(self) -> str:
         return self._label
@@ -82,10 +299,13 @@ class Indicator(metaclass=ABCMeta):
 class TRADESIGNAL(Indicator):
     """
     売買シグナル
+
+    シグナルは日時をキーとして保持され、表示範囲外になったシグナルもsignalsで参照できます。
     """
 
     def __init__(self, feeder: CandleFeeder, mode_tradesignal: ModeTRADESIGNAL, label: str = None):
         self._mode_tradesignal = mode_tradesignal
+        self._signals = {}
         if label is None:
             if self._mode_tradesignal == ModeTRADESIGNAL.BUY_OPEN:
                 label = "buy open"
@@ -112,14 +332,65 @@ class TRADESIGNAL(Indicator):
     def _load(self):
         prev_times = self._times
         prev_prices = self._prices
+        bar_count = self._feeder.bar_count
 
         self._times = self._feeder.get_times()
-        self._prices = [None] * self._feeder.bar_count
 
-        for cur_idx, cur_time in enumerate(self._times):
-            for prev_idx, prev_time in enumerate(prev_times):
-                if prev_time == cur_time:
-                    self.prices[cur_idx] = prev_prices[prev_idx]
+        # ローソク足が進んでいない場合(ティックの更新)は、そのまま使用する
+        if len(prev_times) > 0 and len(self._times) == len(prev_times) \
+                and self._times[0] == prev_times[0] and self._times[-1] == prev_times[-1]:
+            self._times = prev_times
+            return
+
+        # 表示範囲が進んだ本数だけずらし、新しいローソク足のシグナルを追加する
+        shift = bisect_left(prev_times, self._times[0]) if len(prev_times) > 0 and len(self._times) > 0 else 0
+        keep_count = len(prev_times) - shift
+        if len(prev_times) == len(self._times) == bar_count and 0 < keep_count < bar_count \
+                and prev_times[shift] == self._times[0] and prev_times[-1] == self._times[keep_count - 1]:
+            self._prices = prev_prices[shift:] + [self._signals.get(x) for x in self._times[keep_count:]]
+
+        # それ以外の場合(初回、ローソク足の欠落等)は、全てのローソク足のシグナルを読み込む
+        else:
+            self._prices = [self._signals.get(x) for x in self._times] + [None] * (bar_count - len(self._times))
+
+    def set_signal(self, time: datetime, price: float):
+        """
+        シグナルを設定する
+
+        Parameters
+        ----------
+        time : datetime
+            シグナルの日時(ローソク足の日時)
+        price : float
+            シグナルの価格
+        """
+        self._signals[time] = price
+        idx = bisect_left(self._times, time)
+        if idx < len(self._times) and self._times[idx] == time:
+            self._prices[idx] = price
+
+    def get_signal(self, time: datetime) -> float:
+        """
+        シグナルを取得する
+
+        Parameters
+        ----------
+        time : datetime
+            シグナルの日時(ローソク足の日時)
+
+        Returns
+        -------
+        float
+            シグナルの価格(シグナルがない場合はNone)
+        """
+        return self._signals.get(time)
+
+    @property
+    def signals(self) -> dict:
+        """
+        全てのシグナル(日時をキーとする価格、表示範囲外のシグナルを含む)
+        """
+        return self._signals
 
 
 class HLine(Indicator):
@@ -145,10 +416,10 @@ class SMA(Indicator):
     """
 
     def __init__(self, feeder: CandleFeeder, period: int, label: str = "sma",
-                 applied_price: AppliedPrice = AppliedPrice.CLOSE):
+                 applied_price: AppliedPrice = AppliedPrice.CLOSE, incremental: bool = False, lazy: bool = True):
         self._period = period
         self._applied_price = applied_price
-        super().__init__(feeder, label)
+        super().__init__(feeder, label, incremental, lazy)
 
     def _apply_default_style(self):
         if 1 <= self._period <= 12:
@@ -160,10 +431,18 @@ class SMA(Indicator):
         else:
             super()._apply_default_style()
 
+    def _create_calculator(self) -> StreamingCalculator:
+        return StreamingSMA(self._period)
+
+    def _create_node(self) -> IndicatorNode:
+        return self._add_node(talib.SMA, self._period, (self._applied_price,), self._period)
+
     def _load(self):
+        if self._incremental:
+            self._load_incremental(self._period, self._applied_price)
+            return
         self._times = self._feeder.get_times()
-        prices = self._feeder.get_prices(self._period, self._applied_price)
-        prices = talib.SMA(prices, self._period)
+        prices = self._evaluate()
         self._prices = prices[-self._feeder.bar_count:].tolist()
 
 
@@ -173,10 +452,10 @@ class EMA(Indicator):
     """
 
     def __init__(self, feeder: CandleFeeder, period: int, label: str = "ema",
-                 applied_price: AppliedPrice = AppliedPrice.CLOSE):
+                 applied_price: AppliedPrice = AppliedPrice.CLOSE, incremental: bool = False, lazy: bool = True):
         self._period = period
         self._applied_price = applied_price
-        super().__init__(feeder, label)
+        super().__init__(feeder, label, incremental, lazy)
 
     def _apply_default_style(self):
         if 1 <= self._period <= 12:
@@ -188,10 +467,18 @@ class EMA(Indicator):
         else:
             super()._apply_default_style()
 
+    def _create_calculator(self) -> StreamingCalculator:
+        return StreamingEMA(self._period)
+
+    def _create_node(self) -> IndicatorNode:
+        return self._add_node(talib.EMA, self._period, (self._applied_price,), self._period)
+
     def _load(self):
+        if self._incremental:
+            self._load_incremental(self._period, self._applied_price)
+            return
         self._times = self._feeder.get_times()
-        prices = self._feeder.get_prices(self._period, self._applied_price)
-        prices = talib.EMA(prices, self._period)
+        prices = self._evaluate()
         self._prices = prices[-self._feeder.bar_count:].tolist()
 
 
@@ -201,10 +488,10 @@ class WMA(Indicator):
     """
 
     def __init__(self, feeder: CandleFeeder, period: int, label: str = "ema",
-                 applied_price: AppliedPrice = AppliedPrice.CLOSE):
+                 applied_price: AppliedPrice = AppliedPrice.CLOSE, incremental: bool = False, lazy: bool = True):
         self._period = period
         self._applied_price = applied_price
-        super().__init__(feeder, label)
+        super().__init__(feeder, label, incremental, lazy)
 
     def _apply_default_style(self):
         if 1 <= self._period <= 12:
@@ -216,10 +503,18 @@ class WMA(Indicator):
         else:
             super()._apply_default_style()
 
+    def _create_calculator(self) -> StreamingCalculator:
+        return StreamingWMA(self._period)
+
+    def _create_node(self) -> IndicatorNode:
+        return self._add_node(talib.WMA, self._period, (self._applied_price,), self._period)
+
     def _load(self):
+        if self._incremental:
+            self._load_incremental(self._period, self._applied_price)
+            return
         self._times = self._feeder.get_times()
-        prices = self._feeder.get_prices(self._period, self._applied_price)
-        prices = talib.WMA(prices, self._period)
+        prices = self._evaluate()
         self._prices = prices[-self._feeder.bar_count:].tolist()
 
 
@@ -229,19 +524,21 @@ class ENVELOPE(Indicator):
     """
 
     def __init__(self, feeder: CandleFeeder, period: int, deviation: float,
-                 label: str = "envelope", applied_price: AppliedPrice = AppliedPrice.CLOSE):
+                 label: str = "envelope", applied_price: AppliedPrice = AppliedPrice.CLOSE, lazy: bool = True):
         self._period = period
         self._deviation = deviation
         self._applied_price = applied_price
-        super().__init__(feeder, label)
+        super().__init__(feeder, label, lazy=lazy)
 
     def _apply_default_style(self):
         self.style = {"linestyle": "dashdot", "color": "grey", "linewidth": 0.5, "alpha": 1}
 
+    def _create_node(self) -> IndicatorNode:
+        return self._add_node(talib.SMA, self._period, (self._applied_price,), self._period)
+
     def _load(self):
         self._times = self._feeder.get_times()
-        prices = self._feeder.get_prices(self._period, self._applied_price)
-        prices = talib.SMA(prices, self._period)
+        prices = self._evaluate()
         prices = prices + (prices * self._deviation)
         self._prices = prices[-self._feeder.bar_count:].tolist()
 
@@ -252,30 +549,41 @@ class MACD(Indicator):
     """
 
     def __init__(self, feeder: CandleFeeder, fast_period: int, slow_period: int, signal_period, mode_macd: ModeMACD,
-                 label: str = "macd", applied_price: AppliedPrice = AppliedPrice.CLOSE):
+                 label: str = "macd", applied_price: AppliedPrice = AppliedPrice.CLOSE, lazy: bool = True):
         self._fast_period = fast_period
         self._slow_period = slow_period
         self._signal_period = signal_period
         self._mode_macd = mode_macd
         self._applied_price = applied_price
-        super().__init__(feeder, label)
+        super().__init__(feeder, label, lazy=lazy)
 
     def _apply_default_style(self):
         if self._mode_macd == ModeMACD.MACD:
             self.style = {"linestyle": "solid", "color": "blue", "linewidth": 1, "alpha": 1}
         elif self._mode_macd == ModeMACD.SIGNAL:
             self.style = {"linestyle": "solid", "color": "red", "linewidth": 1, "alpha": 1}
-            self.label = "macd_signal"
         else:
             super()._apply_default_style()
-            self.label = "macd_histogram"
+
+        # ラベルが既定値の場合のみ、線の種類ごとのラベルとする
+        if self.label == "macd":
+            if self._mode_macd == ModeMACD.SIGNAL:
+                self.label = "macd_signal"
+            elif self._mode_macd == ModeMACD.HISTOGRAM:
+                self.label = "macd_histogram"
+
+    def _create_node(self) -> IndicatorNode:
+        extra_bar_count = self._slow_period + self._signal_period
+        ema_fast = self._add_node(talib.EMA, extra_bar_count, (self._applied_price,), self._fast_period)
+        ema_slow = self._add_node(talib.EMA, extra_bar_count, (self._applied_price,), self._slow_period)
+        return self._feeder.indicator_graph.add_node(
+            (MACD, self._fast_period, self._slow_period, self._signal_period, self._applied_price.value),
+            MACD._calculate, (ema_fast, ema_slow), (self._signal_period,)
+        )
 
     def _load(self):
         self._times = self._feeder.get_times()
-        prices = self._feeder.get_prices(self._slow_period + self._signal_period, self._applied_price)
-        macd = talib.EMA(prices, self._fast_period) - talib.EMA(prices, self._slow_period)
-        macd_signal = talib.EMA(macd, self._signal_period)
-        macd_histogram = macd - macd_signal
+        macd, macd_signal, macd_histogram = self._evaluate()
         if self._mode_macd == ModeMACD.MACD:
             self._prices = macd[-self._feeder.bar_count:].tolist()
         elif self._mode_macd == ModeMACD.SIGNAL:
@@ -283,6 +591,47 @@ class MACD(Indicator):
         elif self._mode_macd == ModeMACD.HISTOGRAM:
             self._prices = macd_histogram[-self._feeder.bar_count:].tolist()
 
+    @staticmethod
+    def _calculate(ema_fast, ema_slow, signal_period: int) -> tuple:
+        macd = ema_fast - ema_slow
+        macd_signal = talib.EMA(macd, signal_period)
+        macd_histogram = macd - macd_signal
+        return macd, macd_signal, macd_histogram
+
+
+class MACDSet:
+    """
+    MACDのMACD・シグナル・ヒストグラムの線をまとめて表します。
+
+    各線は同じ計算結果を共有するため、MACDの計算はローソク足の更新ごとに１度だけ実行されます。
+    各線はテクニカルインディケーターとして、そのままChartWindowに登録できます。
+    """
+
+    def __init__(self, feeder: CandleFeeder, fast_period: int, slow_period: int, signal_period: int,
+                 label: str = "macd", applied_price: AppliedPrice = AppliedPrice.CLOSE, lazy: bool = True):
+        self._macd = MACD(feeder, fast_period, slow_period, signal_period, ModeMACD.MACD, "{}_macd".format(label), applied_price, lazy)
+        self._signal = MACD(feeder, fast_period, slow_period, signal_period, ModeMACD.SIGNAL, "{}_signal".format(label), applied_price, lazy)
+        self._histogram = MACD(feeder, fast_period, slow_period, signal_period, ModeMACD.HISTOGRAM, "{}_hist".format(label), applied_price, lazy)
+
+    @property
+    def macd(self) -> MACD:
+        return self._macd
+
+    @property
+    def signal(self) -> MACD:
+        return self._signal
+
+    @property
+    def histogram(self) -> MACD:
+        return self._histogram
+
+    @property
+    def lines(self) -> List[Indicator]:
+        """
+        全ての線(MACD, シグナル, ヒストグラム)
+        """
+        return [self._macd, self._signal, self._histogram]
+
 
 class RSI(Indicator):
     """
@@ -290,15 +639,23 @@ class RSI(Indicator):
     """
 
     def __init__(self, feeder: CandleFeeder, period: int, label: str = "rsi",
-                 applied_price: AppliedPrice = AppliedPrice.CLOSE):
+                 applied_price: AppliedPrice = AppliedPrice.CLOSE, incremental: bool = False, lazy: bool = True):
         self._period = period
         self._applied_price = applied_price
-        super().__init__(feeder, label)
+        super().__init__(feeder, label, incremental, lazy)
+
+    def _create_calculator(self) -> StreamingCalculator:
+        return StreamingRSI(self._period)
+
+    def _create_node(self) -> IndicatorNode:
+        return self._add_node(talib.RSI, self._period, (self._applied_price,), self._period)
 
     def _load(self):
+        if self._incremental:
+            self._load_incremental(self._period, self._applied_price)
+            return
         self._times = self._feeder.get_times()
-        prices = self._feeder.get_prices(self._period, self._applied_price)
-        prices = talib.RSI(prices, timeperiod=self._period)
+        prices = self._evaluate()
         self._prices = prices[-self._feeder.bar_count:].tolist()
 
 
@@ -308,20 +665,22 @@ class BBANDS(Indicator):
     """
 
     def __init__(self, feeder: CandleFeeder, period: int, deviation: int, mode_bbands: ModeBAND,
-                 label: str = "bbands", applied_price: AppliedPrice = AppliedPrice.CLOSE):
+                 label: str = "bbands", applied_price: AppliedPrice = AppliedPrice.CLOSE, lazy: bool = True):
         self._period = period
         self._deviation = deviation
         self._mode_band = mode_bbands
         self._applied_price = applied_price
-        super().__init__(feeder, label)
+        super().__init__(feeder, label, lazy=lazy)
 
     def _apply_default_style(self):
         self.style = {"linestyle": "solid", "color": "magenta", "linewidth": 1, "alpha": 0.1}
 
+    def _create_node(self) -> IndicatorNode:
+        return self._add_node(talib.BBANDS, self._period, (self._applied_price,), self._period, self._deviation, self._deviation, 0)
+
     def _load(self):
         self._times = self._feeder.get_times()
-        prices = self._feeder.get_prices(self._period, self._applied_price)
-        prices = talib.BBANDS(prices, timeperiod=self._period, nbdevup=self._deviation, nbdevdn=self._deviation, matype=0)
+        prices = self._evaluate()
         if self._mode_band == ModeBAND.UPPER:
             self._prices = prices[0][-self._feeder.bar_count:].tolist()
         elif self._mode_band == ModeBAND.MIDDLE:
@@ -330,25 +689,68 @@ class BBANDS(Indicator):
             self._prices = prices[2][-self._feeder.bar_count:].tolist()
 
 
+class BBANDSSet:
+    """
+    ボリンジャーバンドの上限・中央・下限の線をまとめて表します。
+
+    各線は同じ計算結果を共有するため、TA-LibのBBANDSはローソク足の更新ごとに１度だけ実行されます。
+    各線はテクニカルインディケーターとして、そのままChartWindowに登録できます。
+    """
+
+    def __init__(self, feeder: CandleFeeder, period: int, deviation: int,
+                 label: str = "bbands", applied_price: AppliedPrice = AppliedPrice.CLOSE, lazy: bool = True):
+        self._upper = BBANDS(feeder, period, deviation, ModeBAND.UPPER, "{}_upper".format(label), applied_price, lazy)
+        self._middle = BBANDS(feeder, period, deviation, ModeBAND.MIDDLE, "{}_middle".format(label), applied_price, lazy)
+        self._lower = BBANDS(feeder, period, deviation, ModeBAND.LOWER, "{}_lower".format(label), applied_price, lazy)
+
+    @property
+    def upper(self) -> BBANDS:
+        return self._upper
+
+    @property
+    def middle(self) -> BBANDS:
+        return self._middle
+
+    @property
+    def lower(self) -> BBANDS:
+        return self._lower
+
+    @property
+    def lines(self) -> List[Indicator]:
+        """
+        全ての線(上限, 中央, 下限)
+        """
+        return [self._upper, self._middle, self._lower]
+
+
 class STDDEV(Indicator):
     """
     標準偏差を表します。
     """
 
     def __init__(self, feeder: CandleFeeder, period: int, deviation: int,
-                 label: str = "stddev", applied_price: AppliedPrice = AppliedPrice.CLOSE):
+                 label: str = "stddev", applied_price: AppliedPrice = AppliedPrice.CLOSE, incremental: bool = False,
+                 lazy: bool = True):
         self._period = period
         self._deviation = deviation
         self._applied_price = applied_price
-        super().__init__(feeder, label)
+        super().__init__(feeder, label, incremental, lazy)
 
     def _apply_default_style(self):
         self.style = {"linestyle": "solid", "color": "purple", "linewidth": 1, "alpha": 1}
 
+    def _create_calculator(self) -> StreamingCalculator:
+        return StreamingSTDDEV(self._period, self._deviation)
+
+    def _create_node(self) -> IndicatorNode:
+        return self._add_node(talib.STDDEV, self._period, (self._applied_price,), self._period, self._deviation)
+
     def _load(self):
+        if self._incremental:
+            self._load_incremental(self._period, self._applied_price)
+            return
         self._times = self._feeder.get_times()
-        prices = self._feeder.get_prices(self._period, self._applied_price)
-        prices = talib.STDDEV(prices, timeperiod=self._period, nbdev=self._deviation)
+        prices = self._evaluate()
         self._prices = prices[-self._feeder.bar_count:].tolist()
 
 
@@ -357,9 +759,9 @@ class ADX(Indicator):
     ADX(修正移動平均)を表します。
     """
 
-    def __init__(self, feeder: CandleFeeder, period: int, label: str = "adx"):
+    def __init__(self, feeder: CandleFeeder, period: int, label: str = "adx", lazy: bool = True):
         self._period = period
-        super().__init__(feeder, label)
+        super().__init__(feeder, label, lazy=lazy)
 
     def _apply_default_style(self):
         if 1 <= self._period <= 12:
@@ -371,12 +773,13 @@ class ADX(Indicator):
         else:
             super()._apply_default_style()
 
+    def _create_node(self) -> IndicatorNode:
+        return self._add_node(talib.ADX, self._feeder.bar_count, (AppliedPrice.HIGH, AppliedPrice.LOW, AppliedPrice.CLOSE),
+                              self._period)
+
     def _load(self):
         self._times = self._feeder.get_times()
-        highs = self._feeder.get_prices(self._feeder.bar_count, AppliedPrice.HIGH)
-        lows = self._feeder.get_prices(self._feeder.bar_count, AppliedPrice.LOW)
-        closes = self._feeder.get_prices(self._feeder.bar_count, AppliedPrice.CLOSE)
-        prices = talib.ADX(high=highs, low=lows, close=closes, timeperiod=self._period)
+        prices = self._evaluate()
         self._prices = prices[-self._feeder.bar_count:].tolist()
 
 
@@ -385,9 +788,9 @@ class ATR(Indicator):
     ATR(Average True Range)を表します。
     """
 
-    def __init__(self, feeder: CandleFeeder, period: int, label: str = "atr"):
+    def __init__(self, feeder: CandleFeeder, period: int, label: str = "atr", incremental: bool = False, lazy: bool = True):
         self._period = period
-        super().__init__(feeder, label)
+        super().__init__(feeder, label, incremental, lazy)
 
     def _apply_default_style(self):
         if 1 <= self._period <= 12:
@@ -399,12 +802,19 @@ class ATR(Indicator):
         else:
             super()._apply_default_style()
 
+    def _create_calculator(self) -> StreamingCalculator:
+        return StreamingATR(self._period)
+
+    def _create_node(self) -> IndicatorNode:
+        return self._add_node(talib.ATR, self._feeder.bar_count, (AppliedPrice.HIGH, AppliedPrice.LOW, AppliedPrice.CLOSE),
+                              self._period)
+
     def _load(self):
+        if self._incremental:
+            self._load_incremental(self._period, AppliedPrice.HIGH, AppliedPrice.LOW, AppliedPrice.CLOSE)
+            return
         self._times = self._feeder.get_times()
-        highs = self._feeder.get_prices(self._feeder.bar_count, AppliedPrice.HIGH)
-        lows = self._feeder.get_prices(self._feeder.bar_count, AppliedPrice.LOW)
-        closes = self._feeder.get_prices(self._feeder.bar_count, AppliedPrice.CLOSE)
-        prices = talib.ATR(highs, lows, closes, self._period)
+        prices = self._evaluate()
         self._prices = prices[-self._feeder.bar_count:].tolist()
 
 
@@ -414,35 +824,74 @@ class ATRBAND(Indicator):
     """
 
     def __init__(self, feeder: CandleFeeder, wma_period: int, atr_period: int,
-                 deviation: int, mode_band: ModeBAND, label: str = "atr_band"):
+                 deviation: int, mode_band: ModeBAND, label: str = "atr_band", lazy: bool = True):
         self._wma_period = wma_period
         self._atr_period = atr_period
         self._deviation = deviation
         self._mode_band = mode_band
-        super().__init__(feeder, label)
+        super().__init__(feeder, label, lazy=lazy)
 
     def _apply_default_style(self):
         self.style = {"linestyle": "solid", "color": "magenta", "linewidth": 1, "alpha": 0.3}
 
+    def _create_node(self) -> IndicatorNode:
+        # WMA、ATRは同じパラメーターのWMA・ATRインディケーターと共有される
+        wma = self._add_node(talib.WMA, self._wma_period, (AppliedPrice.CLOSE,), self._wma_period)
+        atr = self._add_node(talib.ATR, self._feeder.bar_count, (AppliedPrice.HIGH, AppliedPrice.LOW, AppliedPrice.CLOSE),
+                             self._atr_period)
+        return self._feeder.indicator_graph.add_node(
+            (ATRBAND, self._wma_period, self._atr_period, self._deviation),
+            ATRBAND._calculate, (wma, atr), (self._deviation, self._feeder.bar_count)
+        )
+
     def _load(self):
         self._times = self._feeder.get_times()
-        # WMA
-        closes = self._feeder.get_prices(self._wma_period, AppliedPrice.CLOSE)
-        prices_wma = talib.WMA(closes, self._wma_period)
-        prices_wma = prices_wma[-self._feeder.bar_count:]
-        # ATR
-        highs = self._feeder.get_prices(self._feeder.bar_count, AppliedPrice.HIGH)
-        lows = self._feeder.get_prices(self._feeder.bar_count, AppliedPrice.LOW)
-        closes = self._feeder.get_prices(self._feeder.bar_count, AppliedPrice.CLOSE)
-        prices_atr = talib.ATR(highs, lows, closes, self._atr_period)
-        prices_atr = prices_atr[-self._feeder.bar_count:] * self._deviation * 1.6
-        # BAND
+        upper, middle, lower = self._evaluate()
         if self._mode_band == ModeBAND.UPPER:
-            self._prices = (prices_wma + prices_atr).tolist()
+            self._prices = upper.tolist()
         elif self._mode_band == ModeBAND.MIDDLE:
-            self._prices = prices_wma.tolist()
+            self._prices = middle.tolist()
         elif self._mode_band == ModeBAND.LOWER:
-            self._prices = (prices_wma - prices_atr).tolist()
+            self._prices = lower.tolist()
+
+    @staticmethod
+    def _calculate(prices_wma, prices_atr, deviation: int, bar_count: int) -> tuple:
+        prices_wma = prices_wma[-bar_count:]
+        prices_atr = prices_atr[-bar_count:] * deviation * 1.6
+        return prices_wma + prices_atr, prices_wma, prices_wma - prices_atr
+
+
+class ATRBANDSet:
+    """
+    ATRBANDの上限・中央・下限の線をまとめて表します。
+
+    各線は同じ計算結果(WMA、ATR、バンド)を共有し、そのままChartWindowに登録できます。
+    """
+
+    def __init__(self, feeder: CandleFeeder, wma_period: int, atr_period: int, deviation: int, label: str = "atr_band",
+                 lazy: bool = True):
+        self._upper = ATRBAND(feeder, wma_period, atr_period, deviation, ModeBAND.UPPER, "{}_upper".format(label), lazy=lazy)
+        self._middle = ATRBAND(feeder, wma_period, atr_period, deviation, ModeBAND.MIDDLE, "{}_middle".format(label), lazy=lazy)
+        self._lower = ATRBAND(feeder, wma_period, atr_period, deviation, ModeBAND.LOWER, "{}_lower".format(label), lazy=lazy)
+
+    @property
+    def upper(self) -> ATRBAND:
+        return self._upper
+
+    @property
+    def middle(self) -> ATRBAND:
+        return self._middle
+
+    @property
+    def lower(self) -> ATRBAND:
+        return self._lower
+
+    @property
+    def lines(self) -> List[Indicator]:
+        """
+        全ての線(上限, 中央, 下限)
+        """
+        return [self._upper, self._middle, self._lower]
 
 
 class SchaffTC(Indicator):
@@ -450,28 +899,35 @@ class SchaffTC(Indicator):
     Schaff Trend Cycleを表します。
     """
 
-    def __init__(self, feeder: CandleFeeder,  label: str = "schaff_tc"):
-        super().__init__(feeder, label)
+    def __init__(self, feeder: CandleFeeder,  label: str = "schaff_tc", lazy: bool = True):
+        super().__init__(feeder, label, lazy=lazy)
 
     def _apply_default_style(self):
         self.style = {"linestyle": "solid", "color": "red", "linewidth": 1, "alpha": 1}
 
+    # Default Params
+    _MA_FAST_PERIOD = 23    # MACD Fast Length
+    _MA_SLOW_PERIOD = 50    # MACD Slow Length
+
+    def _create_node(self) -> IndicatorNode:
+        ema_fast = self._add_node(talib.EMA, 200, (AppliedPrice.CLOSE,), self._MA_FAST_PERIOD)
+        ema_slow = self._add_node(talib.EMA, 200, (AppliedPrice.CLOSE,), self._MA_SLOW_PERIOD)
+        return self._feeder.indicator_graph.add_node((SchaffTC,), SchaffTC._calculate, (ema_fast, ema_slow))
+
     def _load(self):
         self._times = self._feeder.get_times()
+        prices = self._evaluate()
+        self._prices = prices[-self._feeder.bar_count:].tolist()
+
+    @staticmethod
+    def _calculate(ema_fast, ema_slow):
 
         # Default Params
-        ma_fast_period = 23     # MACD Fast Length
-        ma_slow_period = 50     # MACD Slow Length
         cycle_length = 10       # Cycle Length
         d1_length = 3           # 1st %D Length
         d2_length = 3           # 2nd %D Length
 
-        # close
-        prices_close = self._feeder.get_prices(200, AppliedPrice.CLOSE)
-
         # macd
-        ema_fast = talib.EMA(prices_close, ma_fast_period)
-        ema_slow = talib.EMA(prices_close, ma_slow_period)
         macd = ema_fast - ema_slow
 
         # stocastic from the macd
@@ -482,4 +938,4 @@ class SchaffTC(Indicator):
         k2 = stochastic.percent_k(d1, cycle_length)
         d2 = talib.EMA(k2, d2_length)
 
-        self._prices = d2[-self._feeder.bar_count:].tolist()
+        return d2
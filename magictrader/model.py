@@ -23,10 +23,27 @@ class CandleOHLC(Base):
     )
 
 
+class CandleCoverage(Base):
+    __tablename__ = 'candle_coverage'
+
+    id = Column("id", Integer, primary_key=True, autoincrement=True)
+    currency_pair = Column(Text, nullable=False)
+    period = Column(Text, nullable=False)
+    range_from = Column(TIMESTAMP, nullable=False)
+    range_to = Column(TIMESTAMP, nullable=False)
+
+    __table_args__ = (
+        Index("ix_candle_coverage_01", currency_pair, period, range_from),
+    )
+
+
 class DBContext:
 
     def __init__(self, connection_str: str = "sqlite:///mt.sqlite"):
-        engine = create_engine(connection_str, echo=False)
+        # SQLiteは作成したスレッド以外からも参照できるようにする
+        # (セッションはスレッドセーフではないため、複数のスレッドから参照する場合は呼び出し側で排他制御する)
+        connect_args = {"check_same_thread": False} if connection_str.startswith("sqlite") else {}
+        engine = create_engine(connection_str, echo=False, connect_args=connect_args)
         Base.metadata.create_all(engine)
         Session = sessionmaker(bind=engine)
         self._session = Session()
@@ -0,0 +1,202 @@
+from bisect import bisect_left, bisect_right, insort
+from typing import List
+
+
+class PriceLevels:
+    """
+    注文を価格順(同じ価格の場合は登録順)に管理します。
+
+    価格の範囲にある注文を二分探索で求めるため、注文の数によらず、
+    範囲にある注文の数に比例する時間で取得できます。
+    """
+
+    def __init__(self):
+        self._levels = []
+        self._orders = {}
+
+    def __len__(self) -> int:
+        return len(self._levels)
+
+    def add(self, price: float, sequence: int, order: object):
+        """
+        注文を登録する
+
+        Parameters
+        ----------
+        price : float
+            注文価格
+        sequence : int
+            注文の登録順(同じ価格の注文の順序)
+        order : object
+            注文
+        """
+        level = (price, sequence)
+        insort(self._levels, level)
+        self._orders[level] = order
+
+    def remove(self, price: float, sequence: int):
+        """
+        注文を削除する
+
+        Parameters
+        ----------
+        price : float
+            注文価格
+        sequence : int
+            注文の登録順
+        """
+        level = (price, sequence)
+        idx = bisect_left(self._levels, level)
+        if idx < len(self._levels) and self._levels[idx] == level:
+            del self._levels[idx]
+            del self._orders[level]
+
+    def get_at_or_above(self, price: float) -> List[tuple]:
+        """
+        指定した価格以上の注文を取得する
+
+        Returns
+        -------
+        List[tuple]
+            (注文価格, 登録順, 注文)のリスト
+        """
+        idx = bisect_left(self._levels, (price, -1))
+        return [(x[0], x[1], self._orders[x]) for x in self._levels[idx:]]
+
+    def get_at_or_below(self, price: float) -> List[tuple]:
+        """
+        指定した価格以下の注文を取得する
+
+        Returns
+        -------
+        List[tuple]
+            (注文価格, 登録順, 注文)のリスト
+        """
+        idx = bisect_right(self._levels, (price, float("inf")))
+        return [(x[0], x[1], self._orders[x]) for x in self._levels[:idx]]
+
+
+class OrderBook:
+    """
+    ポジションを決済するストップ注文・リミット注文を、売買の方向・注文の種類ごとに価格順に管理します。
+
+    ティックの値幅(高値・安値)に達した注文のみを二分探索で求めるため、
+    未決済のポジションが多い場合(グリッド戦略など)でも、ティックごとの判定は注文の数に比例しません。
+    """
+
+    def __init__(self):
+        self._long_stops = PriceLevels()    # ロングポジションのストップ注文(価格が下落したら売る)
+        self._long_limits = PriceLevels()   # ロングポジションのリミット注文(価格が上昇したら売る)
+        self._short_stops = PriceLevels()   # ショートポジションのストップ注文(価格が上昇したら買う)
+        self._short_limits = PriceLevels()  # ショートポジションのリミット注文(価格が下落したら買う)
+        self._entries = {}
+        self._sequence = 0
+
+    def set_orders(self, order: object, open_action: str, stop_price: float, limit_price: float):
+        """
+        注文のストップ価格・リミット価格を登録する(登録済みの場合は置き換える)
+
+        Parameters
+        ----------
+        order : object
+            注文(ポジションなど)
+        open_action : str
+            ポジションの売買の方向("buy", "sell")
+        stop_price : float
+            ストップ価格(ストップ注文を出さない場合はNone)
+        limit_price : float
+            リミット価格(リミット注文を出さない場合はNone)
+        """
+
+        # 登録順は最初に登録したときのものを引き継ぐ(remove_ordersで削除するまで)
+        entry = self._entries.get(order)
+        if entry is not None:
+            sequence = entry[0]
+            self._remove_levels(entry)
+        else:
+            sequence = self._sequence
+            self._sequence += 1
+
+        stops, limits = self._get_levels(open_action)
+        if stop_price is not None:
+            stops.add(stop_price, sequence, order)
+        if limit_price is not None:
+            limits.add(limit_price, sequence, order)
+        self._entries[order] = (sequence, open_action, stop_price, limit_price)
+
+    def remove_orders(self, order: object):
+        """
+        注文のストップ価格・リミット価格を削除する
+
+        Parameters
+        ----------
+        order : object
+            注文(ポジションなど)
+        """
+        entry = self._entries.pop(order, None)
+        if entry is not None:
+            self._remove_levels(entry)
+
+    def match(self, tick_open: float, tick_high: float, tick_low: float) -> List[tuple]:
+        """
+        ティックの値幅に達した注文と、その約定価格を求める
+
+        注文はティックの値幅が注文価格に達した場合に注文価格で約定し、
+        値幅の始点で既に注文価格を超えていた場合(窓開けなど)は、始点の価格で約定します。
+        ストップ価格・リミット価格の両方に達した場合は、ストップ注文が約定します。
+
+        Parameters
+        ----------
+        tick_open : float
+            ティックの値幅の始点
+        tick_high : float
+            ティックの値幅の高値
+        tick_low : float
+            ティックの値幅の安値
+
+        Returns
+        -------
+        List[tuple]
+            (注文, 注文の種類("stop", "limit"), 約定価格)のリスト
+            (ロングポジション、ショートポジションの順に、それぞれ登録順)
+        """
+
+        matched = []
+
+        # ロングポジション
+        long_orders = {}
+        for price, sequence, order in self._long_limits.get_at_or_below(tick_high):
+            long_orders[sequence] = (order, "limit", max(tick_open, price))
+        for price, sequence, order in self._long_stops.get_at_or_above(tick_low):
+            long_orders[sequence] = (order, "stop", min(tick_open, price))
+        matched += [long_orders[x] for x in sorted(long_orders)]
+
+        # ショートポジション
+        short_orders = {}
+        for price, sequence, order in self._short_limits.get_at_or_above(tick_low):
+            short_orders[sequence] = (order, "limit", min(tick_open, price))
+        for price, sequence, order in self._short_stops.get_at_or_below(tick_high):
+            short_orders[sequence] = (order, "stop", max(tick_open, price))
+        matched += [short_orders[x] for x in sorted(short_orders)]
+
+        return matched
+
+    def _remove_levels(self, entry: tuple):
+        """
+        登録済みの注文の価格を削除する
+        """
+        sequence, open_action, stop_price, limit_price = entry
+        stops, limits = self._get_levels(open_action)
+        if stop_price is not None:
+            stops.remove(stop_price, sequence)
+        if limit_price is not None:
+            limits.remove(limit_price, sequence)
+
+    def _get_levels(self, open_action: str) -> (PriceLevels, PriceLevels):
+        """
+        売買の方向のストップ注文・リミット注文を取得する
+        """
+        if open_action == "buy":
+            return self._long_stops, self._long_limits
+        else:
+            return self._short_stops, self._short_limits
@@ -8,6 +8,7 @@ from typing import List
 from magictrader.candle import CandleFeeder
 from magictrader.const import Period
 from magictrader.event import EventArgs, EventHandler
+from magictrader.orderbook import OrderBook
 
 
 class Position:
@@ -45,6 +46,7 @@ class Position:
         self._position_closing_eventhandler = EventHandler(self)
         self._position_opened_eventhandler = EventHandler(self)
         self._position_closed_eventhandler = EventHandler(self)
+        self._position_order_changed_eventhandler = EventHandler(self)
 
     def open(self, dt: datetime, action: str, price: float, amount: float, comment: str = "",
              limit_price: float = None, stop_price: float = None):
@@ -225,6 +227,7 @@ class Position:
             リミット価格を解除する場合はNoneを指定します。
         """
         self._limit_price = value
+        self._on_order_changed(EventArgs({"position": self}))
 
     @property
     def stop_price(self) -> float:
@@ -242,6 +245,7 @@ class Position:
             ストップ価格を解除する場合はNoneを指定します。
         """
         self._stop_price = value
+        self._on_order_changed(EventArgs({"position": self}))
 
     @property
     def exec_open_price(self) -> float:
@@ -305,6 +309,12 @@ class Position:
         """
         self._position_closed_eventhandler.fire(eargs)
 
+    def _on_order_changed(self, eargs: EventArgs):
+        """
+        注文変更イベント(ストップ価格・リミット価格の変更)を発生させます。
+        """
+        self._position_order_changed_eventhandler.fire(eargs)
+
     @property
     def position_opening_eventhandler(self) -> EventHandler:
         """
@@ -333,6 +343,13 @@ class Position:
         """
         return self._position_closed_eventhandler
 
+    @property
+    def position_order_changed_eventhandler(self) -> EventHandler:
+        """
+        注文変更イベント(ストップ価格・リミット価格の変更)のハンドラ
+        """
+        return self._position_order_changed_eventhandler
+
 
 class PositionRepository:
     """
@@ -348,6 +365,7 @@ class PositionRepository:
         """
         self._feeder = feeder
         self._positions = []
+        self._order_book = OrderBook()
         self._position_opening_eventhandler = EventHandler(self)
         self._position_closing_eventhandler = EventHandler(self)
         self._position_opened_eventhandler = EventHandler(self)
@@ -359,6 +377,7 @@ class PositionRepository:
         position.position_closing_eventhandler.add(self._on_position_closing)   # イベントをリレーする
         position.position_opened_eventhandler.add(self._on_position_opened)     # イベントをリレーする
         position.position_closed_eventhandler.add(self._on_position_closed)     # イベントをリレーする
+        position.position_order_changed_eventhandler.add(self._position_order_changed)
         self._positions.append(position)
         return position
 
@@ -375,10 +394,42 @@ class PositionRepository:
     def positions(self) -> List[Position]:
         return self._positions
 
+    @property
+    def order_book(self) -> OrderBook:
+        """
+        未決済のポジションのストップ注文・リミット注文
+        """
+        return self._order_book
+
     @property
     def total_profit(self) -> float:
         return sum(list(map(lambda x: x.profit, self._positions)))
 
+    @property
+    def trade_count(self) -> int:
+        """
+        決済済みのポジションの数を取得します。
+        """
+        return len(list(filter(lambda x: x.is_opened and x.is_closed, self._positions)))
+
+    @property
+    def max_drawdown(self) -> float:
+        """
+        決済済みのポジションの累計損益から、最大ドローダウン(累計損益の最大値からの最大下落幅)を取得します。
+        """
+        closed_positions = sorted(
+            filter(lambda x: x.is_opened and x.is_closed, self._positions),
+            key=lambda x: x.close_time
+        )
+        max_drawdown = 0.0
+        max_profit = 0.0
+        total_profit = 0.0
+        for position in closed_positions:
+            total_profit += position.profit
+            max_profit = max(max_profit, total_profit)
+            max_drawdown = max(max_drawdown, max_profit - total_profit)
+        return max_drawdown
+
     def _on_position_opening(self, sender: object, eargs: EventArgs):
         """
         ポジションオープニングイベントを発生させます。
@@ -397,6 +448,7 @@ class PositionRepository:
         """
         ポジションオープンイベントを発生させます。
         """
+        self._update_orders(eargs.params["position"])
         eargs.params["position_repository"] = self
         self._position_opened_eventhandler.fire(eargs)
 
@@ -404,9 +456,26 @@ class PositionRepository:
         """
         ポジションクローズイベントを発生させます。
         """
+        self._update_orders(eargs.params["position"])
         eargs.params["position_repository"] = self
         self._position_closed_eventhandler.fire(eargs)
 
+    def _position_order_changed(self, sender: object, eargs: EventArgs):
+        """
+        ポジションのストップ価格・リミット価格が変更されたときに発生します。
+        """
+        self._update_orders(eargs.params["position"])
+
+    def _update_orders(self, position: Position):
+        """
+        ポジションのストップ注文・リミット注文を、注文板に反映します。
+        (未決済のポジションのみを登録し、決済済み・キャンセルされたポジションは削除します)
+        """
+        if position.is_opened and not position.is_closed and not position.is_canceled:
+            self._order_book.set_orders(position, position.open_action, position.stop_price, position.limit_price)
+        else:
+            self._order_book.remove_orders(position)
+
     @property
     def position_opening_eventhandler(self) -> EventHandler:
         """
@@ -462,3 +531,4 @@ class PositionRepository:
         for record in records:
             position = self.create_position()
             position.load_from_dict(record)
+            self._update_orders(position)
@@ -0,0 +1,266 @@
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from typing import List
+
+import numpy
+from zaifer import Chart as ChartAPI
+
+from magictrader.candle import CandleFeeder
+from magictrader.const import Period
+from magictrader.ratelimit import TokenBucket
+from magictrader.store import CandleStore
+
+
+class CandlePrefetcher:
+    """
+    バックテストの前に、指定期間のローソク足をサーバーからキャッシュに一括で読み込みます。
+
+    取得期間はリクエスト単位のチャンクに分割され、共有の頻度制限の範囲で並列に取得されます。
+    取得済みのチャンクは進捗ファイルに記録されるため、中断しても続きから再開できます。
+    """
+
+    def __init__(self, currency_pairs: List[str], periods: List[str], datetime_from: datetime, datetime_to: datetime,
+                 candle_store: CandleStore, chart_api: object = None, rate_limiter: TokenBucket = None,
+                 chunk_bar_count: int = 1000, max_workers: int = 4, progress_filepath: str = None, response_bar_limit: int = 0):
+        """
+        Parameters
+        ----------
+        currency_pairs : List[str]
+            通貨ペア(["btc_jpy", "eth_jpy"], etc.)
+        periods : List[str]
+            時間枠(["1m", "1h"], etc.)
+        datetime_from : datetime
+            取得開始日時
+        datetime_to : datetime
+            取得終了日時
+        candle_store : CandleStore
+            ローソク足のキャッシュ
+        chart_api : object, optional
+            ローソク足を取得するAPI(未指定の場合はzaifのAPI), by default None
+        rate_limiter : TokenBucket, optional
+            サーバーへのリクエストの頻度制限(未指定の場合はプロセス全体で共有), by default None
+        chunk_bar_count : int, optional
+            １回のリクエストで取得するローソク足の本数, by default 1000
+        max_workers : int, optional
+            並列に実行するリクエストの数, by default 4
+        progress_filepath : str, optional
+            進捗ファイルのパス(未指定の場合は再開しない), by default None
+        response_bar_limit : int, optional
+            サーバーが１回の応答で返すローソク足の上限(0の場合は不明), by default 0
+        """
+        self._currency_pairs = currency_pairs
+        self._periods = periods
+        self._datetime_from = datetime_from
+        self._datetime_to = datetime_to
+        self._candle_store = candle_store
+        self._chart_api = chart_api if chart_api else ChartAPI()
+        self._rate_limiter = rate_limiter if rate_limiter else TokenBucket.shared()
+        self._chunk_bar_count = chunk_bar_count
+        self._max_workers = max_workers
+        self._progress_filepath = progress_filepath
+        self._response_bar_limit = response_bar_limit
+        self._completed_chunks = set()
+        self._fetched_chunk_count = 0
+        self._skipped_chunk_count = 0
+
+    def run(self) -> List[dict]:
+        """
+        ローソク足を取得し、キャッシュに保存する
+
+        Returns
+        -------
+        List[dict]
+            通貨ペア・時間枠ごとのキャッシュの充足状況(get_coverageを参照)
+        """
+
+        # 取得済みのチャンクを除外する
+        self._load_progress()
+        chunks = self._create_chunks()
+        pending_chunks = [
+            x for x in chunks
+            if x["key"] not in self._completed_chunks
+            and not self._candle_store.is_covered(x["currency_pair"], x["period"], x["range_from"], x["range_to"])
+        ]
+        self._skipped_chunk_count = len(chunks) - len(pending_chunks)
+
+        # チャンクを並列に取得し、取得できたものから順にキャッシュに保存する
+        # (完全な応答を得られなかったチャンクは、得られた期間のみを取得済みとし、完了したチャンクとして記録しない)
+        with ThreadPoolExecutor(max_workers=self._max_workers) as executor:
+            futures = {executor.submit(self._fetch_chunk, x): x for x in pending_chunks}
+            try:
+                for future in as_completed(futures):
+                    chunk = futures[future]
+                    ohlcs, fetched_range = future.result()
+                    self._candle_store.save_ohlcs(chunk["currency_pair"], chunk["period"], ohlcs)
+                    if fetched_range:
+                        self._candle_store.add_coverage(chunk["currency_pair"], chunk["period"], *fetched_range)
+                    if fetched_range == (chunk["range_from"], chunk["range_to"]):
+                        self._completed_chunks.add(chunk["key"])
+                    self._fetched_chunk_count += 1
+                    self._save_progress()
+            except Exception:
+                for future in futures:
+                    future.cancel()
+                raise
+
+        return self.get_coverage_report()
+
+    def get_coverage_report(self) -> List[dict]:
+        """
+        全ての通貨ペア・時間枠のキャッシュの充足状況を取得する
+
+        Returns
+        -------
+        List[dict]
+            通貨ペア・時間枠ごとのキャッシュの充足状況
+        """
+        return [self.get_coverage(x, y) for x in self._currency_pairs for y in self._periods]
+
+    def get_coverage(self, currency_pair: str, period: str) -> dict:
+        """
+        キャッシュの充足状況を取得する
+
+        Parameters
+        ----------
+        currency_pair : str
+            通貨ペア("btc_jpy", etc.)
+        period : str
+            時間枠("1m", "5m", "15m", "30m", "1h", "4h", "8h", "12h", "1d", "1w")
+
+        Returns
+        -------
+        dict
+            currency_pair, period, expected_bar_count(あるべき足の数), cached_bar_count(キャッシュにある足の数),
+            coverage(充足率), gaps(キャッシュにない期間のリスト[(開始日時, 終了日時)]),
+            exchange_gaps(gapsのうち、取得済みで取引所にデータが存在しない期間のリスト)
+        """
+
+        times = self._candle_store.get_ohlcs(currency_pair, period, self._datetime_from, self._datetime_to)["times"]
+        expected_bar_count = Period.get_bar_count(self._datetime_from, self._datetime_to, period)
+
+        # キャッシュにない期間を求める
+        span = timedelta(minutes=Period.to_minutes(period))
+        gaps = []
+        cursor = Period.ceil_datetime(self._datetime_from, period)
+        for bar_time in times:
+            if bar_time > cursor:
+                gaps.append((cursor, bar_time - span))
+            cursor = bar_time + span
+        last_time = Period.floor_datetime(self._datetime_to, period)
+        if cursor <= last_time:
+            gaps.append((cursor, last_time))
+
+        return {
+            "currency_pair": currency_pair,
+            "period": period,
+            "expected_bar_count": expected_bar_count,
+            "cached_bar_count": len(times),
+            "coverage": min(len(times) / expected_bar_count, 1.0) if expected_bar_count > 0 else 1.0,
+            "gaps": gaps,
+            "exchange_gaps": [x for x in gaps if self._candle_store.is_covered(currency_pair, period, x[0], x[1])],
+        }
+
+    def _create_chunks(self) -> List[dict]:
+        """
+        取得期間をリクエスト単位のチャンクに分割します。
+        """
+        chunks = []
+        for currency_pair in self._currency_pairs:
+            for period in self._periods:
+                chunk_span = timedelta(minutes=Period.to_minutes(period) * self._chunk_bar_count)
+                chunk_from = Period.ceil_datetime(self._datetime_from, period)
+                while chunk_from <= self._datetime_to:
+                    chunk_to = min(chunk_from + chunk_span - timedelta(minutes=1), self._datetime_to)
+                    chunks.append({
+                        "key": "{}/{}/{:%Y-%m-%dT%H:%M}/{}".format(currency_pair, period, chunk_from, self._chunk_bar_count),
+                        "currency_pair": currency_pair,
+                        "period": period,
+                        "range_from": chunk_from,
+                        "range_to": chunk_to,
+                    })
+                    chunk_from += chunk_span
+        return chunks
+
+    def _fetch_chunk(self, chunk: dict) -> tuple:
+        """
+        サーバーからチャンクのローソク足と、取得済みとして記録できる期間を取得します。(スレッドプールで実行されます)
+
+        応答が切り詰められている可能性がある場合は、最後の足より後の期間を続けて取得します。
+        """
+        span = timedelta(minutes=Period.to_minutes(chunk["period"]))
+        chunks = []
+        fetched_range = None
+        range_from = chunk["range_from"]
+        while True:
+            ohlcs = self._fetch_ohlcs(chunk["currency_pair"], chunk["period"], range_from, chunk["range_to"])
+            chunks.append(ohlcs)
+            response_range = CandleFeeder.get_fetched_range(ohlcs, range_from, chunk["range_to"], self._response_bar_limit)
+            if response_range is None:
+                break
+            range_from = response_range[1] + span
+            if range_from > chunk["range_to"]:
+                fetched_range = (chunk["range_from"], chunk["range_to"])
+                break
+            fetched_range = (chunk["range_from"], response_range[1])
+
+        ohlcs = {
+            "times": [x for ohlcs in chunks for x in ohlcs["times"]],
+            "opens": numpy.concatenate([ohlcs["opens"] for ohlcs in chunks]),
+            "highs": numpy.concatenate([ohlcs["highs"] for ohlcs in chunks]),
+            "lows": numpy.concatenate([ohlcs["lows"] for ohlcs in chunks]),
+            "closes": numpy.concatenate([ohlcs["closes"] for ohlcs in chunks]),
+        }
+        return ohlcs, fetched_range
+
+    def _fetch_ohlcs(self, currency_pair: str, period: str, range_from: datetime, range_to: datetime) -> dict:
+        """
+        サーバーからローソク足を取得します。
+        """
+        try_count = 0
+        response = None
+        while True:
+            try:
+                try_count += 1
+                self._rate_limiter.acquire()
+                response = self._chart_api.get_ohlc(currency_pair, Period.to_zaifapi_str(period), range_from, range_to)
+                break
+            except Exception as ex:
+                if try_count > 100:
+                    raise ex
+                time.sleep(1.0)
+
+        return CandleFeeder.convert_response(response)
+
+    def _load_progress(self):
+        """
+        進捗ファイルから取得済みのチャンクを読み込みます。
+        """
+        if self._progress_filepath and os.path.exists(self._progress_filepath):
+            with open(self._progress_filepath, "r", encoding="utf-8") as f:
+                self._completed_chunks = set(json.load(f)["completed_chunks"])
+
+    def _save_progress(self):
+        """
+        取得済みのチャンクを進捗ファイルに保存します。
+        """
+        if self._progress_filepath:
+            with open(self._progress_filepath + ".tmp", "w", encoding="utf-8") as f:
+                json.dump({"completed_chunks": sorted(self._completed_chunks)}, f, indent=1)
+            os.replace(self._progress_filepath + ".tmp", self._progress_filepath)
+
+    @property
+    def fetched_chunk_count(self) -> int:
+        """
+        取得したチャンクの数
+        """
+        return self._fetched_chunk_count
+
+    @property
+    def skipped_chunk_count(self) -> int:
+        """
+        取得済みのため再開時に除外したチャンクの数
+        """
+        return self._skipped_chunk_count
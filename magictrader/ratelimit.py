@@ -0,0 +1,205 @@
+import asyncio
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    トークンバケット方式でリクエストの頻度を制限します。
+
+    トークンは１秒あたりrate個ずつ、最大capacity個まで補充され、
+    リクエストの前にトークンを取得します。トークンが不足している場合は、
+    補充されるまでの時間を計算して１度だけ待機します。(先に取得を要求した順に割り当てられます)
+    サーバーへのリクエストはプロセス全体で共有されるshared()のインスタンスを使用します。
+    """
+
+    _shared_instance = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, rate: float = 1.0, capacity: float = 1.0):
+        """
+        Parameters
+        ----------
+        rate : float, optional
+            １秒あたりに補充されるトークンの数, by default 1.0
+        capacity : float, optional
+            保持できるトークンの最大数(連続して実行できるリクエストの数), by default 1.0
+        """
+        self._rate = self._validate("rate", rate)
+        self._capacity = self._validate("capacity", capacity)
+        self._tokens = capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+        self._acquire_count = 0
+        self._wait_count = 0
+        self._total_wait_time = 0.0
+        self._max_wait_time = 0.0
+
+    @staticmethod
+    def shared() -> "TokenBucket":
+        """
+        プロセス全体で共有するインスタンスを取得する
+
+        Returns
+        -------
+        TokenBucket
+            共有のインスタンス
+        """
+        with TokenBucket._shared_lock:
+            if TokenBucket._shared_instance is None:
+                TokenBucket._shared_instance = TokenBucket()
+            return TokenBucket._shared_instance
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """
+        トークンを取得する(不足している場合は補充されるまで待機する)
+
+        Parameters
+        ----------
+        tokens : float, optional
+            取得するトークンの数, by default 1.0
+
+        Returns
+        -------
+        float
+            待機した秒数
+        """
+        wait_time = self._reserve(tokens)
+        if wait_time > 0:
+            time.sleep(wait_time)
+        return wait_time
+
+    async def acquire_async(self, tokens: float = 1.0) -> float:
+        """
+        トークンを取得する(不足している場合はイベントループを止めずに待機する)
+
+        Parameters
+        ----------
+        tokens : float, optional
+            取得するトークンの数, by default 1.0
+
+        Returns
+        -------
+        float
+            待機した秒数
+        """
+        wait_time = self._reserve(tokens)
+        if wait_time > 0:
+            await asyncio.sleep(wait_time)
+        return wait_time
+
+    def reset_metrics(self):
+        """
+        待機時間の計測値をリセットする
+        """
+        with self._lock:
+            self._acquire_count = 0
+            self._wait_count = 0
+            self._total_wait_time = 0.0
+            self._max_wait_time = 0.0
+
+    def _reserve(self, tokens: float) -> float:
+        """
+        トークンを予約し、トークンが補充されるまでの待機時間を返します。
+        """
+        with self._lock:
+
+            # 経過時間に応じてトークンを補充する
+            self._refill()
+
+            # トークンを予約する(不足分は後続のリクエストの待機時間に加算される)
+            self._tokens -= tokens
+            wait_time = -self._tokens / self._rate if self._tokens < 0 else 0.0
+
+            # 待機時間を計測する
+            self._acquire_count += 1
+            if wait_time > 0:
+                self._wait_count += 1
+                self._total_wait_time += wait_time
+                self._max_wait_time = max(self._max_wait_time, wait_time)
+
+            return wait_time
+
+    def _refill(self):
+        """
+        前回の補充からの経過時間に応じて、現在の補充速度でトークンを補充します。
+        (ロックを取得した状態で呼び出してください)
+        """
+        now = time.monotonic()
+        self._tokens = min(self._capacity, self._tokens + (now - self._updated_at) * self._rate)
+        self._updated_at = now
+
+    @staticmethod
+    def _validate(name: str, value: float) -> float:
+        """
+        補充速度・最大数が正の値であることを確認します。
+        """
+        if value <= 0:
+            raise ValueError("{} must be positive. ({})".format(name, value))
+        return value
+
+    @property
+    def rate(self) -> float:
+        """
+        １秒あたりに補充されるトークンの数
+        """
+        return self._rate
+
+    @rate.setter
+    def rate(self, value: float):
+        self._validate("rate", value)
+        with self._lock:
+            # 変更前の補充速度で、変更するまでに補充されたトークンを補充する
+            self._refill()
+            self._rate = value
+
+    @property
+    def capacity(self) -> float:
+        """
+        保持できるトークンの最大数
+        """
+        return self._capacity
+
+    @capacity.setter
+    def capacity(self, value: float):
+        self._validate("capacity", value)
+        with self._lock:
+            # 変更前の最大数で、変更するまでに補充されたトークンを補充する
+            self._refill()
+            self._capacity = value
+            self._tokens = min(self._tokens, value)
+
+    @property
+    def acquire_count(self) -> int:
+        """
+        トークンを取得した回数
+        """
+        return self._acquire_count
+
+    @property
+    def wait_count(self) -> int:
+        """
+        トークンの補充を待機した回数
+        """
+        return self._wait_count
+
+    @property
+    def total_wait_time(self) -> float:
+        """
+        待機した秒数の合計
+        """
+        return self._total_wait_time
+
+    @property
+    def max_wait_time(self) -> float:
+        """
+        待機した秒数の最大値
+        """
+        return self._max_wait_time
+
+    @property
+    def average_wait_time(self) -> float:
+        """
+        トークンを取得した１回あたりの平均待機秒数
+        """
+        return self._total_wait_time / self._acquire_count if self._acquire_count > 0 else 0.0
@@ -0,0 +1,382 @@
+import csv
+import json
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import parse_qs, urlparse
+
+import numpy
+from zaifer import Chart as ChartAPI
+from zaifer import UrlConfigs
+
+from magictrader.const import Period
+from magictrader.inifile import INIFile
+from magictrader.store import CandleStore
+from magictrader.utils import TimeConverter
+
+
+class ReplayRateLimitError(Exception):
+    """
+    リプレイのAPIで、リクエストの頻度が制限を超えた場合に発生します。
+    """
+    pass
+
+
+class ReplayChartAPI:
+    """
+    ローカルのローソク足から、zaifのチャートAPI(get_ohlc)の応答を再現します。
+
+    CandleFeederのchart_apiに指定すると、サーバーに接続せずにローソク足を取得できます。
+    応答の遅延、エラー、リクエストの頻度制限を再現できるため、取得処理の負荷試験・遅延試験にも使用できます。
+    """
+
+    def __init__(self, candle_store: CandleStore = None, latency: float = 0.0, error_rate: float = 0.0, rate_limit: int = 0,
+                 seed: int = None, max_bar_count: int = 0):
+        """
+        Parameters
+        ----------
+        candle_store : CandleStore, optional
+            応答するローソク足のキャッシュ, by default None
+        latency : float, optional
+            応答の遅延(秒), by default 0.0
+        error_rate : float, optional
+            エラーを発生させる確率(0.0～1.0), by default 0.0
+        rate_limit : int, optional
+            １秒あたりに応答するリクエストの上限(0の場合は制限なし), by default 0
+        seed : int, optional
+            エラーを発生させる乱数のシード, by default None
+        max_bar_count : int, optional
+            １回の応答で返すローソク足の上限(超えた分は切り詰める、0の場合は制限なし), by default 0
+        """
+        self._candle_store = candle_store
+        self._candle_files = {}
+        self._latency = latency
+        self._error_rate = error_rate
+        self._rate_limit = rate_limit
+        self._max_bar_count = max_bar_count
+        self._random = random.Random(seed)
+        self._request_times = deque()
+        self._lock = threading.Lock()
+        self._store_lock = threading.Lock()
+        self._request_count = 0
+        self._error_count = 0
+        self._rate_limited_count = 0
+
+    @staticmethod
+    def create_from_ini(inifile: INIFile) -> object:
+        """
+        INIファイルの設定から、ローソク足を取得するAPIを作成する
+
+        [replay] enabled=Trueの場合はリプレイのAPI、
+        [server] chart_api_url が指定された場合は指定されたURL(リプレイのサーバー等)に接続するzaifのAPIを作成します。
+
+        Parameters
+        ----------
+        inifile : INIFile
+            INIファイル
+
+        Returns
+        -------
+        object
+            ローソク足を取得するAPI(既定のzaifのAPIを使用する場合はNone)
+        """
+        if inifile.get_bool("replay", "enabled", False):
+            return ReplayChartAPI(
+                CandleStore.create_from_ini(inifile, "replay"),
+                inifile.get_float("replay", "latency", 0.0),
+                inifile.get_float("replay", "error_rate", 0.0),
+                inifile.get_int("replay", "rate_limit", 0),
+                max_bar_count=inifile.get_int("replay", "max_bar_count", 0)
+            )
+
+        chart_api_url = inifile.get_str("server", "chart_api_url", "")
+        if chart_api_url:
+            url_configs = UrlConfigs()
+            url_configs.chart_api_url = chart_api_url
+            return ChartAPI(url_configs)
+
+        return None
+
+    def load_csv(self, currency_pair: str, period: str, filepath: str):
+        """
+        応答するローソク足をCSVファイルから読み込む
+        (列: time(unixtime), open, high, low, close、キャッシュより優先されます)
+
+        Parameters
+        ----------
+        currency_pair : str
+            通貨ペア("btc_jpy", etc.)
+        period : str
+            時間枠("1m", "5m", "15m", "30m", "1h", "4h", "8h", "12h", "1d", "1w")
+        filepath : str
+            CSVファイルのパス
+        """
+        with open(filepath, "r", newline="", encoding="utf-8") as f:
+            rows = [row for row in csv.DictReader(f)]
+        rows.sort(key=lambda x: int(float(x["time"])))
+
+        self._candle_files[(currency_pair, period)] = {
+            "times": numpy.array([int(float(x["time"])) for x in rows], dtype=numpy.int64),
+            "opens": numpy.array([float(x["open"]) for x in rows]),
+            "highs": numpy.array([float(x["high"]) for x in rows]),
+            "lows": numpy.array([float(x["low"]) for x in rows]),
+            "closes": numpy.array([float(x["close"]) for x in rows]),
+        }
+
+    def get_ohlc(self, currency_pair: str, period: str, from_datetime: datetime, to_datetime: datetime) -> dict:
+        """
+        チャート情報を取得する(zaifer.Chart.get_ohlcと同じ形式)
+
+        Parameters
+        ----------
+        currency_pair : str
+            通貨ペア("btc_jpy", etc.)
+        period : str
+            zaifのAPIの時間枠("1", "5", "15", "30", "60", "240", "480", "720", "D", "W")
+        from_datetime : datetime
+            取得開始日時
+        to_datetime : datetime
+            取得終了日時
+
+        Returns
+        -------
+        dict
+            チャート情報({"ohlc_data": [{"time": unixtime(ミリ秒), "open", "high", "low", "close"}, ...]})
+        """
+
+        # リクエストの頻度を制限する
+        with self._lock:
+            self._request_count += 1
+            if self._rate_limit > 0:
+                now = time.monotonic()
+                while self._request_times and self._request_times[0] <= now - 1.0:
+                    self._request_times.popleft()
+                if len(self._request_times) >= self._rate_limit:
+                    self._rate_limited_count += 1
+                    raise ReplayRateLimitError("rate limit exceeded.")
+                self._request_times.append(now)
+            is_error = self._error_rate > 0 and self._random.random() < self._error_rate
+
+        # 応答を遅延させる
+        if self._latency > 0:
+            time.sleep(self._latency)
+
+        # エラーを発生させる
+        if is_error:
+            with self._lock:
+                self._error_count += 1
+            raise Exception("replay error injected.")
+
+        ohlcs = self._get_ohlcs(currency_pair, self._to_period(period), from_datetime, to_datetime)
+        ohlc_data = [
+            {"time": int(t) * 1000, "open": float(o), "high": float(h), "low": float(l), "close": float(c)}
+            for t, o, h, l, c in zip(ohlcs["times"], ohlcs["opens"], ohlcs["highs"], ohlcs["lows"], ohlcs["closes"])
+        ]
+
+        # 上限を超えた分は、古い足から上限の本数までに切り詰める
+        if self._max_bar_count > 0:
+            ohlc_data = ohlc_data[:self._max_bar_count]
+
+        return {"ohlc_data": ohlc_data}
+
+    def _get_ohlcs(self, currency_pair: str, period: str, from_datetime: datetime, to_datetime: datetime) -> dict:
+        """
+        CSVファイル、もしくはキャッシュからローソク足(時刻はunixtime)を取得します。
+        """
+
+        range_from = int(TimeConverter.datetime_to_unixtime(from_datetime))
+        range_to = int(TimeConverter.datetime_to_unixtime(to_datetime))
+
+        columns = self._candle_files.get((currency_pair, period))
+        if columns is not None:
+            idx_from = numpy.searchsorted(columns["times"], range_from, "left")
+            idx_to = numpy.searchsorted(columns["times"], range_to, "right")
+            return {name: column[idx_from:idx_to] for name, column in columns.items()}
+
+        # キャッシュはスレッドセーフではないため、サーバーのスレッドから同時に参照しない
+        if self._candle_store is not None:
+            with self._store_lock:
+                ohlcs = self._candle_store.get_ohlcs(currency_pair, period, from_datetime, to_datetime)
+            ohlcs["times"] = TimeConverter.datetime64_to_unixtimes(TimeConverter.datetimes_to_datetime64(ohlcs["times"]))
+            return ohlcs
+
+        return {"times": [], "opens": [], "highs": [], "lows": [], "closes": []}
+
+    def _to_period(self, period: str) -> str:
+        """
+        zaifのAPIの時間枠を、時間枠("1m", "5m", etc.)に変換します。
+        """
+        for x in Period:
+            if Period.to_zaifapi_str(x.value) == period:
+                return x.value
+        raise Exception("unknown period. ({})".format(period))
+
+    @property
+    def candle_store(self) -> CandleStore:
+        return self._candle_store
+
+    @property
+    def latency(self) -> float:
+        return self._latency
+
+    @latency.setter
+    def latency(self, value: float):
+        self._latency = value
+
+    @property
+    def error_rate(self) -> float:
+        return self._error_rate
+
+    @error_rate.setter
+    def error_rate(self, value: float):
+        self._error_rate = value
+
+    @property
+    def rate_limit(self) -> int:
+        return self._rate_limit
+
+    @rate_limit.setter
+    def rate_limit(self, value: int):
+        self._rate_limit = value
+
+    @property
+    def max_bar_count(self) -> int:
+        return self._max_bar_count
+
+    @max_bar_count.setter
+    def max_bar_count(self, value: int):
+        self._max_bar_count = value
+
+    @property
+    def request_count(self) -> int:
+        """
+        受け付けたリクエストの数
+        """
+        return self._request_count
+
+    @property
+    def error_count(self) -> int:
+        """
+        発生させたエラーの数
+        """
+        return self._error_count
+
+    @property
+    def rate_limited_count(self) -> int:
+        """
+        頻度制限により拒否したリクエストの数
+        """
+        return self._rate_limited_count
+
+
+class ReplayServer:
+    """
+    リプレイのAPIを、zaifのチャートAPIと同じHTTPのエンドポイント(/history)として公開します。
+
+    zaifer.ChartのUrlConfigs.chart_api_url、もしくはINIファイルの[server] chart_api_urlに
+    urlを指定すると、既存のクライアントからそのまま接続できます。
+    """
+
+    def __init__(self, chart_api: ReplayChartAPI, host: str = "127.0.0.1", port: int = 0):
+        """
+        Parameters
+        ----------
+        chart_api : ReplayChartAPI
+            応答するリプレイのAPI
+        host : str, optional
+            待ち受けるホスト, by default "127.0.0.1"
+        port : int, optional
+            待ち受けるポート(0の場合は空いているポート), by default 0
+        """
+        self._chart_api = chart_api
+        self._httpd = _ThreadingHTTPServer((host, port), _ReplayRequestHandler)
+        self._httpd.chart_api = chart_api
+        self._thread = None
+
+    def start(self):
+        """
+        サーバーをバックグラウンドで起動する
+        """
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+
+    def serve_forever(self):
+        """
+        サーバーを起動し、停止するまで待機する
+        """
+        self._httpd.serve_forever()
+
+    def stop(self):
+        """
+        サーバーを停止する
+        """
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    @property
+    def url(self) -> str:
+        """
+        チャートAPIのURL
+        """
+        host, port = self._httpd.server_address[:2]
+        return "http://{}:{}".format(host, port)
+
+    @property
+    def chart_api(self) -> ReplayChartAPI:
+        return self._chart_api
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class _ReplayRequestHandler(BaseHTTPRequestHandler):
+    """
+    /history?symbol=&resolution=&from=&to= に応答します。
+    """
+
+    def do_GET(self):
+
+        url = urlparse(self.path)
+        if url.path.rstrip("/") != "/history":
+            self._send_json(404, {"error": "not found"})
+            return
+
+        try:
+            query = parse_qs(url.query)
+            currency_pair = query["symbol"][0]
+            period = query["resolution"][0]
+            from_datetime = TimeConverter.unixtime_to_datetime(int(query["from"][0]))
+            to_datetime = TimeConverter.unixtime_to_datetime(int(query["to"][0]))
+        except (KeyError, ValueError):
+            self._send_json(400, {"error": "bad request"})
+            return
+
+        try:
+            response = self.server.chart_api.get_ohlc(currency_pair, period, from_datetime, to_datetime)
+        except ReplayRateLimitError as ex:
+            self._send_json(429, {"error": str(ex)})
+            return
+        except Exception as ex:
+            self._send_json(500, {"error": str(ex)})
+            return
+
+        self._send_json(200, response)
+
+    def _send_json(self, status_code: int, body: dict):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status_code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
@@ -0,0 +1,84 @@
+import numpy
+
+from magictrader.const import Period
+from magictrader.utils import TimeConverter
+
+
+class CandleResampler:
+    """
+    より下位のローソク足から、上位の時間枠のローソク足を作成します。
+    """
+
+    @staticmethod
+    def can_resample(source_period: str, period: str) -> bool:
+        """
+        下位の時間枠から上位の時間枠を作成できるかどうかを判定する
+        (上位の時間枠が下位の時間枠の整数倍で、１日を割り切れる場合に作成できます)
+
+        Parameters
+        ----------
+        source_period : str
+            下位の時間枠("1m", "5m", etc.)
+        period : str
+            上位の時間枠("5m", "1h", "4h", "1d", etc.)
+
+        Returns
+        -------
+        bool
+            作成できる場合True
+        """
+        source_minutes = Period.to_minutes(source_period)
+        minutes = Period.to_minutes(period)
+        return minutes > source_minutes and minutes % source_minutes == 0 and 1440 % minutes == 0
+
+    @staticmethod
+    def resample(ohlcs: dict, period: str) -> dict:
+        """
+        ローソク足を上位の時間枠に集約する
+
+        Period.floor_datetimeで求めた日時ごとに、最初の始値、最大の高値、最小の安値、最後の終値を集約します。
+
+        Parameters
+        ----------
+        ohlcs : dict
+            下位の時間枠のローソク足(日時順)
+        period : str
+            上位の時間枠("5m", "1h", "4h", "1d", etc.)
+
+        Returns
+        -------
+        dict
+            上位の時間枠のローソク足
+        """
+
+        if len(ohlcs["times"]) == 0:
+            return {
+                "times": [],
+                "opens": numpy.array([]),
+                "highs": numpy.array([]),
+                "lows": numpy.array([]),
+                "closes": numpy.array([]),
+            }
+
+        # 日時を切り捨てて集約先の日時を求める
+        # (ローカル時刻のまま秒数に変換するため、Period.floor_datetimeと同じ境界になる)
+        seconds = TimeConverter.datetimes_to_datetime64(ohlcs["times"]).astype(numpy.int64)
+        span = Period.to_minutes(period) * 60
+        bar_seconds = seconds - seconds % span
+
+        # 集約先の日時が変わる位置で区切る
+        starts = numpy.concatenate([[0], numpy.flatnonzero(numpy.diff(bar_seconds)) + 1])
+        ends = numpy.concatenate([starts[1:], [len(bar_seconds)]])
+
+        opens = numpy.asarray(ohlcs["opens"], dtype=numpy.float64)
+        highs = numpy.asarray(ohlcs["highs"], dtype=numpy.float64)
+        lows = numpy.asarray(ohlcs["lows"], dtype=numpy.float64)
+        closes = numpy.asarray(ohlcs["closes"], dtype=numpy.float64)
+
+        return {
+            "times": TimeConverter.datetime64_to_datetimes(bar_seconds[starts].astype("datetime64[s]")),
+            "opens": opens[starts],
+            "highs": numpy.maximum.reduceat(highs, starts),
+            "lows": numpy.minimum.reduceat(lows, starts),
+            "closes": closes[ends - 1],
+        }
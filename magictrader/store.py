@@ -0,0 +1,642 @@
+import json
+import os
+from abc import ABCMeta, abstractmethod
+from bisect import bisect_right, insort
+from datetime import datetime, timedelta
+from typing import List, Tuple
+
+import numpy
+
+from magictrader.const import Period
+from magictrader.inifile import INIFile
+from magictrader.model import CandleCoverage, CandleOHLC, DBContext
+from magictrader.utils import TimeConverter
+from sqlalchemy import asc
+
+
+class CandleStore(metaclass=ABCMeta):
+    """
+    ローソク足のキャッシュを表します。
+
+    サーバーから取得済みの期間(カバレッジ)を通貨ペア・時間枠ごとに記録します。
+    取得済みの期間内に存在しないローソク足は、取引所にデータが存在しない足として扱われます。
+    """
+
+    def __init__(self):
+        self._coverages = {}
+
+    @staticmethod
+    def create(backend: str = "sqlite", location: str = None, chunk_size: int = 1000) -> "CandleStore":
+        """
+        キャッシュの種類に応じたストアを作成する
+
+        Parameters
+        ----------
+        backend : str, optional
+            キャッシュの種類("sqlite", "columnar"), by default "sqlite"
+        location : str, optional
+            接続文字列、もしくはディレクトリのパス, by default None
+        chunk_size : int, optional
+            ローカルDBに一括保存するローソク足の本数, by default 1000
+
+        Returns
+        -------
+        CandleStore
+            ストア
+        """
+        if backend == "sqlite":
+            db_context = DBContext(location) if location else DBContext()
+            return DBCandleStore(db_context, chunk_size)
+        elif backend == "columnar":
+            return ColumnarCandleStore(location if location else "mt_candles")
+        else:
+            raise Exception("unknown candle store backend. ({})".format(backend))
+
+    @staticmethod
+    def create_from_ini(inifile: INIFile, section: str = "cache") -> "CandleStore":
+        """
+        INIファイルの設定(backend, location, chunk_size)からストアを作成する
+
+        Parameters
+        ----------
+        inifile : INIFile
+            INIファイル
+        section : str, optional
+            セクション名, by default "cache"
+
+        Returns
+        -------
+        CandleStore
+            ストア
+        """
+        return CandleStore.create(
+            inifile.get_str(section, "backend", "sqlite"),
+            inifile.get_str(section, "location", ""),
+            inifile.get_int(section, "chunk_size", 1000)
+        )
+
+    @abstractmethod
+    def get_ohlcs(self, currency_pair: str, period: str, range_from: datetime, range_to: datetime) -> dict:
+        """
+        キャッシュからローソク足を取得する
+
+        Parameters
+        ----------
+        currency_pair : str
+            通貨ペア("btc_jpy", etc.)
+        period : str
+            時間枠("1m", "5m", "15m", "30m", "1h", "4h", "8h", "12h", "1d", "1w")
+        range_from : datetime
+            取得開始日時
+        range_to : datetime
+            取得終了日時
+
+        Returns
+        -------
+        dict
+            ローソク足
+        """
+        pass
+
+    @abstractmethod
+    def save_ohlcs(self, currency_pair: str, period: str, ohlcs: dict):
+        """
+        キャッシュにローソク足を保存する
+
+        Parameters
+        ----------
+        currency_pair : str
+            通貨ペア("btc_jpy", etc.)
+        period : str
+            時間枠("1m", "5m", "15m", "30m", "1h", "4h", "8h", "12h", "1d", "1w")
+        ohlcs : dict
+            ローソク足
+        """
+        pass
+
+    def get_coverage(self, currency_pair: str, period: str) -> List[Tuple[datetime, datetime]]:
+        """
+        サーバーから取得済みの期間を取得する
+
+        Parameters
+        ----------
+        currency_pair : str
+            通貨ペア("btc_jpy", etc.)
+        period : str
+            時間枠("1m", "5m", "15m", "30m", "1h", "4h", "8h", "12h", "1d", "1w")
+
+        Returns
+        -------
+        List[Tuple[datetime, datetime]]
+            取得済みの期間(最初の足の日時, 最後の足の日時)のリスト(日時順)
+        """
+        key = (currency_pair, period)
+        if key not in self._coverages:
+            self._coverages[key] = self._load_coverage(currency_pair, period)
+        return self._coverages[key]
+
+    def add_coverage(self, currency_pair: str, period: str, range_from: datetime, range_to: datetime):
+        """
+        期間をサーバーから取得済みとして記録する
+        (形成中のローソク足は確定しておらず、最後に確定したローソク足も取引所で公開されていない場合があるため、
+        その１本前のローソク足までを記録する)
+
+        Parameters
+        ----------
+        currency_pair : str
+            通貨ペア("btc_jpy", etc.)
+        period : str
+            時間枠("1m", "5m", "15m", "30m", "1h", "4h", "8h", "12h", "1d", "1w")
+        range_from : datetime
+            取得開始日時
+        range_to : datetime
+            取得終了日時
+        """
+
+        span = timedelta(minutes=Period.to_minutes(period))
+        range_from = Period.ceil_datetime(range_from, period)
+        range_to = min(Period.floor_datetime(range_to, period), Period.floor_datetime(datetime.now(), period) - span * 2)
+        if range_from > range_to:
+            return
+
+        # 重複・隣接する期間を結合する
+        coverage = []
+        absorbed = []
+        for interval_from, interval_to in self.get_coverage(currency_pair, period):
+            if interval_to + span < range_from or range_to + span < interval_from:
+                coverage.append((interval_from, interval_to))
+            else:
+                absorbed.append((interval_from, interval_to))
+                range_from = min(range_from, interval_from)
+                range_to = max(range_to, interval_to)
+
+        # 既に取得済みの期間の場合は保存しない
+        if absorbed == [(range_from, range_to)]:
+            return
+
+        insort(coverage, (range_from, range_to))
+        self._coverages[(currency_pair, period)] = coverage
+        self._save_coverage(currency_pair, period, coverage, [(range_from, range_to)], absorbed)
+
+    def remove_coverage(self, currency_pair: str, period: str, range_from: datetime, range_to: datetime):
+        """
+        期間の取得済みの記録を取り消す
+        (取り消した期間は、次に参照したときにサーバーから取得し直す)
+
+        Parameters
+        ----------
+        currency_pair : str
+            通貨ペア("btc_jpy", etc.)
+        period : str
+            時間枠("1m", "5m", "15m", "30m", "1h", "4h", "8h", "12h", "1d", "1w")
+        range_from : datetime
+            取り消す期間の開始日時
+        range_to : datetime
+            取り消す期間の終了日時
+        """
+
+        span = timedelta(minutes=Period.to_minutes(period))
+        range_from = Period.ceil_datetime(range_from, period)
+        range_to = Period.floor_datetime(range_to, period)
+        if range_from > range_to:
+            return
+
+        # 取り消す期間と重複する期間は、重複しない前後の期間のみを残す
+        coverage = []
+        added = []
+        removed = []
+        for interval_from, interval_to in self.get_coverage(currency_pair, period):
+            if interval_to < range_from or range_to < interval_from:
+                coverage.append((interval_from, interval_to))
+                continue
+            removed.append((interval_from, interval_to))
+            if interval_from < range_from:
+                added.append((interval_from, range_from - span))
+            if range_to < interval_to:
+                added.append((range_to + span, interval_to))
+        if not removed:
+            return
+
+        coverage = sorted(coverage + added)
+        self._coverages[(currency_pair, period)] = coverage
+        self._save_coverage(currency_pair, period, coverage, added, removed)
+
+    def is_covered(self, currency_pair: str, period: str, range_from: datetime, range_to: datetime) -> bool:
+        """
+        期間がサーバーから取得済みかどうかを判定する
+
+        Parameters
+        ----------
+        currency_pair : str
+            通貨ペア("btc_jpy", etc.)
+        period : str
+            時間枠("1m", "5m", "15m", "30m", "1h", "4h", "8h", "12h", "1d", "1w")
+        range_from : datetime
+            取得開始日時
+        range_to : datetime
+            取得終了日時
+
+        Returns
+        -------
+        bool
+            取得済みの場合True
+        """
+        range_from = Period.ceil_datetime(range_from, period)
+        range_to = Period.floor_datetime(range_to, period)
+        if range_from > range_to:
+            return True
+
+        coverage = self.get_coverage(currency_pair, period)
+        idx = bisect_right(coverage, (range_from, datetime.max)) - 1
+        return idx >= 0 and coverage[idx][0] <= range_from and range_to <= coverage[idx][1]
+
+    @abstractmethod
+    def _load_coverage(self, currency_pair: str, period: str) -> List[Tuple[datetime, datetime]]:
+        """
+        保存済みの取得済みの期間を読み込みます。
+        """
+        pass
+
+    @abstractmethod
+    def _save_coverage(self, currency_pair: str, period: str, coverage: List[Tuple[datetime, datetime]],
+                       added: List[Tuple[datetime, datetime]], removed: List[Tuple[datetime, datetime]]):
+        """
+        取得済みの期間の変更を保存します。
+        (coverageは変更後の全ての期間、addedは追加した期間、removedは削除した期間です)
+        """
+        pass
+
+
+class DBCandleStore(CandleStore):
+    """
+    ローカルDB(SQLAlchemy)にローソク足をキャッシュします。
+    """
+
+    def __init__(self, db_context: DBContext = None, chunk_size: int = 1000):
+        """
+        Parameters
+        ----------
+        db_context : DBContext, optional
+            ローカルDBのコンテキスト, by default None
+        chunk_size : int, optional
+            ローカルDBに一括保存するローソク足の本数, by default 1000
+        """
+        super().__init__()
+        self._db_context = db_context if db_context else DBContext()
+        self._chunk_size = self._validate_chunk_size(chunk_size)
+
+    def get_ohlcs(self, currency_pair: str, period: str, range_from: datetime, range_to: datetime) -> dict:
+
+        records = self._db_context.session.query(CandleOHLC) \
+            .filter(CandleOHLC.currency_pair == currency_pair) \
+            .filter(CandleOHLC.period == period) \
+            .filter(CandleOHLC.time >= range_from) \
+            .filter(CandleOHLC.time <= range_to) \
+            .order_by(asc(CandleOHLC.time)) \
+            .all()
+
+        return {
+            "times": list(map(lambda x: x.time, records)),
+            "opens": numpy.array(list(map(lambda x: float(str(x.open)), records))),
+            "highs": numpy.array(list(map(lambda x: float(str(x.high)), records))),
+            "lows": numpy.array(list(map(lambda x: float(str(x.low)), records))),
+            "closes": numpy.array(list(map(lambda x: float(str(x.close)), records))),
+        }
+
+    def save_ohlcs(self, currency_pair: str, period: str, ohlcs: dict):
+
+        # 同一時刻のローソク足は後に現れたものを優先する
+        records = {}
+        for idx, item in enumerate(ohlcs["times"]):
+            records[item] = {
+                "currency_pair": currency_pair,
+                "period": period,
+                "time": item,
+                "open": float(ohlcs["opens"][idx]),
+                "high": float(ohlcs["highs"][idx]),
+                "low": float(ohlcs["lows"][idx]),
+                "close": float(ohlcs["closes"][idx]),
+            }
+        records = sorted(records.values(), key=lambda x: x["time"])
+
+        # ローカルDBにチャンク単位でUPSERTする
+        for chunk_from in range(0, len(records), self._chunk_size):
+            chunk = records[chunk_from:chunk_from + self._chunk_size]
+
+            # 保存済みのローソク足のIDを一括で取得する
+            saved_ids = dict(
+                self._db_context.session.query(CandleOHLC.time, CandleOHLC.id)
+                .filter(CandleOHLC.currency_pair == currency_pair)
+                .filter(CandleOHLC.period == period)
+                .filter(CandleOHLC.time >= chunk[0]["time"])
+                .filter(CandleOHLC.time <= chunk[-1]["time"])
+                .all()
+            )
+
+            # 保存済みのローソク足は更新し、未保存のローソク足は挿入する
+            update_records = []
+            insert_records = []
+            for record in chunk:
+                if record["time"] in saved_ids:
+                    update_records.append(dict(record, id=saved_ids[record["time"]]))
+                else:
+                    insert_records.append(record)
+            if update_records:
+                self._db_context.session.bulk_update_mappings(CandleOHLC, update_records)
+            if insert_records:
+                self._db_context.session.bulk_insert_mappings(CandleOHLC, insert_records)
+
+            self._db_context.session.commit()
+
+    def _load_coverage(self, currency_pair: str, period: str) -> List[Tuple[datetime, datetime]]:
+
+        records = self._db_context.session.query(CandleCoverage) \
+            .filter(CandleCoverage.currency_pair == currency_pair) \
+            .filter(CandleCoverage.period == period) \
+            .order_by(asc(CandleCoverage.range_from)) \
+            .all()
+
+        return [(x.range_from, x.range_to) for x in records]
+
+    def _save_coverage(self, currency_pair: str, period: str, coverage: List[Tuple[datetime, datetime]],
+                       added: List[Tuple[datetime, datetime]], removed: List[Tuple[datetime, datetime]]):
+
+        # 削除する期間のレコードを取得する
+        records = {}
+        if removed:
+            records = {
+                x.range_from: x for x in self._db_context.session.query(CandleCoverage)
+                .filter(CandleCoverage.currency_pair == currency_pair)
+                .filter(CandleCoverage.period == period)
+                .filter(CandleCoverage.range_from.in_([x for x, _ in removed]))
+                .all()
+            }
+
+        # 追加する期間は、開始日時が同じレコードがあれば更新し、なければ挿入する
+        for range_from, range_to in added:
+            record = records.pop(range_from, None)
+            if record is not None:
+                record.range_to = range_to
+            else:
+                self._db_context.session.add(
+                    CandleCoverage(currency_pair=currency_pair, period=period, range_from=range_from, range_to=range_to)
+                )
+
+        # 追加する期間に結合された(もしくは取り消された)期間のレコードを削除する
+        for record in records.values():
+            self._db_context.session.delete(record)
+
+        self._db_context.session.commit()
+
+    @property
+    def db_context(self) -> DBContext:
+        return self._db_context
+
+    @property
+    def chunk_size(self) -> int:
+        """
+        ローカルDBに一括保存するローソク足の本数
+        """
+        return self._chunk_size
+
+    @chunk_size.setter
+    def chunk_size(self, value: int):
+        self._chunk_size = self._validate_chunk_size(value)
+
+    @staticmethod
+    def _validate_chunk_size(value: int) -> int:
+        """
+        一括保存するローソク足の本数が1以上であることを確認します。
+        """
+        if value < 1:
+            raise ValueError("chunk_size must be 1 or more. ({})".format(value))
+        return value
+
+
+class ColumnarCandleStore(CandleStore):
+    """
+    通貨ペア・時間枠ごとの列ファイル(メモリマップ)にローソク足をキャッシュします。
+
+    時刻はint64(unixtime)、価格はfloat64のバイナリとして追記され、
+    範囲の読み込みは二分探索で求めたスライス(コピーなし)となります。
+    """
+
+    _COLUMNS = [
+        ("times", numpy.int64),
+        ("opens", numpy.float64),
+        ("highs", numpy.float64),
+        ("lows", numpy.float64),
+        ("closes", numpy.float64),
+    ]
+
+    def __init__(self, directory: str = "mt_candles"):
+        """
+        Parameters
+        ----------
+        directory : str, optional
+            列ファイルを格納するディレクトリ, by default "mt_candles"
+        """
+        super().__init__()
+        self._directory = directory
+        self._columns = {}
+
+    def get_ohlcs(self, currency_pair: str, period: str, range_from: datetime, range_to: datetime) -> dict:
+
+        columns = self.get_columns(currency_pair, period)
+
+        # 二分探索で取得範囲を求める
+        idx_from = numpy.searchsorted(columns["times"], int(TimeConverter.datetime_to_unixtime(range_from)), "left")
+        idx_to = numpy.searchsorted(columns["times"], int(TimeConverter.datetime_to_unixtime(range_to)), "right")
+
+        return {
+            "times": TimeConverter.datetime64_to_datetimes(TimeConverter.unixtimes_to_datetime64(columns["times"][idx_from:idx_to])),
+            "opens": columns["opens"][idx_from:idx_to],
+            "highs": columns["highs"][idx_from:idx_to],
+            "lows": columns["lows"][idx_from:idx_to],
+            "closes": columns["closes"][idx_from:idx_to],
+        }
+
+    def get_columns(self, currency_pair: str, period: str) -> dict:
+        """
+        列ファイルを読み取り専用のメモリマップとして取得する
+
+        Parameters
+        ----------
+        currency_pair : str
+            通貨ペア("btc_jpy", etc.)
+        period : str
+            時間枠("1m", "5m", "15m", "30m", "1h", "4h", "8h", "12h", "1d", "1w")
+
+        Returns
+        -------
+        dict
+            列名をキーとするメモリマップ(時刻はunixtime)
+        """
+
+        key = (currency_pair, period)
+        if key not in self._columns:
+            self._recover_columns(currency_pair, period)
+            columns = {}
+            for name, dtype in self._COLUMNS:
+                path = self._get_column_path(currency_pair, period, name)
+                if os.path.exists(path) and os.path.getsize(path) > 0:
+                    columns[name] = numpy.memmap(path, dtype=dtype, mode="r")
+                else:
+                    columns[name] = numpy.array([], dtype=dtype)
+            self._columns[key] = columns
+        return self._columns[key]
+
+    def save_ohlcs(self, currency_pair: str, period: str, ohlcs: dict):
+
+        if len(ohlcs["times"]) == 0:
+            return
+
+        # 時刻順に並べ替え、同一時刻のローソク足は後に現れたものを優先する
+        new_columns = {
+            "times": TimeConverter.datetime64_to_unixtimes(TimeConverter.datetimes_to_datetime64(ohlcs["times"])),
+            "opens": numpy.asarray(ohlcs["opens"], dtype=numpy.float64),
+            "highs": numpy.asarray(ohlcs["highs"], dtype=numpy.float64),
+            "lows": numpy.asarray(ohlcs["lows"], dtype=numpy.float64),
+            "closes": numpy.asarray(ohlcs["closes"], dtype=numpy.float64),
+        }
+        reversed_times = new_columns["times"][::-1]
+        _, unique_idx = numpy.unique(reversed_times, return_index=True)
+        unique_idx = len(reversed_times) - 1 - unique_idx
+        for name, _ in self._COLUMNS:
+            new_columns[name] = new_columns[name][unique_idx]
+
+        os.makedirs(os.path.join(self._directory, currency_pair, period), exist_ok=True)
+
+        saved_times = self.get_columns(currency_pair, period)["times"]
+        saved_count = len(saved_times)
+        last_time = saved_times[-1] if saved_count > 0 else None
+
+        # 保存済みのローソク足と同一時刻の位置を求める
+        positions = numpy.searchsorted(saved_times, new_columns["times"], "left")
+        exists = positions < saved_count
+        exists[exists] = saved_times[positions[exists]] == new_columns["times"][exists]
+        appends = numpy.logical_not(exists)
+
+        # 途中に挿入が必要な場合は、列ファイル全体を書き直す
+        if last_time is not None and numpy.any(new_columns["times"][appends] <= last_time):
+            self._rewrite_columns(currency_pair, period, new_columns)
+            return
+
+        # 保存済みのローソク足を上書きする
+        # (キャッシュした読み取り専用のメモリマップは破棄し、次に参照したときに開き直す)
+        self._columns.pop((currency_pair, period), None)
+        if numpy.any(exists):
+            for name, dtype in self._COLUMNS[1:]:
+                path = self._get_column_path(currency_pair, period, name)
+                column = numpy.memmap(path, dtype=dtype, mode="r+")
+                column[positions[exists]] = new_columns[name][exists]
+                column.flush()
+                del column
+
+        # 未保存のローソク足を追記する
+        if numpy.any(appends):
+            for name, dtype in self._COLUMNS:
+                path = self._get_column_path(currency_pair, period, name)
+                with open(path, "ab") as f:
+                    f.write(new_columns[name][appends].astype(dtype).tobytes())
+
+    def _rewrite_columns(self, currency_pair: str, period: str, new_columns: dict):
+        """
+        保存済みのローソク足と新しいローソク足をマージし、列ファイルを書き直す
+        """
+
+        # 保存済みのローソク足を複製し、キャッシュした読み取り専用のメモリマップを破棄してから列ファイルを置き換える
+        saved_columns = {name: numpy.array(column) for name, column in self.get_columns(currency_pair, period).items()}
+        self._columns.pop((currency_pair, period), None)
+
+        # 新しいローソク足を優先してマージし、全ての列を一時ファイルに書き込む
+        times = numpy.concatenate([new_columns["times"], saved_columns["times"]])
+        times, unique_idx = numpy.unique(times, return_index=True)
+        for name, dtype in self._COLUMNS:
+            merged = numpy.concatenate([new_columns[name], saved_columns[name]])[unique_idx].astype(dtype)
+            path = self._get_column_path(currency_pair, period, name)
+            with open(path + ".tmp", "wb") as f:
+                f.write(merged.tobytes())
+
+        # 全ての一時ファイルを書き終えたことを記録してから、列ファイルを置き換える
+        # (置き換えの途中で中断された場合は、次に読み込むときに置き換えを完了する)
+        marker_path = self._get_rewrite_marker_path(currency_pair, period)
+        open(marker_path, "w").close()
+        for name, _ in self._COLUMNS:
+            path = self._get_column_path(currency_pair, period, name)
+            os.replace(path + ".tmp", path)
+        os.remove(marker_path)
+
+    def _recover_columns(self, currency_pair: str, period: str):
+        """
+        書き込みの途中で中断された列ファイルを復旧し、全ての列の本数を揃えます。
+        """
+
+        # 書き直しの途中で中断された場合は、一時ファイルを書き終えていれば置き換えを完了し、そうでなければ破棄する
+        marker_path = self._get_rewrite_marker_path(currency_pair, period)
+        is_committed = os.path.exists(marker_path)
+        for name, _ in self._COLUMNS:
+            path = self._get_column_path(currency_pair, period, name)
+            if os.path.exists(path + ".tmp"):
+                if is_committed:
+                    os.replace(path + ".tmp", path)
+                else:
+                    os.remove(path + ".tmp")
+        if is_committed:
+            os.remove(marker_path)
+
+        # 全ての列の本数が同じ場合は、復旧は不要
+        sizes = {}
+        for name, _ in self._COLUMNS:
+            path = self._get_column_path(currency_pair, period, name)
+            sizes[name] = os.path.getsize(path) if os.path.exists(path) else 0
+        bar_count = min(sizes[name] // numpy.dtype(dtype).itemsize for name, dtype in self._COLUMNS)
+        if all(sizes[name] == bar_count * numpy.dtype(dtype).itemsize for name, dtype in self._COLUMNS):
+            return
+
+        # 追記の途中で中断された場合は、全ての列に書き込まれた足までに切り詰める
+        for name, dtype in self._COLUMNS:
+            path = self._get_column_path(currency_pair, period, name)
+            if os.path.exists(path):
+                os.truncate(path, bar_count * numpy.dtype(dtype).itemsize)
+
+        # 切り詰めた足は取得済みの期間から取り消し、次に参照したときにサーバーから取得し直す
+        coverage = self.get_coverage(currency_pair, period)
+        if coverage:
+            if bar_count > 0:
+                times = numpy.fromfile(
+                    self._get_column_path(currency_pair, period, "times"), dtype=numpy.int64, count=1, offset=(bar_count - 1) * 8
+                )
+                last_time = TimeConverter.datetime64_to_datetimes(TimeConverter.unixtimes_to_datetime64(times))[0]
+                range_from = last_time + timedelta(minutes=Period.to_minutes(period))
+            else:
+                range_from = coverage[0][0]
+            self.remove_coverage(currency_pair, period, range_from, coverage[-1][1])
+
+    def _load_coverage(self, currency_pair: str, period: str) -> List[Tuple[datetime, datetime]]:
+
+        path = os.path.join(self._directory, currency_pair, period, "coverage.json")
+        if not os.path.exists(path):
+            return []
+        with open(path, "r", encoding="utf-8") as f:
+            return [(datetime.strptime(x, "%Y-%m-%dT%H:%M:%S"), datetime.strptime(y, "%Y-%m-%dT%H:%M:%S")) for x, y in json.load(f)]
+
+    def _save_coverage(self, currency_pair: str, period: str, coverage: List[Tuple[datetime, datetime]],
+                       added: List[Tuple[datetime, datetime]], removed: List[Tuple[datetime, datetime]]):
+
+        # 取得済みの期間は1つのファイルに保存するため、変更後の全ての期間で置き換える
+        os.makedirs(os.path.join(self._directory, currency_pair, period), exist_ok=True)
+        path = os.path.join(self._directory, currency_pair, period, "coverage.json")
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump([["{:%Y-%m-%dT%H:%M:%S}".format(x), "{:%Y-%m-%dT%H:%M:%S}".format(y)] for x, y in coverage], f)
+        os.replace(path + ".tmp", path)
+
+    def _get_column_path(self, currency_pair: str, period: str, name: str) -> str:
+        return os.path.join(self._directory, currency_pair, period, "{}.bin".format(name))
+
+    def _get_rewrite_marker_path(self, currency_pair: str, period: str) -> str:
+        return os.path.join(self._directory, currency_pair, period, "rewrite.commit")
+
+    @property
+    def directory(self) -> str:
+        return self._directory
@@ -0,0 +1,294 @@
+import math
+from abc import ABCMeta, abstractmethod
+from collections import deque
+
+import numpy
+import talib
+
+
+def _get_zero_epsilon() -> float:
+    """
+    TA-Libが0とみなす値の範囲を求める
+    (TA-Lib 0.4系は絶対値が0.00000001未満の値を0とみなし、それ以降のバージョンは0のみを0とみなします)
+    """
+    if talib.RSI(numpy.array([0.0, 0.000000001, 0.000000001]), 2)[-1] == 0.0:
+        return 0.00000001
+    return 0.0
+
+
+_ZERO_EPSILON = _get_zero_epsilon()
+
+
+def _is_zero(value: float) -> bool:
+    """
+    TA-Libと同様に、値が0とみなせるかを判定する
+    """
+    if _ZERO_EPSILON > 0.0:
+        return -_ZERO_EPSILON < value < _ZERO_EPSILON
+    return value == 0.0
+
+
+def _is_zero_or_neg(value: float) -> bool:
+    """
+    TA-Libと同様に、値が0以下とみなせるかを判定する
+    """
+    if _ZERO_EPSILON > 0.0:
+        return value < _ZERO_EPSILON
+    return value <= 0.0
+
+
+class StreamingCalculator(metaclass=ABCMeta):
+    """
+    テクニカルインディケーターを1本ずつ逐次計算します。
+
+    確定した足はpushで状態に取り込み、形成中の足はpeekで状態を変更せずに計算します。
+    いずれも1本あたりO(1)で、計算結果はTA-Libで同じ系列を先頭から計算した場合と
+    (浮動小数点の丸め誤差の範囲で)一致します。
+    """
+
+    @abstractmethod
+    def push(self, *values: float) -> float:
+        """
+        確定した足を状態に取り込み、その足の値を返します。
+        """
+        pass
+
+    @abstractmethod
+    def peek(self, *values: float) -> float:
+        """
+        形成中の足の値を、状態を変更せずに返します。
+        """
+        pass
+
+
+class StreamingSMA(StreamingCalculator):
+    """
+    単純移動平均(TA-Lib SMA)を逐次計算します。
+    """
+
+    def __init__(self, period: int):
+        self._period = period
+        self._window = deque()
+        self._period_total = 0.0
+
+    def push(self, value: float) -> float:
+        result = self.peek(value)
+        self._window.append(value)
+        self._period_total += value
+        if len(self._window) >= self._period:
+            self._period_total -= self._window.popleft()
+        return result
+
+    def peek(self, value: float) -> float:
+        if len(self._window) < self._period - 1:
+            return math.nan
+        return (self._period_total + value) / self._period
+
+
+class StreamingEMA(StreamingCalculator):
+    """
+    指数平滑移動平均(TA-Lib EMA)を逐次計算します。
+    最初の期間の単純移動平均を初期値とします。
+    """
+
+    def __init__(self, period: int):
+        self._period = period
+        self._k = 2.0 / (period + 1)
+        self._count = 0
+        self._seed_total = 0.0
+        self._prev_ma = math.nan
+
+    def push(self, value: float) -> float:
+        result = self.peek(value)
+        if self._count < self._period:
+            self._seed_total += value
+        else:
+            self._seed_total = 0.0
+        self._count += 1
+        if self._count >= self._period:
+            self._prev_ma = result
+        return result
+
+    def peek(self, value: float) -> float:
+        if self._count < self._period - 1:
+            return math.nan
+        elif self._count == self._period - 1:
+            return (self._seed_total + value) / self._period
+        else:
+            return ((value - self._prev_ma) * self._k) + self._prev_ma
+
+
+class StreamingWMA(StreamingCalculator):
+    """
+    加重移動平均(TA-Lib WMA)を逐次計算します。
+    """
+
+    def __init__(self, period: int):
+        self._period = period
+        self._divider = (period * (period + 1)) >> 1
+        self._window = deque()
+        self._period_sum = 0.0
+        self._period_sub = 0.0
+        self._trailing_value = 0.0
+
+    def push(self, value: float) -> float:
+        result = self.peek(value)
+        if len(self._window) < self._period - 1:
+            self._period_sub += value
+            self._period_sum += value * (len(self._window) + 1)
+            self._window.append(value)
+        else:
+            self._period_sub += value
+            self._period_sub -= self._trailing_value
+            self._period_sum += value * self._period
+            self._window.append(value)
+            self._trailing_value = self._window.popleft()
+            self._period_sum -= self._period_sub
+        return result
+
+    def peek(self, value: float) -> float:
+        if len(self._window) < self._period - 1:
+            return math.nan
+        return (self._period_sum + value * self._period) / self._divider
+
+
+class StreamingSTDDEV(StreamingCalculator):
+    """
+    標準偏差(TA-Lib STDDEV)を逐次計算します。
+    TA-Libと同じく、価格の合計と2乗の合計から分散を求めます。
+    (同じ順序で加算・減算するため、丸め誤差も含めてTA-Libで先頭から計算した場合と一致します)
+    """
+
+    def __init__(self, period: int, deviation: float):
+        self._period = period
+        self._deviation = deviation
+        self._window = deque()
+        self._period_total1 = 0.0
+        self._period_total2 = 0.0
+
+    def push(self, value: float) -> float:
+        if len(self._window) < self._period - 1:
+            self._period_total1 += value
+            self._period_total2 += value * value
+            self._window.append(value)
+            return math.nan
+        result, period_total1, period_total2 = self._calculate(value)
+        trailing_value = self._window.popleft()
+        self._period_total1 = period_total1 - trailing_value
+        self._period_total2 = period_total2 - trailing_value * trailing_value
+        self._window.append(value)
+        return result
+
+    def peek(self, value: float) -> float:
+        if len(self._window) < self._period - 1:
+            return math.nan
+        return self._calculate(value)[0]
+
+    def _calculate(self, value: float) -> (float, float, float):
+        period_total1 = self._period_total1 + value
+        period_total2 = self._period_total2 + value * value
+        mean_value1 = period_total1 / self._period
+        mean_value2 = period_total2 / self._period
+        variance = mean_value2 - (mean_value1 * mean_value1)
+        # TA-Libと同様に、0以下とみなせる分散は0とする
+        if _is_zero_or_neg(variance):
+            return 0.0, period_total1, period_total2
+        return math.sqrt(variance) * self._deviation, period_total1, period_total2
+
+
+class StreamingRSI(StreamingCalculator):
+    """
+    RSI(TA-Lib RSI)を逐次計算します。
+    最初の期間の平均値を初期値とし、以降はWilderの平滑化を行います。
+    """
+
+    def __init__(self, period: int):
+        self._period = period
+        self._count = 0
+        self._prev_value = math.nan
+        self._prev_gain = 0.0
+        self._prev_loss = 0.0
+
+    def push(self, value: float) -> float:
+        result, self._prev_gain, self._prev_loss = self._calculate(value)
+        self._prev_value = value
+        self._count += 1
+        return result
+
+    def peek(self, value: float) -> float:
+        return self._calculate(value)[0]
+
+    def _calculate(self, value: float) -> (float, float, float):
+        prev_gain = self._prev_gain
+        prev_loss = self._prev_loss
+        if self._count == 0:
+            return math.nan, prev_gain, prev_loss
+
+        diff = value - self._prev_value
+        if self._count > self._period:
+            prev_loss *= (self._period - 1)
+            prev_gain *= (self._period - 1)
+        if diff < 0:
+            prev_loss -= diff
+        else:
+            prev_gain += diff
+        if self._count < self._period:
+            return math.nan, prev_gain, prev_loss
+
+        prev_loss /= self._period
+        prev_gain /= self._period
+        total = prev_gain + prev_loss
+        if _is_zero(total):
+            return 0.0, prev_gain, prev_loss
+        return 100.0 * (prev_gain / total), prev_gain, prev_loss
+
+
+class StreamingATR(StreamingCalculator):
+    """
+    ATR(TA-Lib ATR)を逐次計算します。
+    最初の期間のTrue Rangeの平均値を初期値とし、以降はWilderの平滑化を行います。
+    """
+
+    def __init__(self, period: int):
+        self._period = period
+        self._count = 0
+        self._prev_close = math.nan
+        self._tr_total = 0.0
+        self._prev_atr = math.nan
+
+    def push(self, high: float, low: float, close: float) -> float:
+        result = self.peek(high, low, close)
+        if 1 <= self._count <= self._period:
+            self._tr_total += self._true_range(high, low)
+        if self._count >= self._period:
+            self._prev_atr = result
+        self._prev_close = close
+        self._count += 1
+        return result
+
+    def peek(self, high: float, low: float, close: float) -> float:
+        if self._count == 0:
+            return math.nan
+        true_range = self._true_range(high, low)
+        if self._period <= 1:
+            return true_range
+        elif self._count < self._period:
+            return math.nan
+        elif self._count == self._period:
+            return (self._tr_total + true_range) / self._period
+        else:
+            prev_atr = self._prev_atr
+            prev_atr *= self._period - 1
+            prev_atr += true_range
+            prev_atr /= self._period
+            return prev_atr
+
+    def _true_range(self, high: float, low: float) -> float:
+        greatest = high - low
+        value = abs(self._prev_close - high)
+        if value > greatest:
+            greatest = value
+        value = abs(self._prev_close - low)
+        if value > greatest:
+            greatest = value
+        return greatest
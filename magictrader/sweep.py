@@ -0,0 +1,167 @@
+import csv
+import itertools
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import List
+
+from magictrader.candle import CandleFeeder
+from magictrader.const import TickMode
+from magictrader.inifile import INIFile
+from magictrader.replay import ReplayChartAPI
+from magictrader.store import CandleStore
+
+
+class ParameterSweep:
+    """
+    パラメーターの組み合わせごとにヘッドレスバックテストを並列に実行し、結果を集計します。
+
+    ローソク足は実行前に１度だけローカルのキャッシュへ読み込まれ、各プロセスからは読み取りのみ行われます。
+    INIファイルのキャッシュを"columnar"にすると、各プロセスはメモリマップされた同一のファイルを共有します。
+    """
+
+    def __init__(self, terminal_class: type, currency_pair: str, period: str, datetime_from: datetime, datetime_to: datetime,
+                 param_grid: dict, terminal_name: str = "mt", max_workers: int = None):
+        """
+        Parameters
+        ----------
+        terminal_class : type
+            TradeTerminalを継承したクラス(各プロセスからimportできる必要があります)
+            TradeTerminalと同じ位置引数(通貨ペア, 時間枠, 実行モード, 開始日時, 終了日時, ターミナルの識別名)で作成され、
+            パラメーターは作成後にparamsに設定されます。(on_initより前に設定されるため、on_initから参照できます)
+        currency_pair : str
+            通貨ペア("btc_jpy", etc.)
+        period : str
+            時間枠("1m", "5m", "15m", "30m", "1h", "4h", "8h", "12h", "1d", "1w")
+        datetime_from : datetime
+            バックテストの開始日時
+        datetime_to : datetime
+            バックテストの終了日時
+        param_grid : dict
+            パラメーター名と、その候補値のリスト({"period": [10, 20, 30], etc.})
+        terminal_name : str, optional
+            ターミナルの識別名, by default "mt"
+        max_workers : int, optional
+            並列に実行するプロセスの数(Noneの場合はCPUのコア数), by default None
+        """
+        self._terminal_class = terminal_class
+        self._currency_pair = currency_pair
+        self._period = period
+        self._datetime_from = datetime_from
+        self._datetime_to = datetime_to
+        self._param_grid = param_grid
+        self._terminal_name = terminal_name
+        self._max_workers = max_workers
+        self._results = []
+
+    def run(self) -> List[dict]:
+        """
+        パラメーターの全ての組み合わせでバックテストを実行する
+
+        Returns
+        -------
+        List[dict]
+            パラメーターの組み合わせごとの結果(パラメーター, total_profit, trade_count, max_drawdown, elapsed)
+        """
+
+        # ローソク足をキャッシュに読み込む
+        self._prepare_candles()
+
+        # パラメーターの組み合わせごとにバックテストを実行する
+        params_list = ParameterSweep.expand_grid(self._param_grid)
+        args_list = [
+            (self._terminal_class, self._currency_pair, self._period, self._datetime_from, self._datetime_to, self._terminal_name, params)
+            for params in params_list
+        ]
+        with ProcessPoolExecutor(max_workers=self._max_workers) as executor:
+            self._results = list(executor.map(_run_backtest, args_list))
+
+        return self._results
+
+    def save_as_csv(self, filepath: str):
+        """
+        結果をCSVファイルに保存する
+
+        Parameters
+        ----------
+        filepath : str
+            CSVファイルのパス
+        """
+        if not self._results:
+            return
+
+        with open(filepath, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=list(self._results[0].keys()))
+            writer.writeheader()
+            writer.writerows(self._results)
+
+    @staticmethod
+    def expand_grid(param_grid: dict) -> List[dict]:
+        """
+        パラメーターの候補値から、全ての組み合わせを作成する
+
+        Parameters
+        ----------
+        param_grid : dict
+            パラメーター名と、その候補値のリスト
+
+        Returns
+        -------
+        List[dict]
+            パラメーターの組み合わせ
+        """
+        names = list(param_grid.keys())
+        return [dict(zip(names, values)) for values in itertools.product(*[param_grid[name] for name in names])]
+
+    def _prepare_candles(self):
+        """
+        バックテストに必要なローソク足を、サーバーからローカルのキャッシュに読み込みます。
+        """
+
+        # INIの設定
+        ini_filepath = os.path.join(os.getcwd(), "{}.ini".format(self._terminal_name))
+        if not os.path.exists(ini_filepath):
+            template_path = os.path.join(os.path.dirname(__file__), "template/mt.ini")
+            shutil.copy(template_path, ini_filepath)
+        inifile = INIFile(ini_filepath)
+
+        # 先読みするとバックテストの全期間(ティックの粒度に応じて詳細な足を含む)がキャッシュに保存される
+        CandleFeeder(
+            self._currency_pair, self._period, 200, True, self._datetime_from, self._datetime_to,
+            preload=True, candle_store=CandleStore.create_from_ini(inifile), chart_api=ReplayChartAPI.create_from_ini(inifile),
+            resample_period=inifile.get_str("cache", "resample_from", "") or None,
+            tick_mode=TickMode(inifile.get_str("backtest", "tick_mode", "detail")),
+            response_bar_limit=inifile.get_int("server", "response_bar_limit", 0)
+        )
+
+    @property
+    def results(self) -> List[dict]:
+        return self._results
+
+    @property
+    def param_grid(self) -> dict:
+        return self._param_grid
+
+
+def _run_backtest(args: tuple) -> dict:
+    """
+    １つのパラメーターの組み合わせでヘッドレスバックテストを実行します。(子プロセスで実行されます)
+    """
+
+    terminal_class, currency_pair, period, datetime_from, datetime_to, terminal_name, params = args
+
+    started_at = time.perf_counter()
+    terminal = terminal_class(currency_pair, period, "backtest_headless", datetime_from, datetime_to, terminal_name)
+    terminal.params = params
+    terminal.run()
+    elapsed = time.perf_counter() - started_at
+
+    position_repository = terminal.position_repository
+    result = dict(params)
+    result["total_profit"] = position_repository.total_profit
+    result["trade_count"] = position_repository.trade_count
+    result["max_drawdown"] = position_repository.max_drawdown
+    result["elapsed"] = round(elapsed, 3)
+    return result
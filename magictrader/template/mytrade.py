@@ -28,9 +28,9 @@ class MyTradeTerminal(TradeTerminal):
         """
 
         # テクニカルインディケーターを作成する
-        sma_fast = SMA(feeder, 5)           # 短期SMA
-        sma_middle = SMA(feeder, 25)        # 中期SMA
-        sma_slow = SMA(feeder, 75)          # 長期SMA
+        sma_fast = SMA(feeder, self.params.get("sma_fast", 5))       # 短期SMA
+        sma_middle = SMA(feeder, self.params.get("sma_middle", 25))   # 中期SMA
+        sma_slow = SMA(feeder, self.params.get("sma_slow", 75))       # 長期SMA
         rsi_fast = RSI(feeder, 7)
         rsi_slow = RSI(feeder, 13)
 
@@ -1,25 +1,30 @@
 import logging
 import logging.config
 import os
+import re
 import shutil
 import sys
 from abc import ABCMeta, abstractmethod
 from datetime import datetime
 
 from magictrader.candle import Candle, CandleFeeder
-from magictrader.chart import Chart, ChartWindow
-from magictrader.const import ModeTRADESIGNAL
+from magictrader.chart import Chart, ChartWindow, HeadlessChart
+from magictrader.const import ModeTRADESIGNAL, TickMode
 from magictrader.event import EventArgs
 from magictrader.indicator import TRADESIGNAL
 from magictrader.inifile import INIFile
 from magictrader.messenger import SlackMessenger, TwitterMessenger
 from magictrader.position import Position, PositionRepository
+from magictrader.ratelimit import TokenBucket
+from magictrader.replay import ReplayChartAPI
+from magictrader.store import CandleStore
 from magictrader.utils import TimeConverter
 
 
 class TradeTerminal:
 
-    def __init__(self, currency_pair: str, period: str, trade_mode: str, datetime_from: datetime = None, datetime_to: datetime = None, terminal_name: str = "mt"):
+    def __init__(self, currency_pair: str, period: str, trade_mode: str, datetime_from: datetime = None, datetime_to: datetime = None, terminal_name: str = "mt",
+                 params: dict = None):
         """
         Parameters
         ----------
@@ -29,14 +34,19 @@ class TradeTerminal:
             時間枠("1m", "5m", "15m", "30m", "1h", "4h", "8h", "12h", "1d", "1w")
         trade_mode : str
             ターミナルの実行モードを指定します。
-            実践モード("practice")、フォワードテスト("forwardtest")、バックテスト("backtest")のいずれかを指定します。
+            実践モード("practice")、フォワードテスト("forwardtest")、バックテスト("backtest")、
+            ヘッドレスバックテスト("backtest_headless")のいずれかを指定します。
             バックテストを指定した場合、開始期間(datetime_from)・終了期間(datetime_to)を合わせて指定します。
+            ヘッドレスバックテストはチャートを表示せずに最後まで実行し、結果を保存して終了します。
         datetime_from : datetime, optional
             バックテストの開始日時, by default None
         datetime_to : datetime, optional
             バックテストの終了日時, by default None
         terminal_name : str, optional
             ターミナルの識別名, by default "mt"
+        params : dict, optional
+            ストラテジーのパラメーター(パラメータースイープで変化させる値), by default None
+            ストラテジーからはself.paramsで参照します。
         """
 
         # loggerの設定
@@ -56,6 +66,7 @@ class TradeTerminal:
         self._datetime_from = datetime_from
         self._datetime_to = datetime_to
         self._terminal_name = terminal_name
+        self._params = params if params is not None else {}
 
         # INIの設定
         ini_filepath = os.path.join(os.getcwd(), "{}.ini".format(terminal_name))
@@ -64,11 +75,27 @@ class TradeTerminal:
             shutil.copy(template_path, ini_filepath)
         self._inifile = INIFile(ini_filepath)
 
+        # サーバーへのリクエストの頻度制限を設定する(プロセス全体で共有)
+        rate_limiter = TokenBucket.shared()
+        rate_limiter.rate = self._inifile.get_float("server", "request_rate", 1.0)
+        rate_limiter.capacity = self._inifile.get_float("server", "request_burst", 1.0)
+
+        # ローソク足のキャッシュ、ローソク足を取得するAPIを作成する
+        candle_store = CandleStore.create_from_ini(self._inifile)
+        chart_api = ReplayChartAPI.create_from_ini(self._inifile)
+
         # ローソク足のフィーダーを作成する
         if self._trade_mode in ["practice", "forwardtest"]:
-            self._feeder = CandleFeeder(self._currency_pair, self._period, 200)
-        elif self._trade_mode == "backtest":
-            self._feeder = CandleFeeder(self._currency_pair, self._period, 200, True, self._datetime_from, self._datetime_to)
+            self._feeder = CandleFeeder(self._currency_pair, self._period, 200, candle_store=candle_store, chart_api=chart_api)
+        elif self._trade_mode in ["backtest", "backtest_headless"]:
+            self._feeder = CandleFeeder(
+                self._currency_pair, self._period, 200, True, self._datetime_from, self._datetime_to,
+                preload=self._inifile.get_bool("backtest", "preload", False), candle_store=candle_store, chart_api=chart_api,
+                resample_period=self._inifile.get_str("cache", "resample_from", "") or None,
+                precompute=self._inifile.get_bool("backtest", "precompute", False),
+                tick_mode=TickMode(self._inifile.get_str("backtest", "tick_mode", "detail")),
+                response_bar_limit=self._inifile.get_int("server", "response_bar_limit", 0)
+            )
 
         # 売買シグナルインディケーターを作成する
         self._buy_open_signal = TRADESIGNAL(self._feeder, ModeTRADESIGNAL.BUY_OPEN)
@@ -77,10 +104,16 @@ class TradeTerminal:
         self._sell_close_signal = TRADESIGNAL(self._feeder, ModeTRADESIGNAL.SELL_CLOSE)
 
         # ローソク足を作成する
-        self._candle = Candle(self._feeder)
+        self._candle = Candle(
+            self._feeder,
+            use_array=self._trade_mode in ["backtest", "backtest_headless"] and self._inifile.get_bool("backtest", "candle_array", False)
+        )
 
         # チャートを作成する
-        self._chart = Chart()
+        if self._trade_mode == "backtest_headless":
+            self._chart = HeadlessChart()
+        else:
+            self._chart = Chart()
 
         # チャート(メイン画面)を作成する
         self._window_main = ChartWindow()
@@ -113,7 +146,7 @@ class TradeTerminal:
 
         # チャートを表示する
         self._chart.show()
-        self._draw_position(self._position_repository)
+        self._draw_positions(self._position_repository)
 
         is_newbar = False
         evaluated_til = datetime(1900, 1, 1)
@@ -121,31 +154,85 @@ class TradeTerminal:
         while True:
 
             # タイトルを更新する
-            self._window_main.title = "{} : {} - {} / total_profit : {}".format(
-                self._currency_pair,
-                self._candle.times[0].strftime("%Y-%m-%d %H:%M"),
-                self._candle.times[-1].strftime("%Y-%m-%d %H:%M"),
-                "{:+,.0f}".format(int(self._position_repository.total_profit))
-            )
+            if self._trade_mode != "backtest_headless":
+                self._update_title()
 
             # 新しい足が追加されたかどうかを評価する
             if self._candle.times[-1] > evaluated_til:
                 evaluated_til = self._candle.times[-1]
                 is_newbar = True
 
-            # ティックを評価する
-            self._on_tick(self._candle, data_bag, self._position_repository, is_newbar)
-
             # ストップ注文・リミット注文を執行する
+            # (前回のティックまでに発注された注文を、最新のティックの値幅で判定してからティックを評価する)
             self._exec_stop_and_limit(self._candle, self._position_repository)
 
+            # ティックを評価する
+            self._on_tick(self._candle, data_bag, self._position_repository, is_newbar)
+
             is_newbar = False
 
             if self._trade_mode in ["practice", "forwardtest"]:
                 self._chart.wait(2.0)
-            self._feeder.go_next()
+            if not self._feeder.go_next() and self._trade_mode == "backtest_headless":
+                break
             self._chart.refresh()
 
+        # ヘッドレスバックテストの結果を保存する
+        self._save_backtest_result()
+
+    def _update_title(self):
+        """
+        チャートのタイトルを更新します。
+        """
+        self._window_main.title = "{} : {} - {} / total_profit : {}".format(
+            self._currency_pair,
+            self._candle.times[0].strftime("%Y-%m-%d %H:%M"),
+            self._candle.times[-1].strftime("%Y-%m-%d %H:%M"),
+            "{:+,.0f}".format(int(self._position_repository.total_profit))
+        )
+
+    def _save_backtest_result(self):
+        """
+        ヘッドレスバックテストの結果(ポジション、チャートの画像)を保存します。
+        """
+
+        # ポジションを保存する(パラメーターが指定された場合は、パラメーターごとに保存する)
+        result_name = self._terminal_name
+        if self._params:
+            result_name += "_" + "_".join(["{}={}".format(k, v) for k, v in self._params.items()])
+            result_name = re.sub(r"[^\w.=-]", "-", result_name)
+        self._position_repository.save_as_json("{}.json".format(result_name))
+
+        # チャートを画像として保存する(ポジションと同様に、パラメーターごとに保存する)
+        if self._inifile.get_bool("backtest", "save_chart_image", False):
+            self._update_title()
+            pict_dir = os.path.join(os.getcwd(), "report")
+            os.makedirs(pict_dir, exist_ok=True)
+            pict_path = os.path.join(pict_dir, "chart_{}.png".format(result_name))
+            self._chart.save_as_png(pict_path)
+
+        self._logger.info("backtest completed. total_profit : {}".format(
+            "{:+,.0f}".format(int(self._position_repository.total_profit))
+        ))
+
+    @property
+    def params(self) -> dict:
+        """
+        ストラテジーのパラメーター(runより前に設定します)
+        """
+        return self._params
+
+    @params.setter
+    def params(self, value: dict):
+        self._params = value if value is not None else {}
+
+    @property
+    def position_repository(self) -> PositionRepository:
+        """
+        ポジションを管理するためのリポジトリ
+        """
+        return self._position_repository
+
     @abstractmethod
     def _on_init(self, feeder: CandleFeeder, chart: Chart, window_main: ChartWindow, data_bag: dict):
         """
@@ -267,9 +354,11 @@ class TradeTerminal:
         """
         position = eargs.params["position"]
         position_repository = eargs.params["position_repository"]
-        position_repository.save_as_json("{}.json".format(self._terminal_name))
-        self._draw_position(position_repository)
-        self._notify_position(position, position_repository)
+        self._draw_position(position)
+        # ヘッドレスバックテストの場合は、終了時にまとめて保存する
+        if self._trade_mode != "backtest_headless":
+            position_repository.save_as_json("{}.json".format(self._terminal_name))
+            self._notify_position(position, position_repository)
 
     def _position_repository_position_closed(self, sender: object, eargs: EventArgs):
         """
@@ -277,64 +366,63 @@ class TradeTerminal:
         """
         position = eargs.params["position"]
         position_repository = eargs.params["position_repository"]
-        position_repository.save_as_json("{}.json".format(self._terminal_name))
-        self._draw_position(position_repository)
-        self._notify_position(position, position_repository)
+        self._draw_position(position)
+        # ヘッドレスバックテストの場合は、終了時にまとめて保存する
+        if self._trade_mode != "backtest_headless":
+            position_repository.save_as_json("{}.json".format(self._terminal_name))
+            self._notify_position(position, position_repository)
 
-    def _draw_position(self, position_repository: PositionRepository):
+    def _draw_positions(self, position_repository: PositionRepository):
         """
-        ポジションを描画します。
+        リポジトリの全てのポジションを描画します。
         """
         for position in position_repository.positions:
-            if position.open_action == "buy":
-                if position.is_opened:
-                    if position.open_time in self._buy_open_signal.times:
-                        idx = self._buy_open_signal.times.index(position.open_time)
-                        self._buy_open_signal.prices[idx] = position.open_price
-                if position.is_closed:
-                    if position.close_time in self._buy_close_signal.times:
-                        idx = self._buy_close_signal.times.index(position.close_time)
-                        self._buy_close_signal.prices[idx] = position.close_price
-            else:
-                if position.is_opened:
-                    if position.open_time in self._sell_open_signal.times:
-                        idx = self._sell_open_signal.times.index(position.open_time)
-                        self._sell_open_signal.prices[idx] = position.open_price
-                if position.is_closed:
-                    if position.close_time in self._sell_close_signal.times:
-                        idx = self._sell_close_signal.times.index(position.close_time)
-                        self._sell_close_signal.prices[idx] = position.close_price
+            self._set_position_signal(position)
 
         self._chart.refresh()
 
+    def _draw_position(self, position: Position):
+        """
+        ポジションを描画します。
+        """
+        self._set_position_signal(position)
+
+        self._chart.refresh()
+
+    def _set_position_signal(self, position: Position):
+        """
+        ポジションの売買シグナルを設定します。
+        """
+        if position.open_action == "buy":
+            if position.is_opened:
+                self._buy_open_signal.set_signal(position.open_time, position.open_price)
+            if position.is_closed:
+                self._buy_close_signal.set_signal(position.close_time, position.close_price)
+        else:
+            if position.is_opened:
+                self._sell_open_signal.set_signal(position.open_time, position.open_price)
+            if position.is_closed:
+                self._sell_close_signal.set_signal(position.close_time, position.close_price)
+
     def _exec_stop_and_limit(self, candle: Candle, position_repository: PositionRepository):
         """
         ストップ注文・リミット注文を執行します。
+
+        最新のティックの値幅(直前のティックからの高値・安値、終値のみのバックテストではローソク足の高値・安値)が
+        注文価格に達した注文を注文板から求め、注文価格で執行します。
+        値幅の始点で既に注文価格を超えていた場合(窓開けなど)は、始点の価格で執行します。
+        同じティックでストップ価格・リミット価格の両方に達した場合は、ストップ注文を執行します。
         """
 
-        # ロングポジション
-        long_positions = position_repository.get_open_positions("buy")
-        for long_position in long_positions:
-            # ストップ注文を執行する
-            if long_position.stop_price is not None:
-                if candle.closes[-1] <= long_position.stop_price:
-                    long_position.close(candle.times[-1], candle.price[-1], "ストップ注文を執行")
-            # リミット注文を執行する
-            if long_position.limit_price is not None:
-                if candle.closes[-1] >= long_position.limit_price:
-                    long_position.close(candle.times[-1], candle.price[-1], "リミット注文を執行")
-
-        # ショートポジション
-        short_positions = position_repository.get_open_positions("sell")
-        for short_position in short_positions:
-            # ストップ注文を執行する
-            if short_position.stop_price is not None:
-                if candle.closes[-1] >= short_position.stop_price:
-                    short_position.close(candle.times[-1], candle.price[-1], "ストップ注文を執行")
-            # リミット注文を執行する
-            if short_position.limit_price is not None:
-                if candle.closes[-1] <= short_position.limit_price:
-                    short_position.close(candle.times[-1], candle.price[-1], "リミット注文を執行")
+        matched_orders = position_repository.order_book.match(self._feeder.tick_open, self._feeder.tick_high, self._feeder.tick_low)
+        for position, order_type, exec_price in matched_orders:
+            # 他のポジションの決済処理で決済済みの場合
+            if position.is_closed:
+                continue
+            if order_type == "stop":
+                position.close(candle.times[-1], exec_price, "ストップ注文を執行")
+            else:
+                position.close(candle.times[-1], exec_price, "リミット注文を執行")
 
     def _notify_position(self, position: Position, position_repository: PositionRepository):
         """
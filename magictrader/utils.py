@@ -1,5 +1,8 @@
 import time
 from datetime import datetime
+from typing import List
+
+import numpy
 
 
 class TimeConverter:
@@ -34,3 +37,50 @@ class TimeConverter:
         unixtimeからstrに変換する
         """
         return "{0:%Y-%m-%d %H:%M:%S}".format(datetime.fromtimestamp(from_unixtime))
+
+    @staticmethod
+    def unixtimes_to_datetime64(from_unixtimes) -> numpy.ndarray:
+        """
+        unixtimeの配列からdatetime64[s](ローカル時刻)の配列に一括変換する
+        """
+        unixtimes = numpy.asarray(from_unixtimes, dtype=numpy.int64)
+        return (unixtimes + TimeConverter._get_utc_offsets(unixtimes)).astype("datetime64[s]")
+
+    @staticmethod
+    def datetime64_to_unixtimes(from_datetime64) -> numpy.ndarray:
+        """
+        datetime64[s](ローカル時刻)の配列からunixtimeの配列に一括変換する
+        """
+        seconds = numpy.asarray(from_datetime64, dtype="datetime64[s]").astype(numpy.int64)
+        unixtimes = seconds - TimeConverter._get_utc_offsets(seconds)
+        # 夏時間の切り替わりをまたぐ場合は、変換後の時刻のオフセットで補正する
+        return seconds - TimeConverter._get_utc_offsets(unixtimes)
+
+    @staticmethod
+    def datetimes_to_datetime64(from_datetimes: List[datetime]) -> numpy.ndarray:
+        """
+        datetimeのリストからdatetime64[s]の配列に一括変換する
+        """
+        # datetimeから直接変換するより高速なため、日数と時分秒から秒数を求める
+        seconds = numpy.fromiter(
+            ((x.toordinal() - 719163) * 86400 + x.hour * 3600 + x.minute * 60 + x.second for x in from_datetimes),
+            dtype=numpy.int64, count=len(from_datetimes)
+        )
+        return seconds.astype("datetime64[s]")
+
+    @staticmethod
+    def datetime64_to_datetimes(from_datetime64) -> List[datetime]:
+        """
+        datetime64[s]の配列からdatetimeのリストに一括変換する
+        """
+        return numpy.asarray(from_datetime64, dtype="datetime64[s]").tolist()
+
+    @staticmethod
+    def _get_utc_offsets(unixtimes: numpy.ndarray) -> numpy.ndarray:
+        """
+        unixtimeごとのローカル時刻のUTCからのオフセット(秒)を取得します。
+        (オフセットは15分単位で切り替わるため、15分ごとに１度だけ求めます)
+        """
+        buckets, inverse = numpy.unique(unixtimes // 900, return_inverse=True)
+        offsets = numpy.array([time.localtime(int(x) * 900).tm_gmtoff for x in buckets], dtype=numpy.int64)
+        return offsets[inverse.reshape(-1)]
@@ -50,5 +50,8 @@ setup(
     entry_points="""\
       [console_scripts]
       create_tradeterminal = magictrader.command:create_tradeterminal
+      sweep_tradeterminal = magictrader.command:sweep_tradeterminal
+      mt-replay = magictrader.command:replay_server
+      mt-prefetch = magictrader.command:prefetch_candles
       """,
 )
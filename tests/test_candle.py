@@ -0,0 +1,172 @@
+import asyncio
+import csv
+import time
+from datetime import datetime, timedelta
+
+import numpy
+import pytest
+from zaifer import Chart as ChartAPI
+from zaifer import UrlConfigs
+
+from magictrader.candle import AsyncCandleFeeder, CandleFeeder
+from magictrader.const import Period, TickMode
+from magictrader.model import DBContext
+from magictrader.ratelimit import TokenBucket
+from magictrader.replay import ReplayChartAPI, ReplayServer
+from magictrader.store import DBCandleStore
+from magictrader.utils import TimeConverter
+
+# 応答するローソク足(2019-01-01 00:00から120本の1時間足)
+SOURCE_FROM = datetime(2019, 1, 1)
+SOURCE_COUNT = 120
+
+
+def _create_replay_api(tmp_path, max_bar_count: int) -> ReplayChartAPI:
+    """
+    応答の本数が制限されたリプレイのAPIを作成する
+    """
+    closes = 1000000 + numpy.arange(SOURCE_COUNT, dtype=float) * 100
+    store = DBCandleStore(DBContext("sqlite:///{}".format(tmp_path / "source.sqlite")))
+    store.save_ohlcs("btc_jpy", "1h", {
+        "times": [SOURCE_FROM + timedelta(hours=x) for x in range(SOURCE_COUNT)],
+        "opens": closes - 50,
+        "highs": closes + 100,
+        "lows": closes - 100,
+        "closes": closes,
+    })
+    return ReplayChartAPI(store, max_bar_count=max_bar_count)
+
+
+def _create_feeder(tmp_path, chart_api: ReplayChartAPI, response_bar_limit: int = 0) -> CandleFeeder:
+    """
+    リプレイのAPIからローソク足を取得するフィーダーを作成する(キャッシュは空の状態から開始)
+    """
+    return CandleFeeder(
+        "btc_jpy", "1h", 10, True, SOURCE_FROM + timedelta(hours=60), SOURCE_FROM + timedelta(hours=61),
+        preload=True, candle_store=DBCandleStore(DBContext("sqlite:///{}".format(tmp_path / "cache.sqlite"))),
+        rate_limiter=TokenBucket(1000.0, 1000.0), chart_api=chart_api, tick_mode=TickMode.BAR,
+        response_bar_limit=response_bar_limit
+    )
+
+
+def test_get_fetched_range():
+    range_from = datetime(2019, 1, 1, 0)
+    range_to = datetime(2019, 1, 1, 9)
+    ohlcs = {"times": [datetime(2019, 1, 1, x) for x in range(3)]}
+
+    # 上限が不明な場合は、最後の足までを取得済みとする
+    assert CandleFeeder.get_fetched_range(ohlcs, range_from, range_to) == (range_from, datetime(2019, 1, 1, 2))
+
+    # 上限に満たない応答は、取得期間の全体を取得済みとする
+    assert CandleFeeder.get_fetched_range(ohlcs, range_from, range_to, 4) == (range_from, range_to)
+    assert CandleFeeder.get_fetched_range(ohlcs, range_from, range_to, 3) == (range_from, datetime(2019, 1, 1, 2))
+
+    # 足が存在しない応答は、切り詰められていない
+    assert CandleFeeder.get_fetched_range({"times": []}, range_from, range_to) == (range_from, range_to)
+
+
+@pytest.mark.parametrize("response_bar_limit", [0, 20])
+def test_short_response_is_not_recorded_as_gap(tmp_path, response_bar_limit):
+    chart_api = _create_replay_api(tmp_path, 20)
+    feeder = _create_feeder(tmp_path, chart_api, response_bar_limit)
+    store = feeder.candle_store
+
+    # 切り詰められた応答の続きを取得し、取得期間の全ての足をキャッシュに保存する
+    range_from = SOURCE_FROM + timedelta(hours=70)
+    range_to = SOURCE_FROM + timedelta(hours=99)
+    ohlcs = feeder._get_ohlcs_from_local_or_server("btc_jpy", "1h", range_from, range_to)
+    assert ohlcs["times"] == [range_from + timedelta(hours=x) for x in range(30)]
+
+    # 取得済みの期間には、応答の最後の足より後の(取得していない)期間を含まない
+    cached_times = set(store.get_ohlcs("btc_jpy", "1h", SOURCE_FROM, SOURCE_FROM + timedelta(hours=200))["times"])
+    for interval_from, interval_to in store.get_coverage("btc_jpy", "1h"):
+        bar_time = interval_from
+        while bar_time <= min(interval_to, SOURCE_FROM + timedelta(hours=SOURCE_COUNT - 1)):
+            assert bar_time in cached_times
+            bar_time += timedelta(hours=1)
+    assert store.is_covered("btc_jpy", "1h", range_from, range_to)
+
+
+def test_trailing_gap_is_recorded_only_for_complete_response(tmp_path):
+    chart_api = _create_replay_api(tmp_path, 20)
+    last_time = SOURCE_FROM + timedelta(hours=SOURCE_COUNT - 1)
+    range_from = last_time - timedelta(hours=4)
+
+    # 上限が不明な場合は、最後の足より後を取引所にデータが存在しない期間とみなさない
+    feeder = _create_feeder(tmp_path, chart_api)
+    feeder._get_ohlcs_from_local_or_server("btc_jpy", "1h", range_from, range_from)
+    coverage = feeder.candle_store.get_coverage("btc_jpy", "1h")
+    assert coverage[-1][1] == last_time
+    assert not feeder.candle_store.is_covered("btc_jpy", "1h", last_time + timedelta(hours=1), last_time + timedelta(hours=1))
+
+    # 応答が上限に満たない場合は、取得期間の全体を取得済みとする
+    feeder = _create_feeder(tmp_path, chart_api, 20)
+    feeder._get_ohlcs_from_local_or_server("btc_jpy", "1h", last_time + timedelta(hours=1), last_time + timedelta(hours=1))
+    assert feeder.candle_store.is_covered("btc_jpy", "1h", last_time + timedelta(hours=1), last_time + timedelta(hours=49))
+
+
+def test_preload_with_short_responses(tmp_path):
+    chart_api = _create_replay_api(tmp_path, 7)
+    feeder = _create_feeder(tmp_path, chart_api)
+
+    # 先読みした期間のローソク足に欠損がない
+    preloaded_times = feeder._preloaded_ohlcs["times"]
+    assert preloaded_times == [preloaded_times[0] + timedelta(hours=x) for x in range(len(preloaded_times))]
+    assert preloaded_times[-1] == SOURCE_FROM + timedelta(hours=62)
+
+
+def _save_recent_candles_as_csv(filepath: str, period: str, bar_count: int, base_price: float) -> list:
+    """
+    現在までの直近のローソク足をCSVファイルに保存する
+    """
+    span = timedelta(minutes=Period.to_minutes(period))
+    last_time = Period.floor_datetime(datetime.now(), period)
+    times = [last_time - span * x for x in reversed(range(bar_count))]
+    with open(filepath, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["time", "open", "high", "low", "close"])
+        for i, bar_time in enumerate(times):
+            close = base_price + i
+            writer.writerow([int(TimeConverter.datetime_to_unixtime(bar_time)), close - 1, close + 2, close - 2, close])
+    return times
+
+
+def test_async_feeders_run_concurrently(tmp_path):
+    replay_api = ReplayChartAPI(latency=0.3)
+    btc_times = _save_recent_candles_as_csv(str(tmp_path / "btc_jpy.csv"), "1m", 300, 1000000)
+    eth_times = _save_recent_candles_as_csv(str(tmp_path / "eth_jpy.csv"), "5m", 300, 20000)
+    replay_api.load_csv("btc_jpy", "1m", str(tmp_path / "btc_jpy.csv"))
+    replay_api.load_csv("eth_jpy", "5m", str(tmp_path / "eth_jpy.csv"))
+    server = ReplayServer(replay_api)
+    server.start()
+
+    url_configs = UrlConfigs()
+    url_configs.chart_api_url = server.url
+    candle_store = DBCandleStore(DBContext("sqlite:///{}".format(tmp_path / "cache.sqlite")))
+    rate_limiter = TokenBucket(1000.0, 1000.0)
+
+    async def watch(currency_pair: str, period: str) -> list:
+        feeder = await AsyncCandleFeeder.create(currency_pair, period, 20, candle_store, rate_limiter, ChartAPI(url_configs))
+        prices = []
+        async for feeder in feeder.subscribe(0.0):
+            prices.append((feeder.get_times()[-1], float(feeder.get_prices()[-1])))
+            if len(prices) == 2:
+                return prices
+
+    async def main() -> list:
+        return await asyncio.gather(watch("btc_jpy", "1m"), watch("eth_jpy", "5m"))
+
+    try:
+        started_at = time.perf_counter()
+        btc_prices, eth_prices = asyncio.run(main())
+        elapsed = time.perf_counter() - started_at
+    finally:
+        server.stop()
+
+    # それぞれのフィーダーが、自身の通貨ペア・時間枠の最新のローソク足を取得する
+    assert btc_prices == [(btc_times[-1], 1000000 + 299)] * 2
+    assert eth_prices == [(eth_times[-1], 20000 + 299)] * 2
+    assert replay_api.request_count == 6
+
+    # 応答を待つ間もイベントループが止まらないため、２つのフィーダーのリクエストが並行して実行される
+    assert elapsed < 0.3 * 6
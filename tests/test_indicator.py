@@ -0,0 +1,123 @@
+import random
+from datetime import datetime, timedelta
+
+import numpy
+import pytest
+
+from magictrader.candle import CandleFeeder
+from magictrader.const import ModeMACD, ModeTRADESIGNAL, TickMode
+from magictrader.indicator import MACD, SMA, TRADESIGNAL, ATRBANDSet, BBANDSSet, MACDSet
+from magictrader.model import DBContext
+from magictrader.ratelimit import TokenBucket
+from magictrader.replay import ReplayChartAPI
+from magictrader.store import DBCandleStore
+
+SOURCE_FROM = datetime(2019, 1, 1)
+
+
+def _create_feeder(tmp_path, missing_hours: set = frozenset()) -> CandleFeeder:
+    """
+    2019-01-03 00:00から2019-01-05 00:00までを1時間足で進めるバックテストのフィーダーを作成する
+    """
+    hours = [x for x in range(24 * 6) if x not in missing_hours]
+    closes = 1000000 + numpy.array(hours, dtype=float) * 100
+    source_store = DBCandleStore(DBContext("sqlite:///{}".format(tmp_path / "source.sqlite")))
+    source_store.save_ohlcs("btc_jpy", "1h", {
+        "times": [SOURCE_FROM + timedelta(hours=x) for x in hours],
+        "opens": closes - 50,
+        "highs": closes + 100,
+        "lows": closes - 100,
+        "closes": closes,
+    })
+    return CandleFeeder(
+        "btc_jpy", "1h", 10, True, datetime(2019, 1, 3), datetime(2019, 1, 5),
+        preload=True, candle_store=DBCandleStore(DBContext("sqlite:///{}".format(tmp_path / "cache.sqlite"))),
+        rate_limiter=TokenBucket(1000.0, 1000.0), chart_api=ReplayChartAPI(source_store), tick_mode=TickMode.BAR
+    )
+
+
+def _expected_prices(signal: TRADESIGNAL, times: list, bar_count: int) -> list:
+    """
+    表示範囲の全てのローソク足のシグナルを日時で検索する(ずらさずに読み込み直した場合の値)
+    """
+    return [signal.get_signal(x) for x in times] + [None] * (bar_count - len(times))
+
+
+def test_signals_shift_with_bars(tmp_path):
+    feeder = _create_feeder(tmp_path)
+    signal = TRADESIGNAL(feeder, ModeTRADESIGNAL.BUY_OPEN)
+    signal_time = feeder.get_times()[-1]
+    signal.set_signal(signal_time, 123.0)
+    assert signal.prices[-1] == 123.0
+
+    # ローソク足が進むと、シグナルは進んだ本数だけ前にずれる
+    for i in range(1, 10):
+        feeder.go_next()
+        assert signal.times == feeder.get_times()
+        assert signal.prices[-1 - i] == 123.0
+        assert signal.prices.count(123.0) == 1
+
+    # 表示範囲外になったシグナルも、日時で参照できる
+    feeder.go_next()
+    assert signal.prices == [None] * 10
+    assert signal.get_signal(signal_time) == 123.0
+    assert signal.signals == {signal_time: 123.0}
+
+
+@pytest.mark.parametrize("access_every_tick, missing_hours", [
+    (True, frozenset()),
+    (False, frozenset()),
+    (True, frozenset([60, 61, 62, 70])),
+])
+def test_signals_match_full_reload(tmp_path, access_every_tick, missing_hours):
+    rng = random.Random(0)
+    feeder = _create_feeder(tmp_path, missing_hours)
+    signal = TRADESIGNAL(feeder, ModeTRADESIGNAL.SELL_CLOSE)
+
+    while feeder.go_next():
+        times = feeder.get_times()
+
+        # 最新の足、表示範囲内の過去の足、表示範囲外の足にシグナルを設定する
+        if rng.random() < 0.3:
+            signal.set_signal(times[-1], float(rng.randrange(100)))
+        if rng.random() < 0.1:
+            signal.set_signal(rng.choice(times), float(rng.randrange(100)))
+        if rng.random() < 0.1:
+            signal.set_signal(times[-1] + timedelta(hours=rng.randrange(1, 5)), float(rng.randrange(100)))
+
+        # ずらして読み込んだシグナルが、全てのローソク足を検索した場合と一致する
+        # (参照しないティックがある場合は、複数本をまとめてずらす)
+        if access_every_tick or rng.random() < 0.3:
+            assert signal.times == times
+            assert signal.prices == _expected_prices(signal, times, feeder.bar_count)
+
+    assert signal.prices == _expected_prices(signal, feeder.get_times(), feeder.bar_count)
+
+
+def test_line_sets_have_distinct_labels(tmp_path):
+    feeder = _create_feeder(tmp_path)
+
+    # 各線はChartWindowの凡例で区別できるよう、線ごとのラベルを持つ
+    macd_set = MACDSet(feeder, 12, 26, 9, "macd1")
+    assert [x.label for x in macd_set.lines] == ["macd1_macd", "macd1_signal", "macd1_hist"]
+    assert [x.label for x in MACDSet(feeder, 12, 26, 9).lines] == ["macd_macd", "macd_signal", "macd_hist"]
+    assert MACD(feeder, 12, 26, 9, ModeMACD.HISTOGRAM).label == "macd_histogram"
+    bbands_set = BBANDSSet(feeder, 20, 2)
+    assert [x.label for x in bbands_set.lines] == ["bbands_upper", "bbands_middle", "bbands_lower"]
+
+
+def test_constructors_pass_lazy(tmp_path):
+    feeder = _create_feeder(tmp_path)
+
+    # lazyを省略した場合は参照時に計算し、Falseを指定した場合はローソク足が更新されるたびに計算する
+    assert SMA(feeder, 5).lazy is True
+    sma = SMA(feeder, 5, lazy=False)
+    assert sma.lazy is False
+    assert SMA(feeder, 5, incremental=True, lazy=False).lazy is False
+
+    # 複数の線をまとめたインディケーターは、全ての線にlazyを引き継ぐ
+    for line_set in (MACDSet(feeder, 12, 26, 9, lazy=False), BBANDSSet(feeder, 20, 2, lazy=False), ATRBANDSet(feeder, 5, 5, 2, lazy=False)):
+        assert [x.lazy for x in line_set.lines] == [False] * 3
+
+    feeder.go_next()
+    assert sma.prices[-1] == pytest.approx(numpy.mean(feeder.get_prices()[-5:]))
@@ -0,0 +1,131 @@
+import random
+from datetime import datetime
+
+import pytest
+
+from magictrader.orderbook import OrderBook, PriceLevels
+from magictrader.position import PositionRepository
+
+
+class _Feeder:
+    """
+    テストで使用するフィーダー(ポジションが参照する通貨ペアのみを提供します)
+    """
+
+    currency_pair = "btc_jpy"
+
+
+def _match_by_scan(position_repository: PositionRepository, tick_open: float, tick_high: float, tick_low: float) -> list:
+    """
+    未決済の全てのポジションを走査して、約定する注文を求める(注文板を使用する前の方法)
+    """
+    matched = []
+    for position in position_repository.get_open_positions("buy"):
+        if position.stop_price is not None and tick_low <= position.stop_price:
+            matched.append((position, "stop", min(tick_open, position.stop_price)))
+        elif position.limit_price is not None and tick_high >= position.limit_price:
+            matched.append((position, "limit", max(tick_open, position.limit_price)))
+    for position in position_repository.get_open_positions("sell"):
+        if position.stop_price is not None and tick_high >= position.stop_price:
+            matched.append((position, "stop", max(tick_open, position.stop_price)))
+        elif position.limit_price is not None and tick_low <= position.limit_price:
+            matched.append((position, "limit", min(tick_open, position.limit_price)))
+    return matched
+
+
+def _random_price(rng: random.Random) -> float:
+    """
+    同じ価格の注文が多く現れるように、狭い範囲の価格を作成する(注文を出さない場合はNone)
+    """
+    return rng.choice([None, float(rng.randrange(90, 111))])
+
+
+def test_price_levels():
+    levels = PriceLevels()
+    levels.add(100.0, 2, "c")
+    levels.add(100.0, 0, "a")
+    levels.add(90.0, 1, "b")
+    levels.add(110.0, 3, "d")
+
+    # 同じ価格の注文は登録順、境界の価格の注文を含む
+    assert levels.get_at_or_above(100.0) == [(100.0, 0, "a"), (100.0, 2, "c"), (110.0, 3, "d")]
+    assert levels.get_at_or_below(100.0) == [(90.0, 1, "b"), (100.0, 0, "a"), (100.0, 2, "c")]
+
+    levels.remove(100.0, 0)
+    levels.remove(100.0, 5)
+    assert len(levels) == 3
+    assert levels.get_at_or_below(100.0) == [(90.0, 1, "b"), (100.0, 2, "c")]
+
+
+def test_set_orders_keeps_sequence():
+    book = OrderBook()
+    book.set_orders("a", "buy", 95.0, None)
+    book.set_orders("b", "buy", 95.0, None)
+
+    # 価格を変更しても、最初に登録したときの順序を引き継ぐ
+    book.set_orders("a", "buy", 96.0, None)
+    assert book.match(100.0, 100.0, 90.0) == [("a", "stop", 96.0), ("b", "stop", 95.0)]
+
+    # 削除した注文は、再登録すると最後の順序になる
+    book.remove_orders("a")
+    book.set_orders("a", "buy", 96.0, None)
+    assert book.match(100.0, 100.0, 90.0) == [("b", "stop", 95.0), ("a", "stop", 96.0)]
+
+
+def test_stop_wins_over_limit():
+    book = OrderBook()
+    book.set_orders("long", "buy", 95.0, 105.0)
+    book.set_orders("short", "sell", 105.0, 95.0)
+
+    # 同じティックでストップ価格・リミット価格の両方に達した場合は、ストップ注文が約定する
+    assert book.match(100.0, 110.0, 90.0) == [("long", "stop", 95.0), ("short", "stop", 105.0)]
+
+    # 値幅の始点で既に注文価格を超えていた場合は、始点の価格で約定する
+    assert book.match(112.0, 115.0, 111.0) == [("long", "limit", 112.0), ("short", "stop", 112.0)]
+    assert book.match(88.0, 89.0, 85.0) == [("long", "stop", 88.0), ("short", "limit", 88.0)]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_match_matches_scan(seed):
+    rng = random.Random(seed)
+    position_repository = PositionRepository(_Feeder())
+
+    # 一部のポジションはオープン時にキャンセルされる
+    def on_position_opening(sender, eargs):
+        eargs.params["cancel"] = rng.random() < 0.1
+    position_repository.position_opening_eventhandler.add(on_position_opening)
+
+    for _ in range(300):
+
+        # ポジションのオープン・決済、注文価格の変更を繰り返す
+        for _ in range(rng.randrange(0, 4)):
+            action = rng.random()
+            open_positions = position_repository.get_open_positions("buy") + position_repository.get_open_positions("sell")
+            if action < 0.5 or not open_positions:
+                position = position_repository.create_position()
+                position.open(datetime(2019, 1, 1), rng.choice(["buy", "sell"]), 100.0, 1.0, "",
+                              _random_price(rng), _random_price(rng))
+            elif action < 0.8:
+                position = rng.choice(open_positions)
+                if rng.random() < 0.5:
+                    position.stop_price = _random_price(rng)
+                else:
+                    position.limit_price = _random_price(rng)
+            else:
+                rng.choice(open_positions).close(datetime(2019, 1, 1), 100.0)
+
+        # 注文板と全てのポジションの走査で、約定する注文・約定価格・順序が一致する
+        tick_open = float(rng.randrange(90, 111))
+        tick_high = tick_open + rng.choice([0, 0, 1, 5, 10])
+        tick_low = tick_open - rng.choice([0, 0, 1, 5, 10])
+        expected = _match_by_scan(position_repository, tick_open, tick_high, tick_low)
+        assert position_repository.order_book.match(tick_open, tick_high, tick_low) == expected
+
+        # 約定した注文の一部を決済する(決済・キャンセルされたポジションは注文板から削除される)
+        for position, order_type, exec_price in expected:
+            if rng.random() < 0.5:
+                position.close(datetime(2019, 1, 1), exec_price)
+
+    canceled_positions = [x for x in position_repository.positions if x.is_canceled]
+    assert canceled_positions
+    assert all(x not in [y[0] for y in position_repository.order_book.match(100.0, 1000.0, 0.0)] for x in canceled_positions)
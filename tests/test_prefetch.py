@@ -0,0 +1,83 @@
+import csv
+from datetime import datetime, timedelta
+
+from magictrader.model import DBContext
+from magictrader.prefetch import CandlePrefetcher
+from magictrader.ratelimit import TokenBucket
+from magictrader.replay import ReplayChartAPI
+from magictrader.store import DBCandleStore
+from magictrader.utils import TimeConverter
+
+# 応答するローソク足(2019-01-01 00:00から120本の1時間足、100本目以降の6本は取引所に存在しない)
+SOURCE_FROM = datetime(2019, 1, 1)
+SOURCE_TIMES = [SOURCE_FROM + timedelta(hours=x) for x in range(120) if not 100 <= x < 106]
+
+
+def _create_replay_api(tmp_path, max_bar_count: int) -> ReplayChartAPI:
+    """
+    応答の本数が制限されたリプレイのAPIを作成する
+    (ローソク足はスレッドプールから参照するため、CSVファイルから読み込む)
+    """
+    with open(tmp_path / "source.csv", "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["time", "open", "high", "low", "close"])
+        for i, bar_time in enumerate(SOURCE_TIMES):
+            close = 1000000 + i * 100
+            writer.writerow([int(TimeConverter.datetime_to_unixtime(bar_time)), close - 50, close + 100, close - 100, close])
+    chart_api = ReplayChartAPI(max_bar_count=max_bar_count)
+    chart_api.load_csv("btc_jpy", "1h", str(tmp_path / "source.csv"))
+    return chart_api
+
+
+def _create_prefetcher(tmp_path, chart_api: ReplayChartAPI, response_bar_limit: int = 0) -> CandlePrefetcher:
+    """
+    2019-01-01から2019-01-06までの1時間足を、1日単位のチャンクで取得するプリフェッチャーを作成する
+    """
+    return CandlePrefetcher(
+        ["btc_jpy"], ["1h"], SOURCE_FROM, datetime(2019, 1, 6),
+        DBCandleStore(DBContext("sqlite:///{}".format(tmp_path / "cache.sqlite"))), chart_api, TokenBucket(1000.0, 1000.0),
+        chunk_bar_count=24, max_workers=2, progress_filepath=str(tmp_path / "progress.json"), response_bar_limit=response_bar_limit
+    )
+
+
+def test_short_responses_are_fetched_to_the_end(tmp_path):
+    chart_api = _create_replay_api(tmp_path, 7)
+    prefetcher = _create_prefetcher(tmp_path, chart_api)
+    report = prefetcher.run()[0]
+
+    # 切り詰められた応答の続きを取得し、全ての足をキャッシュに保存する
+    assert report["cached_bar_count"] == len(SOURCE_TIMES)
+    assert prefetcher.fetched_chunk_count == 6
+
+    # 取引所に存在しない足(途中の欠損、最後の足より後)のみが、取得済みの欠損として記録される
+    assert report["gaps"] == [
+        (SOURCE_FROM + timedelta(hours=100), SOURCE_FROM + timedelta(hours=105)),
+        (SOURCE_FROM + timedelta(hours=120), SOURCE_FROM + timedelta(hours=120)),
+    ]
+    assert report["exchange_gaps"] == report["gaps"]
+
+    # 再開しても、全てのチャンクが取得済みとして除外される
+    prefetcher = _create_prefetcher(tmp_path, chart_api)
+    prefetcher.run()
+    assert prefetcher.fetched_chunk_count == 0
+    assert prefetcher.skipped_chunk_count == 6
+
+
+def test_truncated_chunk_is_fetched_from_last_bar(tmp_path):
+    chart_api = _create_replay_api(tmp_path, 4)
+    prefetcher = _create_prefetcher(tmp_path, chart_api)
+    chunk = prefetcher._create_chunks()[4]
+
+    # 上限が不明な場合は、欠損の手前で切り詰められた応答の後も取得し、最後の足より後を続けて取得する
+    ohlcs, fetched_range = prefetcher._fetch_chunk(chunk)
+    assert ohlcs["times"] == SOURCE_TIMES[96:114]
+    assert fetched_range == (chunk["range_from"], chunk["range_to"])
+    assert chart_api.request_count == 5
+
+    # 上限が分かっている場合は、上限に満たない応答で完了する
+    chart_api.max_bar_count = 24
+    prefetcher = _create_prefetcher(tmp_path, chart_api, 24)
+    ohlcs, fetched_range = prefetcher._fetch_chunk(chunk)
+    assert ohlcs["times"] == SOURCE_TIMES[96:114]
+    assert fetched_range == (chunk["range_from"], chunk["range_to"])
+    assert chart_api.request_count == 6
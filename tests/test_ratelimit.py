@@ -0,0 +1,72 @@
+import pytest
+
+from magictrader import ratelimit
+from magictrader.ratelimit import TokenBucket
+
+
+class _Clock:
+    """
+    テストで使用する時計(monotonicの代わりに、進めた分だけ時刻が進みます)
+    """
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(ratelimit.time, "monotonic", clock.monotonic)
+    return clock
+
+
+@pytest.mark.parametrize("rate, capacity", [(0, 1), (-1, 1), (1, 0), (1, -1)])
+def test_init_rejects_non_positive(rate, capacity):
+    with pytest.raises(ValueError):
+        TokenBucket(rate, capacity)
+
+
+def test_setters_reject_non_positive():
+    bucket = TokenBucket()
+    for value in (0, -1):
+        with pytest.raises(ValueError):
+            bucket.rate = value
+        with pytest.raises(ValueError):
+            bucket.capacity = value
+    assert bucket.rate == 1.0
+    assert bucket.capacity == 1.0
+
+
+def test_wait_time(clock):
+    bucket = TokenBucket(2.0, 2.0)
+    assert bucket._reserve(1) == 0.0
+    assert bucket._reserve(1) == 0.0
+    assert bucket._reserve(1) == pytest.approx(0.5)
+    assert bucket._reserve(1) == pytest.approx(1.0)
+    clock.now += 1.0
+    assert bucket._reserve(1) == pytest.approx(0.5)
+
+
+def test_rate_change_refills_at_previous_rate(clock):
+    bucket = TokenBucket(1.0, 10.0)
+    bucket._reserve(10)
+
+    # 変更するまでの5秒間は、変更前の補充速度(1秒あたり1個)で補充される
+    clock.now += 5.0
+    bucket.rate = 0.1
+    assert bucket._reserve(5) == 0.0
+    assert bucket._reserve(1) == pytest.approx(10.0)
+
+
+def test_capacity_change_refills_at_previous_capacity(clock):
+    bucket = TokenBucket(1.0, 2.0)
+    bucket._reserve(2)
+
+    # 変更するまでの5秒間は、変更前の最大数(2個)まで補充される
+    clock.now += 5.0
+    bucket.capacity = 10.0
+    assert bucket._reserve(2) == 0.0
+    assert bucket._reserve(1) == pytest.approx(1.0)
@@ -0,0 +1,130 @@
+import json
+import urllib.error
+import urllib.request
+from datetime import datetime, timedelta
+
+import numpy
+import pytest
+from zaifer import Chart as ChartAPI
+from zaifer import UrlConfigs
+
+from magictrader.candle import CandleFeeder
+from magictrader.model import DBContext
+from magictrader.replay import ReplayChartAPI, ReplayRateLimitError, ReplayServer
+from magictrader.store import DBCandleStore
+from magictrader.utils import TimeConverter
+
+SOURCE_TIMES = [datetime(2019, 1, 1) + timedelta(minutes=x) for x in range(30)]
+
+
+@pytest.fixture
+def replay_api(tmp_path):
+    """
+    2019-01-01 00:00から30本の1分足を応答するリプレイのAPI
+    """
+    closes = 1000000 + numpy.arange(len(SOURCE_TIMES), dtype=float) * 10
+    store = DBCandleStore(DBContext("sqlite:///{}".format(tmp_path / "source.sqlite")))
+    store.save_ohlcs("btc_jpy", "1m", {
+        "times": SOURCE_TIMES,
+        "opens": closes - 5,
+        "highs": closes + 20,
+        "lows": closes - 20,
+        "closes": closes,
+    })
+    return ReplayChartAPI(store)
+
+
+def _get_json(url: str) -> (int, dict):
+    """
+    URLにGETリクエストを送信し、ステータスコードと応答のJSONを取得する
+    """
+    try:
+        with urllib.request.urlopen(url) as response:
+            return response.status, json.loads(response.read().decode("utf-8"))
+    except urllib.error.HTTPError as ex:
+        return ex.code, json.loads(ex.read().decode("utf-8"))
+
+
+def test_get_ohlc_response_format(replay_api):
+    response = replay_api.get_ohlc("btc_jpy", "1", SOURCE_TIMES[10], SOURCE_TIMES[12])
+
+    # zaifのチャートAPIと同じ形式(時刻はミリ秒のunixtime、取得終了日時の足を含む)
+    assert response == {"ohlc_data": [
+        {
+            "time": int(TimeConverter.datetime_to_unixtime(SOURCE_TIMES[x])) * 1000,
+            "open": 1000000 + x * 10 - 5.0,
+            "high": 1000000 + x * 10 + 20.0,
+            "low": 1000000 + x * 10 - 20.0,
+            "close": 1000000 + x * 10 + 0.0,
+        }
+        for x in (10, 11, 12)
+    ]}
+    assert all(type(x["time"]) is int and type(x["close"]) is float for x in response["ohlc_data"])
+    assert CandleFeeder.convert_response(response)["times"] == SOURCE_TIMES[10:13]
+
+    # データが存在しない期間・時間枠は、空の応答となる
+    assert replay_api.get_ohlc("btc_jpy", "1", datetime(2018, 1, 1), datetime(2018, 1, 2)) == {"ohlc_data": []}
+    assert replay_api.get_ohlc("btc_jpy", "5", SOURCE_TIMES[0], SOURCE_TIMES[-1]) == {"ohlc_data": []}
+    with pytest.raises(Exception):
+        replay_api.get_ohlc("btc_jpy", "2", SOURCE_TIMES[0], SOURCE_TIMES[-1])
+
+
+def test_load_csv_takes_precedence(replay_api, tmp_path):
+    with open(tmp_path / "btc_jpy_1m.csv", "w", encoding="utf-8") as f:
+        f.write("time,open,high,low,close\n")
+        for x in (2, 0, 1):
+            f.write("{},1,3,0,{}\n".format(int(TimeConverter.datetime_to_unixtime(SOURCE_TIMES[x])), x + 2))
+    replay_api.load_csv("btc_jpy", "1m", str(tmp_path / "btc_jpy_1m.csv"))
+
+    # CSVファイルのローソク足は時刻順に並べ替えられ、キャッシュより優先される
+    ohlcs = CandleFeeder.convert_response(replay_api.get_ohlc("btc_jpy", "1", SOURCE_TIMES[0], SOURCE_TIMES[-1]))
+    assert ohlcs["times"] == SOURCE_TIMES[:3]
+    assert ohlcs["closes"].tolist() == [2.0, 3.0, 4.0]
+
+
+def test_server_history_endpoint(replay_api):
+    server = ReplayServer(replay_api)
+    server.start()
+    try:
+        unixtime_from = int(TimeConverter.datetime_to_unixtime(SOURCE_TIMES[5]))
+        unixtime_to = int(TimeConverter.datetime_to_unixtime(SOURCE_TIMES[9]))
+
+        # /historyはget_ohlcと同じ応答を返す
+        status, body = _get_json("{}/history?symbol=btc_jpy&resolution=1&from={}&to={}".format(server.url, unixtime_from, unixtime_to))
+        assert status == 200
+        assert body == replay_api.get_ohlc("btc_jpy", "1", SOURCE_TIMES[5], SOURCE_TIMES[9])
+
+        # zaiferのクライアントから、そのまま接続できる
+        url_configs = UrlConfigs()
+        url_configs.chart_api_url = server.url
+        response = ChartAPI(url_configs).get_ohlc("btc_jpy", "1", SOURCE_TIMES[5], SOURCE_TIMES[9])
+        assert CandleFeeder.convert_response(response)["times"] == SOURCE_TIMES[5:10]
+
+        # 不正なパス・クエリ
+        assert _get_json("{}/ticker".format(server.url))[0] == 404
+        assert _get_json("{}/history?symbol=btc_jpy&resolution=1&from=x&to=1".format(server.url))[0] == 400
+        assert _get_json("{}/history?symbol=btc_jpy&resolution=1".format(server.url))[0] == 400
+
+        # 頻度制限を超えた場合は429、エラーを発生させた場合は500を返す
+        url = "{}/history?symbol=btc_jpy&resolution=1&from={}&to={}".format(server.url, unixtime_from, unixtime_to)
+        replay_api.rate_limit = 1
+        assert _get_json(url)[0] == 200
+        status, body = _get_json(url)
+        assert status == 429 and "error" in body
+        replay_api.rate_limit = 0
+        replay_api.error_rate = 1.0
+        assert _get_json(url)[0] == 500
+    finally:
+        server.stop()
+
+    assert replay_api.rate_limited_count == 1
+    assert replay_api.error_count == 1
+
+
+def test_rate_limit_error(replay_api):
+    replay_api.rate_limit = 2
+    replay_api.get_ohlc("btc_jpy", "1", SOURCE_TIMES[0], SOURCE_TIMES[0])
+    replay_api.get_ohlc("btc_jpy", "1", SOURCE_TIMES[0], SOURCE_TIMES[0])
+    with pytest.raises(ReplayRateLimitError):
+        replay_api.get_ohlc("btc_jpy", "1", SOURCE_TIMES[0], SOURCE_TIMES[0])
+    assert replay_api.request_count == 3
@@ -0,0 +1,97 @@
+from datetime import datetime
+
+import numpy
+import pytest
+
+from magictrader.candle import CandleFeeder
+from magictrader.const import TickMode
+from magictrader.model import DBContext
+from magictrader.ratelimit import TokenBucket
+from magictrader.replay import ReplayChartAPI
+from magictrader.resample import CandleResampler
+from magictrader.store import DBCandleStore
+
+# 1分足(00:03、00:07～00:14、00:16～00:58、01:01～01:02の足は存在しない)
+BARS_1M = [
+    (datetime(2019, 1, 1, 0, 0), 100, 105, 99, 104),
+    (datetime(2019, 1, 1, 0, 1), 104, 108, 103, 107),
+    (datetime(2019, 1, 1, 0, 2), 107, 107, 101, 102),
+    (datetime(2019, 1, 1, 0, 4), 102, 103, 95, 96),
+    (datetime(2019, 1, 1, 0, 5), 96, 99, 96, 98),
+    (datetime(2019, 1, 1, 0, 6), 98, 110, 97, 109),
+    (datetime(2019, 1, 1, 0, 15), 109, 112, 108, 111),
+    (datetime(2019, 1, 1, 0, 59), 111, 111, 90, 91),
+    (datetime(2019, 1, 1, 1, 0), 91, 93, 89, 92),
+    (datetime(2019, 1, 1, 1, 3), 92, 94, 92, 93),
+]
+
+# 1分足から手計算した5分足(足が存在しない00:10の足は作成しない)
+BARS_5M = [
+    (datetime(2019, 1, 1, 0, 0), 100, 108, 95, 96),
+    (datetime(2019, 1, 1, 0, 5), 96, 110, 96, 109),
+    (datetime(2019, 1, 1, 0, 15), 109, 112, 108, 111),
+    (datetime(2019, 1, 1, 0, 55), 111, 111, 90, 91),
+    (datetime(2019, 1, 1, 1, 0), 91, 94, 89, 93),
+]
+
+# 1分足から手計算した1時間足
+BARS_1H = [
+    (datetime(2019, 1, 1, 0, 0), 100, 112, 90, 91),
+    (datetime(2019, 1, 1, 1, 0), 91, 94, 89, 93),
+]
+
+
+def _to_ohlcs(bars: list) -> dict:
+    return {
+        "times": [x[0] for x in bars],
+        "opens": numpy.array([x[1] for x in bars], dtype=float),
+        "highs": numpy.array([x[2] for x in bars], dtype=float),
+        "lows": numpy.array([x[3] for x in bars], dtype=float),
+        "closes": numpy.array([x[4] for x in bars], dtype=float),
+    }
+
+
+def _to_bars(ohlcs: dict) -> list:
+    return [(t, o, h, l, c) for t, o, h, l, c in zip(
+        ohlcs["times"], ohlcs["opens"].tolist(), ohlcs["highs"].tolist(), ohlcs["lows"].tolist(), ohlcs["closes"].tolist()
+    )]
+
+
+@pytest.mark.parametrize("period, expected", [("5m", BARS_5M), ("1h", BARS_1H)])
+def test_resample(period, expected):
+    assert _to_bars(CandleResampler.resample(_to_ohlcs(BARS_1M), period)) == expected
+
+
+def test_resample_empty():
+    ohlcs = CandleResampler.resample(_to_ohlcs([]), "5m")
+    assert ohlcs["times"] == []
+    assert all(len(ohlcs[x]) == 0 for x in ("opens", "highs", "lows", "closes"))
+
+
+@pytest.mark.parametrize("source_period, period, expected", [
+    ("1m", "5m", True),
+    ("1m", "1h", True),
+    ("5m", "1d", True),
+    ("1h", "4h", True),
+    ("5m", "5m", False),
+    ("1h", "5m", False),
+    ("15m", "1h", True),
+    ("4h", "1w", False),
+])
+def test_can_resample(source_period, period, expected):
+    assert CandleResampler.can_resample(source_period, period) == expected
+
+
+def test_feeder_resamples_from_source_period(tmp_path):
+    source_store = DBCandleStore(DBContext("sqlite:///{}".format(tmp_path / "source.sqlite")))
+    source_store.save_ohlcs("btc_jpy", "1m", _to_ohlcs(BARS_1M))
+    chart_api = ReplayChartAPI(source_store)
+
+    # 5分足はサーバーから取得せず、1分足から作成する
+    feeder = CandleFeeder(
+        "btc_jpy", "5m", 3, True, datetime(2019, 1, 1, 0, 55), datetime(2019, 1, 1, 1, 0),
+        preload=True, candle_store=DBCandleStore(DBContext("sqlite:///{}".format(tmp_path / "cache.sqlite"))),
+        rate_limiter=TokenBucket(1000.0, 1000.0), chart_api=chart_api, resample_period="1m", tick_mode=TickMode.BAR
+    )
+    assert _to_bars(feeder._preloaded_ohlcs) == BARS_5M
+    assert _to_bars(feeder.candle_store.get_ohlcs("btc_jpy", "5m", datetime(2019, 1, 1), datetime(2019, 1, 2))) == BARS_5M
@@ -0,0 +1,244 @@
+import os
+import random
+from datetime import datetime, timedelta
+
+import numpy
+import pytest
+
+from magictrader.const import Period
+from magictrader.model import DBContext
+from magictrader.store import ColumnarCandleStore, DBCandleStore
+from magictrader.utils import TimeConverter
+
+
+@pytest.fixture(params=["sqlite", "columnar"])
+def create_store(request, tmp_path):
+    """
+    同じ保存先のキャッシュを作成する関数
+    """
+    def create():
+        if request.param == "sqlite":
+            return DBCandleStore(DBContext("sqlite:///{}".format(tmp_path / "mt.sqlite")))
+        return ColumnarCandleStore(str(tmp_path / "mt_candles"))
+    return create
+
+
+def test_add_coverage_merges_intervals(create_store):
+    store = create_store()
+    store.add_coverage("btc_jpy", "1h", datetime(2019, 1, 1, 0), datetime(2019, 1, 1, 5))
+    store.add_coverage("btc_jpy", "1h", datetime(2019, 1, 1, 10), datetime(2019, 1, 1, 12))
+    store.add_coverage("btc_jpy", "1h", datetime(2019, 1, 2, 0), datetime(2019, 1, 2, 3))
+    assert store.get_coverage("btc_jpy", "1h") == [
+        (datetime(2019, 1, 1, 0), datetime(2019, 1, 1, 5)),
+        (datetime(2019, 1, 1, 10), datetime(2019, 1, 1, 12)),
+        (datetime(2019, 1, 2, 0), datetime(2019, 1, 2, 3)),
+    ]
+
+    # 隣接・重複する期間は結合される
+    store.add_coverage("btc_jpy", "1h", datetime(2019, 1, 1, 6), datetime(2019, 1, 1, 11))
+    expected = [
+        (datetime(2019, 1, 1, 0), datetime(2019, 1, 1, 12)),
+        (datetime(2019, 1, 2, 0), datetime(2019, 1, 2, 3)),
+    ]
+    assert store.get_coverage("btc_jpy", "1h") == expected
+    assert create_store().get_coverage("btc_jpy", "1h") == expected
+    assert create_store().get_coverage("btc_jpy", "1m") == []
+
+
+def test_add_coverage_leaves_settle_margin(create_store):
+    store = create_store()
+    now = datetime.now()
+    store.add_coverage("btc_jpy", "1h", now - timedelta(hours=10), now)
+
+    # 最後に確定したローソク足は取引所で公開されていない場合があるため、記録しない
+    last_closed = Period.floor_datetime(now, "1h") - timedelta(hours=1)
+    assert store.get_coverage("btc_jpy", "1h")[-1][1] == last_closed - timedelta(hours=1)
+    assert not store.is_covered("btc_jpy", "1h", last_closed, last_closed)
+
+
+def test_remove_coverage(create_store):
+    store = create_store()
+    store.add_coverage("btc_jpy", "1h", datetime(2019, 1, 1, 0), datetime(2019, 1, 1, 12))
+    store.add_coverage("btc_jpy", "1h", datetime(2019, 1, 2, 0), datetime(2019, 1, 2, 3))
+    store.add_coverage("btc_jpy", "1h", datetime(2019, 1, 3, 0), datetime(2019, 1, 3, 3))
+
+    # 取り消す期間と重複しない前後の期間のみが残る
+    store.remove_coverage("btc_jpy", "1h", datetime(2019, 1, 1, 4, 30), datetime(2019, 1, 2, 1))
+    expected = [
+        (datetime(2019, 1, 1, 0), datetime(2019, 1, 1, 4)),
+        (datetime(2019, 1, 2, 2), datetime(2019, 1, 2, 3)),
+        (datetime(2019, 1, 3, 0), datetime(2019, 1, 3, 3)),
+    ]
+    assert store.get_coverage("btc_jpy", "1h") == expected
+    assert create_store().get_coverage("btc_jpy", "1h") == expected
+    assert not store.is_covered("btc_jpy", "1h", datetime(2019, 1, 1, 5), datetime(2019, 1, 1, 5))
+    assert store.is_covered("btc_jpy", "1h", datetime(2019, 1, 1, 0), datetime(2019, 1, 1, 4))
+
+    # 期間の内側を取り消すと、期間が分割される
+    store.remove_coverage("btc_jpy", "1h", datetime(2019, 1, 3, 1), datetime(2019, 1, 3, 2))
+    assert store.get_coverage("btc_jpy", "1h")[-2:] == [
+        (datetime(2019, 1, 3, 0), datetime(2019, 1, 3, 0)),
+        (datetime(2019, 1, 3, 3), datetime(2019, 1, 3, 3)),
+    ]
+
+    # 全体を取り消す
+    store.remove_coverage("btc_jpy", "1h", datetime(2019, 1, 1), datetime(2019, 1, 4))
+    assert store.get_coverage("btc_jpy", "1h") == []
+    assert create_store().get_coverage("btc_jpy", "1h") == []
+
+
+def test_coverage_matches_covered_bars(create_store):
+    rng = random.Random(0)
+    store = create_store()
+    origin = datetime(2019, 1, 1)
+    covered = set()
+
+    # 期間の記録・取り消しを繰り返し、記録した足の集合と一致することを確認する
+    for _ in range(200):
+        bar_from = rng.randrange(0, 300)
+        bar_to = bar_from + rng.randrange(0, 30)
+        range_from = origin + timedelta(hours=bar_from)
+        range_to = origin + timedelta(hours=bar_to)
+        if rng.random() < 0.7:
+            store.add_coverage("btc_jpy", "1h", range_from, range_to)
+            covered |= set(range(bar_from, bar_to + 1))
+        else:
+            store.remove_coverage("btc_jpy", "1h", range_from, range_to)
+            covered -= set(range(bar_from, bar_to + 1))
+
+        coverage = store.get_coverage("btc_jpy", "1h")
+        bars = set()
+        for interval_from, interval_to in coverage:
+            bars |= set(range(int((interval_from - origin) / timedelta(hours=1)), int((interval_to - origin) / timedelta(hours=1)) + 1))
+        assert bars == covered
+        assert all(x[1] + timedelta(hours=1) < y[0] for x, y in zip(coverage, coverage[1:]))
+
+    assert create_store().get_coverage("btc_jpy", "1h") == store.get_coverage("btc_jpy", "1h")
+
+
+def test_chunk_size_rejects_non_positive(tmp_path):
+    db_context = DBContext("sqlite:///{}".format(tmp_path / "mt.sqlite"))
+    for value in (0, -1):
+        with pytest.raises(ValueError):
+            DBCandleStore(db_context, value)
+    store = DBCandleStore(db_context, 10)
+    with pytest.raises(ValueError):
+        store.chunk_size = 0
+    assert store.chunk_size == 10
+
+
+def _create_ohlcs(hours: list, base_price: float) -> dict:
+    """
+    2019-01-01からの経過時間(時)の1時間足を作成する(終値は基準価格+経過時間)
+    """
+    closes = numpy.array([base_price + x for x in hours], dtype=float)
+    return {
+        "times": [datetime(2019, 1, 1) + timedelta(hours=x) for x in hours],
+        "opens": closes - 1,
+        "highs": closes + 2,
+        "lows": closes - 2,
+        "closes": closes,
+    }
+
+
+def _get_closes(store, hour_from: int, hour_to: int) -> dict:
+    """
+    保存済みの1時間足の終値を、経過時間(時)をキーとして取得する
+    """
+    ohlcs = store.get_ohlcs("btc_jpy", "1h", datetime(2019, 1, 1) + timedelta(hours=hour_from), datetime(2019, 1, 1) + timedelta(hours=hour_to))
+    return {int((x - datetime(2019, 1, 1)) / timedelta(hours=1)): float(y) for x, y in zip(ohlcs["times"], ohlcs["closes"])}
+
+
+def _to_unixtimes(times: list) -> numpy.ndarray:
+    """
+    日時を列ファイルに保存する時刻(unixtime)に変換する
+    """
+    return TimeConverter.datetime64_to_unixtimes(TimeConverter.datetimes_to_datetime64(times)).astype(numpy.int64)
+
+
+def test_save_ohlcs_overwrites_existing_rows(create_store):
+    store = create_store()
+    store.save_ohlcs("btc_jpy", "1h", _create_ohlcs(list(range(10)), 100))
+
+    # 保存済みの足は上書きし、未保存の足は追記する
+    store.save_ohlcs("btc_jpy", "1h", _create_ohlcs([3, 5, 10, 11], 200))
+    expected = {x: (200 if x in (3, 5, 10, 11) else 100) + x for x in range(12)}
+    assert _get_closes(store, 0, 20) == expected
+    assert _get_closes(create_store(), 0, 20) == expected
+    assert float(store.get_ohlcs("btc_jpy", "1h", datetime(2019, 1, 1, 5), datetime(2019, 1, 1, 5))["highs"][0]) == 207
+
+
+def test_save_ohlcs_inserts_out_of_order(create_store):
+    store = create_store()
+    store.save_ohlcs("btc_jpy", "1h", _create_ohlcs(list(range(10, 20)), 100))
+    saved_ohlcs = store.get_ohlcs("btc_jpy", "1h", datetime(2019, 1, 1), datetime(2019, 1, 2))
+
+    # 保存済みの足より前・間の足を保存する(同じ時刻の足は後に現れたものを優先する)
+    ohlcs = _create_ohlcs([25, 4, 0, 15, 2, 4], 200)
+    ohlcs["closes"][-1] = 999
+    store.save_ohlcs("btc_jpy", "1h", ohlcs)
+    expected = {x: 100 + x for x in range(10, 20)}
+    expected.update({0: 200, 2: 202, 4: 999, 15: 215, 25: 225})
+    expected = dict(sorted(expected.items()))
+    assert _get_closes(store, 0, 30) == expected
+    assert _get_closes(create_store(), 0, 30) == expected
+
+    # 書き直す前に取得したローソク足は変化しない
+    assert saved_ohlcs["closes"].tolist() == [100 + x for x in range(10, 20)]
+
+
+def test_columnar_rewrite_leaves_no_temporary_files(tmp_path):
+    store = ColumnarCandleStore(str(tmp_path / "mt_candles"))
+    store.save_ohlcs("btc_jpy", "1h", _create_ohlcs(list(range(10, 20)), 100))
+    store.save_ohlcs("btc_jpy", "1h", _create_ohlcs(list(range(0, 5)), 100))
+    assert sorted(os.listdir(tmp_path / "mt_candles" / "btc_jpy" / "1h")) == \
+        ["closes.bin", "highs.bin", "lows.bin", "opens.bin", "times.bin"]
+
+
+def test_columnar_recovers_interrupted_rewrite(tmp_path):
+    directory = tmp_path / "mt_candles" / "btc_jpy" / "1h"
+    store = ColumnarCandleStore(str(tmp_path / "mt_candles"))
+    store.save_ohlcs("btc_jpy", "1h", _create_ohlcs(list(range(10)), 100))
+    new_columns = {
+        "times": _to_unixtimes([datetime(2019, 1, 1) + timedelta(hours=x) for x in range(12)]),
+        "opens": numpy.arange(12, dtype=float) + 199,
+        "highs": numpy.arange(12, dtype=float) + 202,
+        "lows": numpy.arange(12, dtype=float) + 198,
+        "closes": numpy.arange(12, dtype=float) + 200,
+    }
+
+    # 一時ファイルを書き終える前に中断された場合は、一時ファイルを破棄する
+    for name in ("times", "opens"):
+        new_columns[name].tofile(str(directory / "{}.bin.tmp".format(name)))
+    assert _get_closes(ColumnarCandleStore(str(tmp_path / "mt_candles")), 0, 20) == {x: 100 + x for x in range(10)}
+    assert not any(x.endswith(".tmp") for x in os.listdir(directory))
+
+    # 一時ファイルを書き終えた後、置き換えの途中で中断された場合は、置き換えを完了する
+    for name in ("opens", "highs", "lows", "closes"):
+        new_columns[name].tofile(str(directory / "{}.bin.tmp".format(name)))
+    new_columns["times"].tofile(str(directory / "times.bin"))
+    (directory / "rewrite.commit").touch()
+    assert _get_closes(ColumnarCandleStore(str(tmp_path / "mt_candles")), 0, 20) == {x: 200 + x for x in range(12)}
+    assert sorted(os.listdir(directory)) == ["closes.bin", "highs.bin", "lows.bin", "opens.bin", "times.bin"]
+
+
+def test_columnar_recovers_interrupted_append(tmp_path):
+    directory = tmp_path / "mt_candles" / "btc_jpy" / "1h"
+    store = ColumnarCandleStore(str(tmp_path / "mt_candles"))
+    store.save_ohlcs("btc_jpy", "1h", _create_ohlcs(list(range(10)), 100))
+    store.add_coverage("btc_jpy", "1h", datetime(2019, 1, 1, 0), datetime(2019, 1, 1, 11))
+
+    # 時刻・始値の列のみに2本を追記し、高値の列の途中で中断された状態にする
+    ohlcs = _create_ohlcs([10, 11], 100)
+    with open(directory / "times.bin", "ab") as f:
+        f.write(_to_unixtimes(ohlcs["times"]).tobytes())
+    with open(directory / "opens.bin", "ab") as f:
+        f.write(ohlcs["opens"].tobytes())
+    with open(directory / "highs.bin", "ab") as f:
+        f.write(ohlcs["highs"].tobytes()[:12])
+
+    # 全ての列に書き込まれた足までに揃え、切り詰めた足は取得済みの期間から取り消す
+    store = ColumnarCandleStore(str(tmp_path / "mt_candles"))
+    assert _get_closes(store, 0, 20) == {x: 100 + x for x in range(10)}
+    assert {len(store.get_columns("btc_jpy", "1h")[name]) for name in ("times", "opens", "highs", "lows", "closes")} == {10}
+    assert store.get_coverage("btc_jpy", "1h") == [(datetime(2019, 1, 1, 0), datetime(2019, 1, 1, 9))]
@@ -0,0 +1,326 @@
+from datetime import datetime, timedelta
+
+import numpy
+import pytest
+import talib
+
+from magictrader.cache import IndicatorGraph
+from magictrader.const import AppliedPrice
+from magictrader.event import EventArgs, EventHandler
+from magictrader.indicator import ATR, EMA, RSI, SMA, STDDEV, WMA, Indicator
+from magictrader.streaming import (StreamingATR, StreamingEMA, StreamingRSI, StreamingSMA, StreamingSTDDEV,
+                                   StreamingWMA)
+
+PERIODS = (2, 5, 14, 30)
+APPLIED_PRICES = [AppliedPrice.OPEN, AppliedPrice.HIGH, AppliedPrice.LOW, AppliedPrice.CLOSE]
+
+# 逐次計算とTA-Libの計算結果の許容誤差(価格は1,000,000円前後)
+RTOL = 1e-9
+ATOL = 1e-6
+
+# インクリメンタルモードのRSIの最新値と、既定の(ウインドウで計算した)RSIの最新値の差の上限
+# (期間14・表示本数100の場合。Indicatorのdocstringを参照)
+RSI_LATEST_DRIFT = 0.05
+
+
+def _make_ohlcs(closes: numpy.ndarray, rng: numpy.random.Generator) -> tuple:
+    opens = numpy.r_[closes[0], closes[:-1]]
+    highs = numpy.maximum(opens, closes) + rng.choice([0, 0, 500, 1000], len(closes))
+    lows = numpy.minimum(opens, closes) - rng.choice([0, 0, 500, 1000], len(closes))
+    return opens, highs, lows, closes
+
+
+def _random_walk(seed: int, count: int, steps: list) -> numpy.ndarray:
+    rng = numpy.random.default_rng(seed)
+    return 1000000 + numpy.cumsum(rng.choice(steps, count)).astype(float)
+
+
+def _series() -> dict:
+    """
+    テストに使用する系列(始値, 高値, 安値, 終値)
+    """
+    rng = numpy.random.default_rng(0)
+    series = {}
+
+    # 値動きの小さい(同じ価格が続きやすい)系列
+    series["ties"] = _make_ohlcs(_random_walk(1, 300, [-1000, 0, 0, 0, 1000]), rng)
+
+    # 値動きのない区間を含む系列
+    closes = _random_walk(2, 300, [-2000, -1000, 0, 1000, 2000])
+    closes[100:160] = closes[100]
+    closes[250:] = closes[250]
+    series["flat_runs"] = _make_ohlcs(closes, rng)
+
+    # 値動きのない系列
+    closes = numpy.full(300, 1000000.0)
+    series["flat"] = (closes, closes, closes, closes)
+
+    return series
+
+
+SERIES = _series()
+
+
+def _calculators(period: int) -> list:
+    """
+    (逐次計算器, TA-Libの計算処理, 逐次計算器に渡す価格の位置)のリスト
+    """
+    return [
+        (lambda: StreamingSMA(period), lambda opens, highs, lows, closes: talib.SMA(closes, period), (3,)),
+        (lambda: StreamingEMA(period), lambda opens, highs, lows, closes: talib.EMA(closes, period), (3,)),
+        (lambda: StreamingWMA(period), lambda opens, highs, lows, closes: talib.WMA(closes, period), (3,)),
+        (lambda: StreamingRSI(period), lambda opens, highs, lows, closes: talib.RSI(closes, period), (3,)),
+        (lambda: StreamingSTDDEV(period, 2), lambda opens, highs, lows, closes: talib.STDDEV(closes, period, 2), (3,)),
+        (lambda: StreamingATR(period), lambda opens, highs, lows, closes: talib.ATR(highs, lows, closes, period), (1, 2, 3)),
+    ]
+
+
+CASES = [
+    pytest.param(name, period, idx, id="{}-{}-{}".format(("SMA", "EMA", "WMA", "RSI", "STDDEV", "ATR")[idx], period, name))
+    for name in SERIES for period in PERIODS for idx in range(6)
+]
+
+
+@pytest.mark.parametrize("name, period, idx", CASES)
+def test_push_matches_talib(name, period, idx):
+    create, func, columns = _calculators(period)[idx]
+    ohlcs = SERIES[name]
+    expected = func(*ohlcs)
+
+    calculator = create()
+    actual = [calculator.push(*[ohlcs[x][i] for x in columns]) for i in range(len(ohlcs[3]))]
+
+    numpy.testing.assert_allclose(actual, expected, rtol=RTOL, atol=ATOL)
+
+
+@pytest.mark.parametrize("name, period, idx", CASES)
+def test_peek_matches_talib_without_changing_state(name, period, idx):
+    create, func, columns = _calculators(period)[idx]
+    ohlcs = SERIES[name]
+    count = len(ohlcs[3])
+    expected = func(*ohlcs)
+
+    calculator = create()
+    for i in range(count):
+        values = [ohlcs[x][i] for x in columns]
+
+        # 形成中の足が別の価格を経由しても、確定した足の計算結果に影響しない
+        if i % 10 == 0:
+            forming = [x[:i + 1].copy() for x in ohlcs]
+            for x in forming:
+                x[-1] += 3000
+            forming[1][-1] = max(forming[1][-1], forming[3][-1])
+            forming_expected = func(*forming)[-1]
+            forming_actual = calculator.peek(*[forming[x][-1] for x in columns])
+            numpy.testing.assert_allclose(forming_actual, forming_expected, rtol=RTOL, atol=ATOL)
+
+        peeked = calculator.peek(*values)
+        numpy.testing.assert_allclose(peeked, expected[i], rtol=RTOL, atol=ATOL)
+        numpy.testing.assert_allclose(calculator.peek(*values), peeked)
+        numpy.testing.assert_allclose(calculator.push(*values), peeked)
+
+
+class _Feeder:
+    """
+    インディケーターのテストで使用するフィーダー
+    (系列のローソク足を先頭から順に配信し、最後のローソク足を形成中として扱います)
+    """
+
+    def __init__(self, ohlcs: tuple, bar_count: int, revealed_count: int):
+        self._ohlcs = [numpy.array(x, dtype=float) for x in ohlcs]
+        self._bar_count = bar_count
+        self._revealed_count = revealed_count
+        self._times = [datetime(2020, 1, 1) + timedelta(minutes=x) for x in range(len(ohlcs[3]))]
+        self._forming = None
+        self._data_version = 0
+        self._indicator_graph = IndicatorGraph()
+        self._ohlc_updated_eventhandler = EventHandler(self)
+
+    def advance(self, count: int = 1):
+        """
+        次のローソク足を形成中にする
+        """
+        self._revealed_count += count
+        self._forming = None
+        self._notify()
+
+    def tick(self, close: float):
+        """
+        形成中のローソク足を更新する
+        """
+        idx = self._revealed_count - 1
+        opens, highs, lows, _ = self._forming or [x[idx] for x in self._ohlcs]
+        self._forming = [opens, max(highs, close), min(lows, close), close]
+        self._notify()
+
+    def shift_times(self, seconds: int):
+        """
+        ローソク足の時刻を変更する(取得し直したローソク足の時刻が変わった場合)
+        """
+        self._times = [x + timedelta(seconds=seconds) for x in self._times]
+        self._notify()
+
+    def _notify(self):
+        self._data_version += 1
+        self._ohlc_updated_eventhandler.fire(EventArgs())
+
+    def get_history(self, start: int) -> list:
+        """
+        指定した位置から形成中のローソク足までの価格(始値, 高値, 安値, 終値)を取得する
+        """
+        return [self.get_prices(self._revealed_count - start - self._bar_count, x) for x in APPLIED_PRICES]
+
+    def get_times(self, extra_bar_count: int = 0) -> list:
+        count = self._bar_count + extra_bar_count
+        return self._times[:self._revealed_count][-count:]
+
+    def get_prices(self, extra_bar_count: int = 0, applied_price: AppliedPrice = AppliedPrice.CLOSE) -> numpy.ndarray:
+        count = self._bar_count + extra_bar_count
+        column = APPLIED_PRICES.index(applied_price)
+        prices = self._ohlcs[column][:self._revealed_count].copy()
+        if self._forming is not None:
+            prices[-1] = self._forming[column]
+        return prices[-count:]
+
+    @property
+    def bar_count(self) -> int:
+        return self._bar_count
+
+    @property
+    def precompute(self) -> bool:
+        return False
+
+    @property
+    def data_version(self) -> int:
+        return self._data_version
+
+    @property
+    def indicator_graph(self) -> IndicatorGraph:
+        return self._indicator_graph
+
+    @property
+    def ohlc_updated_eventhandler(self) -> EventHandler:
+        return self._ohlc_updated_eventhandler
+
+
+def _indicators(feeder: _Feeder, period: int, incremental: bool) -> list:
+    return [
+        SMA(feeder, period, incremental=incremental),
+        EMA(feeder, period, incremental=incremental),
+        WMA(feeder, period, incremental=incremental),
+        RSI(feeder, period, incremental=incremental),
+        STDDEV(feeder, period, 2, incremental=incremental),
+        ATR(feeder, period, incremental=incremental),
+    ]
+
+
+def _assert_rebuilt(feeder: _Feeder, period: int, indicators: list):
+    """
+    取得できるローソク足(表示本数+期間)のみから、TA-Libで計算した値と一致することを確認する
+    """
+    window = [feeder.get_prices(period, x) for x in APPLIED_PRICES]
+    for indicator, (_, func, _) in zip(indicators, _calculators(period)):
+        assert indicator.times == feeder.get_times()
+        numpy.testing.assert_allclose(indicator.prices, func(*window)[-feeder.bar_count:], rtol=RTOL, atol=ATOL)
+
+
+@pytest.mark.parametrize("period", PERIODS)
+def test_incremental_rebuilds_from_window(period):
+    feeder = _Feeder(SERIES["flat_runs"], 50, 120)
+    indicators = _indicators(feeder, period, True)
+
+    # 逐次計算器を作成した時点
+    _assert_rebuilt(feeder, period, indicators)
+
+    # 確定済みのローソク足が取得できる範囲から外れた場合
+    for _ in range(3):
+        feeder.advance()
+        feeder.tick(feeder.get_prices()[-1] + 1000)
+        for indicator in indicators:
+            indicator.prices
+    calculators = [x._calculator for x in indicators]
+    feeder.advance(100)
+    _assert_rebuilt(feeder, period, indicators)
+    assert all(x._calculator is not y for x, y in zip(indicators, calculators))
+
+    # ローソク足の時刻が変わり、確定済みのローソク足の位置が特定できない場合
+    calculators = [x._calculator for x in indicators]
+    feeder.shift_times(30)
+    _assert_rebuilt(feeder, period, indicators)
+    assert all(x._calculator is not y for x, y in zip(indicators, calculators))
+
+
+@pytest.mark.parametrize("period", PERIODS)
+def test_incremental_matches_talib_since_rebuild(period):
+    ohlcs = SERIES["ties"]
+    feeder = _Feeder(ohlcs, 50, 120)
+    indicators = _indicators(feeder, period, True)
+    funcs = [x[1] for x in _calculators(period)]
+
+    # 逐次計算器を作成したときのローソク足から、TA-Libで先頭から計算した値と一致する
+    first_idx = 120 - 50 - period
+    calculators = [x._calculator for x in indicators]
+    for i in range(80):
+        close = feeder.get_prices()[-1]
+        for forming_close in (close - 2000, close + 1000, close):
+            feeder.tick(forming_close)
+            history = feeder.get_history(first_idx)
+            for indicator, func in zip(indicators, funcs):
+                expected = func(*history)[-50:]
+                numpy.testing.assert_allclose(indicator.prices, expected, rtol=RTOL, atol=ATOL)
+        # 読み込まれない間に複数のローソク足が確定した場合も、確定した分だけ取り込む
+        feeder.advance(3 if i % 7 == 0 else 1)
+    assert all(x._calculator is y for x, y in zip(indicators, calculators))
+
+
+@pytest.mark.parametrize("period", PERIODS)
+def test_incremental_drift_decays_geometrically(period):
+    feeder = _Feeder(SERIES["flat_runs"], 100, 150)
+    pairs = [
+        (EMA(feeder, period, incremental=True), EMA(feeder, period), 1 - 2 / (period + 1)),
+        (ATR(feeder, period, incremental=True), ATR(feeder, period), (period - 1) / period),
+    ]
+
+    # EMA・ATRの既定の計算との差は、初期値の差が1本ごとに一定の割合で減衰したものになる
+    for _ in range(120):
+        feeder.advance()
+        feeder.tick(feeder.get_prices()[-1] - 1000)
+        for incremental, window, ratio in pairs:
+            drift = numpy.array(incremental.prices) - numpy.array(window.prices)
+            drift = drift[~numpy.isnan(drift)]
+            numpy.testing.assert_allclose(drift[1:], drift[:-1] * ratio, rtol=0, atol=1e-6)
+
+
+def test_incremental_rsi_latest_drift():
+    ohlcs = _make_ohlcs(_random_walk(3, 800, [-2000, -1000, 0, 0, 1000, 2000]), numpy.random.default_rng(3))
+    feeder = _Feeder(ohlcs, 100, 200)
+    incremental = RSI(feeder, 14, incremental=True)
+    window = RSI(feeder, 14)
+
+    drifts = []
+    for _ in range(600):
+        feeder.tick(feeder.get_prices()[-1] + 1000)
+        drifts.append(abs(incremental.prices[-1] - window.prices[-1]))
+        feeder.advance()
+        drifts.append(abs(incremental.prices[-1] - window.prices[-1]))
+    assert max(drifts) <= RSI_LATEST_DRIFT
+
+
+class _Close(Indicator):
+    """
+    逐次計算器を持たないインディケーター
+    """
+
+    def __init__(self, feeder: _Feeder, incremental: bool):
+        super().__init__(feeder, "close", incremental)
+
+    def _load(self):
+        self._times = self._feeder.get_times()
+        self._prices = self._feeder.get_prices().tolist()
+
+
+def test_incremental_requires_calculator():
+    feeder = _Feeder(SERIES["ties"], 50, 120)
+    assert _Close(feeder, False).prices == feeder.get_prices().tolist()
+    with pytest.raises(ValueError):
+        _Close(feeder, True)
@@ -0,0 +1,122 @@
+import csv
+from datetime import datetime, timedelta
+
+import numpy
+import pytest
+
+from magictrader.candle import Candle, CandleFeeder
+from magictrader.chart import Chart, ChartWindow, HeadlessChart
+from magictrader.indicator import SMA
+from magictrader.model import DBContext
+from magictrader.position import PositionRepository
+from magictrader.store import DBCandleStore
+from magictrader.sweep import ParameterSweep
+from magictrader.terminal import TradeTerminal
+
+
+class _SweepTerminal(TradeTerminal):
+    """
+    paramsを受け取らないコンストラクターを持つストラテジー
+    """
+
+    def __init__(self, currency_pair: str, period: str, trade_mode: str, datetime_from: datetime = None, datetime_to: datetime = None,
+                 terminal_name: str = "mt"):
+        super().__init__(currency_pair, period, trade_mode, datetime_from, datetime_to, terminal_name)
+
+    def _on_init(self, feeder: CandleFeeder, chart: Chart, window_main: ChartWindow, data_bag: dict):
+        data_bag["sma_fast"] = SMA(feeder, self.params["sma_fast"])
+        data_bag["sma_slow"] = SMA(feeder, self.params["sma_slow"])
+
+    def _on_tick(self, candle: Candle, data_bag: dict, position_repository: PositionRepository, is_newbar: bool):
+        if not is_newbar:
+            return
+        sma_fast = data_bag["sma_fast"]
+        sma_slow = data_bag["sma_slow"]
+        if sma_fast.prices[-3] < sma_slow.prices[-3] and sma_fast.prices[-2] > sma_slow.prices[-2]:
+            position = position_repository.create_position()
+            position.open(candle.times[-1], "buy", candle.closes[-1], 1, "open: golden cross")
+        if sma_fast.prices[-3] > sma_slow.prices[-3] and sma_fast.prices[-2] < sma_slow.prices[-2]:
+            for position in position_repository.get_open_positions("buy"):
+                position.close(candle.times[-1], candle.closes[-1], "close: dead cross")
+
+
+def _save_source_candles(location: str):
+    """
+    リプレイのAPIが応答する1時間足を保存する
+    """
+    rng = numpy.random.default_rng(0)
+    count = 24 * 20
+    closes = 1000000 + numpy.cumsum(rng.integers(-5000, 5001, count)).astype(float)
+    opens = numpy.r_[closes[0], closes[:-1]]
+    DBCandleStore(DBContext("sqlite:///{}".format(location))).save_ohlcs("btc_jpy", "1h", {
+        "times": [datetime(2019, 1, 1) + timedelta(hours=x) for x in range(count)],
+        "opens": opens,
+        "highs": numpy.maximum(opens, closes) + 1000,
+        "lows": numpy.minimum(opens, closes) - 1000,
+        "closes": closes,
+    })
+
+
+@pytest.fixture
+def sweep_dir(tmp_path, monkeypatch):
+    """
+    リプレイのAPIからローソク足を取得するINIファイルを作成し、作業ディレクトリとする
+    """
+    _save_source_candles(str(tmp_path / "source.sqlite"))
+    with open(tmp_path / "sweep.ini", "w", encoding="utf-8") as f:
+        f.write("\n".join([
+            "[cache]",
+            "backend=sqlite",
+            "location=sqlite:///{}".format(tmp_path / "cache.sqlite"),
+            "[replay]",
+            "enabled=True",
+            "backend=sqlite",
+            "location=sqlite:///{}".format(tmp_path / "source.sqlite"),
+            "[backtest]",
+            "preload=True",
+            "tick_mode=bar",
+            "save_chart_image=True",
+            "",
+        ]))
+    monkeypatch.chdir(tmp_path)
+
+    # チャートの画像はmatplotlibを使用せずに、保存先のファイルのみを作成する
+    monkeypatch.setattr(HeadlessChart, "save_as_png", lambda self, pict_path: open(pict_path, "w").close())
+    return tmp_path
+
+
+def test_expand_grid():
+    assert ParameterSweep.expand_grid({"sma_fast": [5, 10], "sma_slow": [20, 40]}) == [
+        {"sma_fast": 5, "sma_slow": 20},
+        {"sma_fast": 5, "sma_slow": 40},
+        {"sma_fast": 10, "sma_slow": 20},
+        {"sma_fast": 10, "sma_slow": 40},
+    ]
+    assert ParameterSweep.expand_grid({}) == [{}]
+
+
+def test_run_grid_in_parallel(sweep_dir):
+    param_grid = {"sma_fast": [5, 10], "sma_slow": [20, 40]}
+    sweep = ParameterSweep(
+        _SweepTerminal, "btc_jpy", "1h", datetime(2019, 1, 15), datetime(2019, 1, 18), param_grid, "sweep", max_workers=2
+    )
+    results = sweep.run()
+
+    # パラメーターの組み合わせごとに、組み合わせの順で結果が集計される
+    assert [{k: x[k] for k in param_grid} for x in results] == ParameterSweep.expand_grid(param_grid)
+    for result in results:
+        assert set(result) == {"sma_fast", "sma_slow", "total_profit", "trade_count", "max_drawdown", "elapsed"}
+        assert result["trade_count"] >= 0
+    assert len({(x["total_profit"], x["trade_count"]) for x in results}) > 1
+
+    # ポジション・チャートの画像は、パラメーターごとのファイルに保存される
+    for params in ParameterSweep.expand_grid(param_grid):
+        result_name = "sweep_sma_fast={}_sma_slow={}".format(params["sma_fast"], params["sma_slow"])
+        assert (sweep_dir / "{}.json".format(result_name)).exists()
+        assert (sweep_dir / "report" / "chart_{}.png".format(result_name)).exists()
+
+    sweep.save_as_csv(str(sweep_dir / "sweep.csv"))
+    with open(sweep_dir / "sweep.csv", newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    assert [(int(x["sma_fast"]), int(x["sma_slow"]), int(x["trade_count"])) for x in rows] == \
+        [(x["sma_fast"], x["sma_slow"], x["trade_count"]) for x in results]
@@ -0,0 +1,111 @@
+import random
+
+import numpy
+import pytest
+
+from magictrader.candle import TickGenerator
+from magictrader.const import TickMode
+
+
+def _generate_by_list(bar: tuple, details: list) -> list:
+    """
+    ティックデータをリストで1本ずつ生成する(NumPyで一括生成する前の方法)
+    """
+    prices = []
+    for detail_open, detail_high, detail_low, detail_close in details:
+        prices.append(detail_open)
+        if detail_close > detail_open:
+            prices.append(detail_low)
+            prices.append(detail_high)
+        else:
+            prices.append(detail_high)
+            prices.append(detail_low)
+        prices.append(detail_close)
+    prices[0] = bar[0]
+    prices[prices.index(max(prices))] = bar[1]
+    prices[prices.index(min(prices))] = bar[2]
+    prices[-1] = bar[3]
+    return prices
+
+
+def _generate_by_numpy(bars: list, details: list) -> list:
+    """
+    ティックデータをTickGeneratorで一括生成し、ローソク足ごとに分割する
+    """
+    bar_ohlcs = {name: numpy.array([x[i] for x in bars], dtype=float) for i, name in enumerate(("opens", "highs", "lows", "closes"))}
+    flat_details = [x for y in details for x in y]
+    detail_ohlcs = {name: numpy.array([x[i] for x in flat_details], dtype=float) for i, name in enumerate(("opens", "highs", "lows", "closes"))}
+    detail_to = numpy.cumsum([len(x) for x in details])
+    detail_from = detail_to - [len(x) for x in details]
+    ticks, offsets = TickGenerator.generate(bar_ohlcs, detail_ohlcs, detail_from, detail_to)
+    return [ticks[offsets[i]:offsets[i + 1]].tolist() for i in range(len(bars))]
+
+
+# (ローソク足, より下位のローソク足)
+BARS = {
+    # 陽線
+    "bullish": ((100, 130, 95, 125), [(100, 105, 95, 104), (104, 120, 103, 118), (118, 130, 117, 125), (125, 126, 121, 125)]),
+    # 陰線
+    "bearish": ((130, 132, 90, 95), [(130, 132, 120, 121), (121, 122, 100, 101), (101, 104, 90, 92), (92, 96, 91, 95)]),
+    # 同時線(より下位のローソク足にも同時線を含む)
+    "doji": ((110, 120, 100, 110), [(110, 115, 108, 110), (110, 120, 100, 112), (112, 113, 105, 108), (108, 111, 107, 110)]),
+    # 最高値・最安値が複数回現れる
+    "ties": ((100, 110, 90, 100), [(100, 110, 90, 100), (100, 110, 90, 105), (105, 110, 90, 95), (95, 100, 95, 100)]),
+    # より下位のローソク足の価格が、ローソク足の最高値・最安値と異なる
+    "mismatch": ((100, 140, 80, 120), [(101, 110, 99, 108), (108, 125, 107, 121), (121, 122, 97, 119)]),
+}
+
+
+@pytest.mark.parametrize("name", BARS)
+def test_generate_matches_list(name):
+    bar, details = BARS[name]
+    assert _generate_by_numpy([bar], [details]) == [_generate_by_list(bar, details)]
+
+
+def test_generate_orders_bullish_and_bearish_details():
+    bar, details = BARS["bullish"]
+    ticks = _generate_by_numpy([bar], [details])[0]
+
+    # 陽線は始値・安値・高値・終値、陰線・同時線は始値・高値・安値・終値の順
+    assert ticks[4:8] == [104, 103, 120, 118]
+    assert ticks[12:16] == [125, 126, 121, 125]
+    assert ticks[0] == bar[0] and ticks[-1] == bar[3]
+    assert max(ticks) == bar[1] and min(ticks) == bar[2]
+
+
+def test_generate_batch_matches_list():
+    rng = random.Random(0)
+    bars = []
+    details = []
+    for _ in range(200):
+        items = []
+        price = rng.choice([100, 101, 102])
+        for _ in range(rng.randrange(1, 8)):
+            detail_open = price
+            detail_close = price + rng.choice([-2, -1, 0, 0, 1, 2])
+            detail_high = max(detail_open, detail_close) + rng.choice([0, 0, 1, 3])
+            detail_low = min(detail_open, detail_close) - rng.choice([0, 0, 1, 3])
+            items.append((detail_open, detail_high, detail_low, detail_close))
+            price = detail_close
+        bar_high = max(x[1] for x in items) + rng.choice([0, 1])
+        bar_low = min(x[2] for x in items) - rng.choice([0, 1])
+        bars.append((items[0][0], bar_high, bar_low, items[-1][3]))
+        details.append(items)
+
+    assert _generate_by_numpy(bars, details) == [_generate_by_list(x, y) for x, y in zip(bars, details)]
+
+
+def test_generate_without_detail_uses_bar():
+    bars = [(100, 130, 95, 125), (130, 132, 90, 95), (110, 120, 100, 110)]
+    details = [[x] for x in bars]
+    expected = [_generate_by_list(x, [x]) for x in bars]
+
+    # より下位のローソク足が存在しない場合は、元のローソク足から生成する
+    assert _generate_by_numpy(bars, [[], [], []]) == expected
+    assert _generate_by_numpy(bars, details) == expected
+
+    bar_ohlcs = {name: numpy.array([x[i] for x in bars], dtype=float) for i, name in enumerate(("opens", "highs", "lows", "closes"))}
+    ticks, offsets = TickGenerator.generate_from_bars(bar_ohlcs, TickMode.OHLC)
+    assert [ticks[offsets[i]:offsets[i + 1]].tolist() for i in range(len(bars))] == expected
+    ticks, offsets = TickGenerator.generate_from_bars(bar_ohlcs, TickMode.BAR)
+    assert ticks.tolist() == [125, 95, 110] and offsets.tolist() == [0, 1, 2, 3]